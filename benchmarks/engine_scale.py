@@ -0,0 +1,326 @@
+"""Engine operations on synthetic profiles of 1k to 1M words and up to 10M reviews.
+
+Each profile is generated from a fixed seed in the logs/ format (user_words.json,
+training_history.jsonl, training_stats.json) into a scratch directory, so two runs
+with the same arguments measure the same data. Results are JSON; pass the file of an
+earlier run with --compare to get per-operation ratios (new / old, above 1 is slower).
+
+    python benchmarks/engine_scale.py --profiles 1k,100k --output bench.json
+    python benchmarks/engine_scale.py --profiles 1m --storage sqlite --compare bench.json
+
+perform_search and the display_all_words filter pipeline are measured through the
+engine calls they make (search_all, filter_words); widget work is not included.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import StatsAggregator, VocabularyEngine  # noqa: E402
+
+# name -> (words, history entries)
+PROFILES = {
+    "1k": (1_000, 10_000),
+    "100k": (100_000, 1_000_000),
+    "1m": (1_000_000, 10_000_000),
+}
+
+SYLLABLES = ["ka", "ro", "mi", "sen", "tor", "la", "vi", "del", "an", "sch", "ber", "un",
+             "ge", "haus", "tag", "lo", "pre", "ist", "ma", "nu", "wo", "ri", "zel", "ok"]
+TOPICS = ["Home", "Food", "Travel", "Work", "Family", "Animals", "Weather", "City", "Health",
+          "School", "Sport", "Music", "Nature", "Clothes", "Time", "Numbers", "Colors", "Body",
+          "Emotions", "Shopping", "Transport", "Hobbies", "Kitchen", "Office", "Science",
+          "Money", "Holidays", "Computers", "Verbs", "Adjectives", VocabularyEngine.DEFAULT_TOPIC]
+TAGS = ["noun", "verb", "adj", "adv", "a1", "a2", "b1", "b2", "c1", "idiom", "formal",
+        "slang", "plural", "irregular", "phrasal", "false-friend"]
+STATUSES = ["New", "New", "New", "Learning", "Learning", "Mastered"]
+TEST_TYPES = ["practice", "practice", "practice", "quiz", "reverse"]
+# reviews are spread over the days before this date, so profiles do not depend on today
+ANCHOR = datetime(2025, 1, 1)
+HISTORY_DAYS = 730
+
+
+def make_text(rng, low, high):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(low, high)))
+
+
+def make_word(rng, word_id):
+    added = ANCHOR - timedelta(days=rng.randrange(HISTORY_DAYS), seconds=rng.randrange(86400))
+    word = {
+        "word": make_text(rng, 2, 4).capitalize(),
+        "translation": make_text(rng, 2, 4),
+        "sentence": (" ".join(make_text(rng, 1, 3) for _ in range(rng.randint(4, 9))).capitalize()
+                     if rng.random() < 0.3 else ""),
+        "date_added": added.strftime("%Y-%m-%d %H:%M:%S"),
+        # a skewed topic mix, as real vocabularies have a few large topics
+        "topic": TOPICS[min(int(rng.expovariate(0.15)), len(TOPICS) - 1)],
+        "tags": rng.sample(TAGS, rng.choice((0, 1, 1, 2, 3))),
+        "status": rng.choice(STATUSES),
+        "review_count": 0,
+        "last_reviewed": None,
+        "id": word_id,
+    }
+    if word["status"] != "New":
+        reviewed = added + timedelta(days=rng.randrange(1, 60))
+        interval = rng.choice((1, 6, 15, 40))
+        word["review_count"] = rng.randint(1, 12)
+        word["last_reviewed"] = reviewed.strftime("%Y-%m-%d %H:%M:%S")
+        word["ease"] = round(rng.uniform(1.3, 2.8), 3)
+        word["reps"] = rng.randint(1, 6)
+        word["interval"] = interval
+        word["due"] = (reviewed.date() + timedelta(days=interval)).isoformat()
+    return word
+
+
+def generate_profile(data_dir, words, history, seed=0):
+    # Writes the three files the engine reads at startup; the statistics are aggregated
+    # while the history is written, as the app would have persisted them.
+    rng = random.Random(seed)
+    os.makedirs(data_dir, exist_ok=True)
+    word_list = [make_word(rng, i + 1) for i in range(words)]
+    with open(os.path.join(data_dir, "user_words.json"), "w", encoding="utf-8") as f:
+        json.dump(word_list, f, ensure_ascii=False, indent=2)
+    del word_list
+
+    stats = StatsAggregator()
+    with open(os.path.join(data_dir, "training_history.jsonl"), "w", encoding="utf-8") as f:
+        for _ in range(history):
+            moment = ANCHOR - timedelta(days=rng.randrange(HISTORY_DAYS), seconds=rng.randrange(86400))
+            correct = rng.random() < 0.7
+            entry = {
+                "date": moment.strftime("%Y-%m-%d"),
+                "wordId": rng.randint(1, max(words, 1)),
+                "result": "correct" if correct else "incorrect",
+                "testType": rng.choice(TEST_TYPES),
+                "sessionId": moment.strftime("%Y%m%d%H%M%S"),
+                "timestamp": moment.isoformat(),
+                "grade": rng.choice(("exact", "close")) if correct else "wrong",
+            }
+            stats.add(entry)
+            f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")))
+            f.write("\n")
+    with open(os.path.join(data_dir, "training_stats.json"), "w", encoding="utf-8") as f:
+        json.dump(stats.to_dict(), f, ensure_ascii=False)
+
+
+def timed(fn, repeat, setup=None):
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return summary(samples)
+
+
+def summary(samples):
+    samples = sorted(samples)
+    return {
+        "runs": len(samples),
+        "median_ms": round(statistics.median(samples), 4),
+        "min_ms": round(samples[0], 4),
+        "max_ms": round(samples[-1], 4),
+    }
+
+
+def search_terms(engine, rng, count=10):
+    # substrings of stored words and translations, plus one term that matches nothing
+    terms = []
+    for w in rng.sample(engine.words, min(count, len(engine.words))):
+        text = w["word" if rng.random() < 0.5 else "translation"].lower()
+        start = rng.randrange(max(len(text) - 3, 1))
+        terms.append(text[start:start + rng.randint(3, 5)])
+    terms.append("qqxq")
+    return terms
+
+
+def run_profile(data_dir, storage, repeat, reviews, seed):
+    results = {}
+    rng = random.Random(seed + 1)
+
+    if storage == "sqlite":
+        # the first start imports the JSON files into the database; not part of engine_init
+        VocabularyEngine(data_dir=data_dir, storage=storage, fold_external=False).close()
+    started = time.perf_counter()
+    engine = VocabularyEngine(data_dir=data_dir, storage=storage, fold_external=False)
+    results["engine_init"] = summary([(time.perf_counter() - started) * 1000])
+    # background writes would land inside other timings; persistence is timed explicitly
+    for writer in (engine.words_writer, engine.stats_writer):
+        writer.flush_interval = writer.max_delay = 3600
+    try:
+        loaded = {}
+
+        def load_words():
+            loaded["words"] = None  # one copy in memory at a time
+            loaded["words"] = engine.load_words()
+
+        results["load_words"] = timed(load_words, repeat)
+        # the lazy indexes are not built yet, so swapping in the last load keeps them consistent
+        engine.words = loaded.pop("words")
+
+        results["load_history"] = timed(engine.load_history, repeat)
+
+        if engine.store is not None:
+            results["save_words"] = timed(engine.save_words, repeat)
+        else:
+            results["save_words"] = timed(lambda: (engine.save_words(), engine.flush_words()), repeat)
+
+        def review_batch():
+            for w in picked:
+                engine.log_review(w, rng.random() < 0.7)
+
+        picked = [rng.choice(engine.words) for _ in range(reviews)] if engine.words else []
+        batch = timed(review_batch, 1)
+        results["log_review"] = dict(batch, reviews=len(picked),
+                                     per_review_ms=round(batch["median_ms"] / max(len(picked), 1), 4))
+
+        def invalidate_streak():
+            engine.review_stats._streak_cache = None
+
+        results["update_statistics"] = timed(engine.update_statistics, repeat * 4, setup=invalidate_streak)
+
+        terms = search_terms(engine, rng)
+        results["search_scan"] = timed(lambda: [engine.search_all(t) for t in terms], 1)
+        results["search_scan"]["terms"] = len(terms)
+        # the app builds on a worker thread; timed here on its own
+        results["search_index_build"] = timed(engine.search_index.build, 1)
+        results["perform_search"] = timed(lambda: [engine.search_all(t) for t in terms], repeat)
+        results["perform_search"]["terms"] = len(terms)
+
+        topic = engine.get_topics()[0] if engine.words else ""
+        filters = {
+            "none": {},
+            "topic": {"topic": topic},
+            "status": {"status": "Learning"},
+            "tag": {"tag": "verb"},
+            "topic_status_tag": {"topic": topic, "status": "Learning", "tag": "verb"},
+            "search_topic": {"search": terms[0], "topic": topic},
+        }
+        results["display_all_words"] = {
+            name: timed(lambda kw=kw: engine.filter_words(**kw), repeat) for name, kw in filters.items()
+        }
+        # the quiz screen's path: the whole deck (due heap) or one topic (topic index)
+        counts = engine.topic_counts()
+        small_topic = min(counts, key=counts.get) if counts else ""
+        quiz_rng = random.Random(seed + 2)
+        results["make_quiz"] = {
+            "all": timed(lambda: engine.make_quiz(rng=quiz_rng), repeat),
+            "topic": timed(lambda: engine.make_quiz(topic=topic, rng=quiz_rng), repeat),
+            "small_topic": timed(lambda: engine.make_quiz(topic=small_topic, rng=quiz_rng), repeat),
+        }
+    finally:
+        engine.close()
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(current, baseline):
+    # new / old median for every operation present in both runs
+    ratios = {}
+    for name, ops in current.items():
+        old_ops = baseline.get(name, {}).get("results", {})
+        for op, value in ops["results"].items():
+            old = old_ops.get(op)
+            if old is None:
+                continue
+            if "median_ms" in value:
+                pairs = {op: (value, old)}
+            else:
+                pairs = {f"{op}.{k}": (v, old.get(k)) for k, v in value.items()}
+            for key, (new, prev) in pairs.items():
+                if prev and prev.get("median_ms"):
+                    ratios.setdefault(name, {})[key] = round(new["median_ms"] / prev["median_ms"], 3)
+    return ratios
+
+
+def parse_profile(spec):
+    if spec in PROFILES:
+        return spec, PROFILES[spec]
+    # custom "WORDSxHISTORY", e.g. 5000x200000
+    words, _, history = spec.partition("x")
+    return spec, (int(words), int(history or 0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", default="1k,100k",
+                        help=f"comma separated; {', '.join(PROFILES)} or WORDSxHISTORY")
+    parser.add_argument("--storage", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--reviews", type=int, default=200, help="log_review calls per profile")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="generate the profiles here and keep them (default: a temp dir, removed)")
+    parser.add_argument("--output", help="also write the results to this file")
+    parser.add_argument("--compare", help="results file of an earlier run")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="lingvo-bench-")
+    profiles = {}
+    try:
+        for spec in args.profiles.split(","):
+            name, (words, history) = parse_profile(spec.strip())
+            data_dir = os.path.join(workdir, f"{name}-{args.storage}-seed{args.seed}")
+            shutil.rmtree(data_dir, ignore_errors=True)
+            started = time.perf_counter()
+            generate_profile(data_dir, words, history, seed=args.seed)
+            generated_s = time.perf_counter() - started
+            print(f"{name}: generated {words} words / {history} reviews in {generated_s:.1f} s",
+                  file=sys.stderr)
+            profiles[name] = {
+                "words": words,
+                "history": history,
+                "words_file_mb": round(os.path.getsize(os.path.join(data_dir, "user_words.json")) / 2 ** 20, 1),
+                "history_file_mb": round(
+                    os.path.getsize(os.path.join(data_dir, "training_history.jsonl")) / 2 ** 20, 1),
+                "results": run_profile(data_dir, args.storage, args.repeat, args.reviews, args.seed),
+            }
+            if not args.workdir:
+                shutil.rmtree(data_dir, ignore_errors=True)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "storage": args.storage,
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+        },
+        "profiles": profiles,
+    }
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            report["ratios"] = compare(profiles, json.load(f).get("profiles", {}))
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Translation extraction: targeted fast path vs. the full BeautifulSoup parse.
+
+The sample pages are synthetic: they mimic the layout of the mobile translate page
+(large inline <style>/<script> head, header and language pickers, the result div,
+footer). No real responses are stored in the repo, so sizes are parameters.
+
+    python benchmarks/extract.py --repeat 200
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import extract_translation, extract_translation_fast, extract_translation_soup  # noqa: E402
+
+LANGUAGES = ["English", "Русский", "Deutsch", "Français", "Español", "Italiano", "Polski", "Türkçe"]
+
+
+def sample_page(result, head_kb=20, options=120, footer_links=40, seed=0):
+    rng = random.Random(seed)
+    style = "".join(f".c{i}{{margin:{i % 7}px;color:#{rng.randrange(16 ** 6):06x}}}" for i in range(head_kb * 30))
+    script = "var s=" + json.dumps(["x" * rng.randrange(5, 30) for _ in range(head_kb * 10)]) + ";"
+    picker = "".join(
+        f'<option value="l{i}">{LANGUAGES[i % len(LANGUAGES)]} {i}</option>' for i in range(options)
+    )
+    footer = "".join(f'<a href="/l{i}" class="footer-link">Link {i}</a>' for i in range(footer_links))
+    return (
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>Translate</title>"
+        f"<style>{style}</style><script>{script}</script></head><body>"
+        f'<div class="header"><div class="languages"><select name="sl">{picker}</select>'
+        f'<select name="tl">{picker}</select></div></div>'
+        '<form action="/m"><input type="text" name="q" value="hello &amp; welcome"></form>'
+        f'<div class="result-container">{result}</div>'
+        f'<div class="footer">{footer}</div></body></html>'
+    )
+
+
+SAMPLES = {
+    "short": sample_page("bonjour"),
+    "sentence": sample_page("Le chat est assis sur le tapis &amp; regarde la fenêtre.", seed=1),
+    "nested": sample_page("le <b>chat</b> <span>noir</span>", seed=2),
+    "large_head": sample_page("привет", head_kb=120, options=250, seed=3),
+    "missing": sample_page("x").replace("result-container", "error-container"),
+}
+
+
+def timed(fn, html, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(html)
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    results = {}
+    for name, html in SAMPLES.items():
+        expected = extract_translation_soup(html)
+        actual = extract_translation(html)
+        if actual != expected:
+            raise SystemExit(f"{name}: fast path returned {actual!r}, soup returned {expected!r}")
+        soup_ms = timed(extract_translation_soup, html, args.repeat)
+        fast_ms = timed(extract_translation, html, args.repeat)
+        results[name] = {
+            "html_kb": round(len(html) / 1024, 1),
+            "fast_path_hit": extract_translation_fast(html) is not None,
+            "soup_median_ms": soup_ms,
+            "extract_median_ms": fast_ms,
+            "speedup": round(soup_ms / fast_ms, 1) if fast_ms else None,
+        }
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
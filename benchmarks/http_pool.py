@@ -0,0 +1,91 @@
+"""Per-request latency of a fresh httpx.Client vs. the shared HttpClientPool.
+
+Runs against a local keep-alive HTTP/1.1 stand-in server, so the difference is
+connection setup only (no DNS or TLS); against translate.google.com / openrouter.ai
+the saving per request is larger.
+
+    python benchmarks/http_pool.py --requests 300
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import HttpClientPool  # noqa: E402
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # one buffered write per response, otherwise delayed ACKs add ~40 ms per keep-alive request
+    wbufsize = -1
+    disable_nagle_algorithm = True
+    body = b'<html><div class="result-container">bonjour</div></html>'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+def timed(fn, count):
+    samples = []
+    for _ in range(count):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def summary(samples):
+    samples = sorted(samples)
+    return {
+        "mean_ms": round(statistics.mean(samples), 3),
+        "p50_ms": round(samples[len(samples) // 2], 3),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/m"
+
+    def fresh_client():
+        with httpx.Client() as client:
+            client.get(url, params={"q": "hello"}, timeout=20)
+
+    pool = HttpClientPool()
+
+    def pooled():
+        pool.get(url, params={"q": "hello"}, timeout=20)
+
+    pooled()  # the pool is lazy; the first request opens the connection
+    results = {
+        "requests": args.requests,
+        "fresh_client": summary(timed(fresh_client, args.requests)),
+        "pooled_client": summary(timed(pooled, args.requests)),
+    }
+    pool.close()
+    server.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
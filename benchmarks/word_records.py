@@ -0,0 +1,98 @@
+"""Memory and access cost of WordRecord vs. plain dicts for 100k and 1M words.
+
+The words come from the engine_scale.py generator (same seed, same fields). Memory is
+what tracemalloc sees allocated for the word list after loading user_words.json, so
+the strings shared by both representations are counted in both.
+
+    python benchmarks/word_records.py --sizes 100000,1000000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import VocabularyEngine  # noqa: E402
+from engine_scale import make_word  # noqa: E402
+
+
+def measure(build):
+    tracemalloc.start()
+    started = time.perf_counter()
+    words = build()
+    elapsed = time.perf_counter() - started
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return words, size, peak, elapsed
+
+
+def access_ms(words, repeat=3):
+    # the filter_words style of access: a few get() calls per word
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for w in words:
+            w.get("topic", "")
+            w.get("status", "New")
+            w.get("tags", ())
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="100000,1000000")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="lingvo-records-") as tmp:
+        path = os.path.join(tmp, "user_words.json")
+        for size in (int(s) for s in args.sizes.split(",")):
+            rng = random.Random(args.seed)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump([make_word(rng, i + 1) for i in range(size)], f, ensure_ascii=False)
+
+            def load_dicts():
+                # what load_words kept before records: the parsed dicts plus the id map
+                with open(path, "r", encoding="utf-8") as f:
+                    words = json.load(f)
+                engine.words_by_id = {w["id"]: w for w in words}
+                return words
+
+            engine = VocabularyEngine.__new__(VocabularyEngine)
+            engine.store = None
+            engine.words_file = path
+
+            dicts, dict_bytes, dict_peak, dict_s = measure(load_dicts)
+            dict_access = access_ms(dicts)
+            del dicts
+            engine.words_by_id = None
+            records, record_bytes, record_peak, record_s = measure(engine.load_words)
+            record_access = access_ms(records)
+            del records
+            engine.words_by_id = None
+            results[size] = {
+                "dict_mb": round(dict_bytes / 2 ** 20, 1),
+                "record_mb": round(record_bytes / 2 ** 20, 1),
+                "dict_bytes_per_word": dict_bytes // size,
+                "record_bytes_per_word": record_bytes // size,
+                "saved": f"{1 - record_bytes / dict_bytes:.0%}",
+                "dict_load_peak_mb": round(dict_peak / 2 ** 20, 1),
+                "record_load_peak_mb": round(record_peak / 2 ** 20, 1),
+                "dict_load_s": round(dict_s, 2),
+                "record_load_s": round(record_s, 2),
+                "dict_access_ms": dict_access,
+                "record_access_ms": record_access,
+            }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
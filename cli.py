@@ -0,0 +1,131 @@
+"""Command-line access to the vocabulary without starting the Tk app.
+
+    python cli.py add Haus house --topic Home --tags noun,a1
+    python cli.py add haus House --tags b1 --merge
+    python cli.py import words.json
+    python cli.py dedupe
+    python cli.py stats
+    python cli.py quiz --topic Home --size 20
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+import diagnostics
+from engine import VocabularyEngine
+
+
+def cmd_add(engine, args):
+    tags = [t.strip() for t in (args.tags or "").split(",") if t.strip()]
+    existing = engine.find_duplicate(args.word, args.translation)
+    if existing is not None and not args.merge:
+        print(f"{existing['word']} — {existing['translation']} ({existing['topic']}) is already in the "
+              f"vocabulary; --merge adds the sentence, topic and tags to it", file=sys.stderr)
+        return 1
+    word = engine.add_word(args.word, args.translation, args.sentence, args.topic, tags, merge=True)
+    if word is None:
+        print("Both word and translation are required", file=sys.stderr)
+        return 1
+    print(f"{'Merged into' if existing is not None else 'Added'} "
+          f"{word['word']} — {word['translation']} ({word['topic']})")
+    return 0
+
+
+def cmd_import(engine, args):
+    def progress(fraction, counts):
+        print(f"\r{fraction:6.1%}  {counts['rows']} rows", end="", file=sys.stderr, flush=True)
+
+    try:
+        new_words, counts = engine.read_import(args.file, topic=args.topic, progress=progress)
+    except Exception as e:
+        print(f"\nError reading {args.file}: {e}", file=sys.stderr)
+        return 1
+    print(file=sys.stderr)
+    engine.add_words(new_words, count_today=False)
+    print(f"Imported {counts['added']} of {counts['rows']} rows "
+          f"({counts['duplicates']} duplicates, {counts['invalid']} invalid)")
+    return 0
+
+
+def cmd_dedupe(engine, args):
+    removed = engine.dedupe()
+    print(f"Merged and removed {removed} duplicate words, {len(engine.words)} left")
+    return 0
+
+
+def cmd_stats(engine, args):
+    test_stats = engine.update_statistics()
+    statuses = {}
+    for w in engine.words:
+        statuses[w.get("status", "New")] = statuses.get(w.get("status", "New"), 0) + 1
+    print(json.dumps({
+        "words": len(engine.words),
+        "topics": len(engine.get_topics()),
+        "status": statuses,
+        "total_reviews": test_stats["total_reviews"],
+        "streak": test_stats["streak"],
+        "best_day": test_stats["best_day"],
+        "accuracy_by_type": test_stats["accuracy_by_type"],
+    }, ensure_ascii=False, indent=2))
+    return 0
+
+
+def cmd_quiz(engine, args):
+    rng = random.Random(args.seed)
+    questions = engine.make_quiz(topic=args.topic, size=args.size, rng=rng)
+    print(json.dumps([
+        {"word": word.get("word"), "direction": direction, "prompt": prompt, "answer": answer}
+        for word, direction, prompt, answer in questions
+    ], ensure_ascii=False, indent=2))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-dir", default="logs")
+    parser.add_argument("--storage", choices=["json", "sqlite"], default=None,
+                        help="defaults to LINGVO_STORAGE")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    add = sub.add_parser("add", help="add one word")
+    add.add_argument("word")
+    add.add_argument("translation")
+    add.add_argument("--sentence", default="")
+    add.add_argument("--topic", default="")
+    add.add_argument("--tags", default="")
+    add.add_argument("--merge", action="store_true",
+                     help="if the word is already in the vocabulary, merge into it instead of failing")
+    add.set_defaults(run=cmd_add)
+
+    imp = sub.add_parser("import", help="import words from .csv, .json, .jsonl or an Anki .tsv/.txt export")
+    imp.add_argument("file")
+    imp.add_argument("--topic", default="", help="put every imported word into this topic")
+    imp.set_defaults(run=cmd_import)
+
+    dedupe = sub.add_parser("dedupe", help="merge words with the same word and translation")
+    dedupe.set_defaults(run=cmd_dedupe)
+
+    stats = sub.add_parser("stats", help="print vocabulary and review statistics as JSON")
+    stats.set_defaults(run=cmd_stats)
+
+    quiz = sub.add_parser("quiz", help="print a generated quiz as JSON")
+    quiz.add_argument("--topic", default=VocabularyEngine.ALL_TOPICS)
+    quiz.add_argument("--size", type=int, default=10)
+    quiz.add_argument("--seed", type=int, default=None)
+    quiz.set_defaults(run=cmd_quiz)
+
+    args = parser.parse_args(argv)
+    if diagnostics.ENABLED:
+        os.makedirs(args.data_dir, exist_ok=True)
+        diagnostics.recorder.attach_file(os.path.join(args.data_dir, "diagnostics.log"))
+    engine = VocabularyEngine(args.data_dir, storage=args.storage)
+    try:
+        return args.run(engine, args)
+    finally:
+        engine.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""Opt-in timing spans, counters and a main-thread stall detector.
+
+Enabled with LINGVO_DIAGNOSTICS=1 when the process starts. Disabled, traced() returns
+the function unchanged and span() / count() return right away, so the instrumented
+code paths cost nothing measurable.
+
+    LINGVO_DIAGNOSTICS=1 python file2.py
+
+Spans slower than LINGVO_DIAGNOSTICS_SLOW_MS (default 100) and main-thread stalls longer
+than LINGVO_STALL_MS (default 250) are written to a rotating log (logs/diagnostics.log
+in the app) as JSON lines; the totals are written on exit and shown in the app's
+Diagnostics screen.
+"""
+import atexit
+import functools
+import json
+import logging
+import os
+import sys
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from threading import Event, Lock, Thread, current_thread, main_thread
+
+ENABLED = os.getenv("LINGVO_DIAGNOSTICS", "") == "1"
+SLOW_MS = float(os.getenv("LINGVO_DIAGNOSTICS_SLOW_MS", "100"))
+STALL_MS = float(os.getenv("LINGVO_STALL_MS", "250"))
+
+
+# =========================
+# Recorder
+# =========================
+class Recorder:
+    # Aggregates per span name (calls, total and max ms) and named counters; slow spans
+    # and stalls are also kept as events, the newest `keep` in memory and all of them in
+    # the log file once one is attached. Safe to use from any thread.
+    def __init__(self, slow_ms=SLOW_MS, keep=200):
+        self.slow_ms = slow_ms
+        self.spans = {}  # name -> [calls, total_ms, max_ms]
+        self.counters = {}
+        self.events = deque(maxlen=keep)
+        self.started = time.time()
+        self.log = None
+        self.path = None
+        self._lock = Lock()
+
+    def record(self, name, ms):
+        with self._lock:
+            entry = self.spans.get(name)
+            if entry is None:
+                entry = self.spans[name] = [0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += ms
+            if ms > entry[2]:
+                entry[2] = ms
+        if ms >= self.slow_ms:
+            self.event("slow", span=name, ms=round(ms, 1), thread=current_thread().name)
+
+    def add(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def event(self, kind, **fields):
+        entry = dict(time=datetime.now().isoformat(timespec="milliseconds"), kind=kind, **fields)
+        with self._lock:
+            self.events.append(entry)
+        if self.log is not None:
+            self.log.info(json.dumps(entry, ensure_ascii=False))
+
+    def snapshot(self):
+        with self._lock:
+            spans = {
+                name: {"calls": calls, "total_ms": round(total, 1), "mean_ms": round(total / calls, 2),
+                       "max_ms": round(peak, 1)}
+                for name, (calls, total, peak) in sorted(self.spans.items(), key=lambda kv: -kv[1][1])
+            }
+            return {
+                "uptime_s": round(time.time() - self.started, 1),
+                "spans": spans,
+                "counters": dict(sorted(self.counters.items())),
+                "events": list(self.events),
+            }
+
+    def reset(self):
+        with self._lock:
+            self.spans.clear()
+            self.counters.clear()
+            self.events.clear()
+            self.started = time.time()
+
+    def attach_file(self, path, max_bytes=1 << 20, backups=3):
+        # Rotating JSON Lines log; the totals are appended at exit
+        if self.log is not None:
+            return
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        log = logging.getLogger("lingvo.diagnostics")
+        log.setLevel(logging.INFO)
+        log.propagate = False
+        log.addHandler(handler)
+        self.log = log
+        self.path = path
+        atexit.register(self.dump)
+
+    def dump(self):
+        # Writes the current totals to the log file; returns its path (None without one)
+        if self.log is None:
+            return None
+        snapshot = self.snapshot()
+        snapshot.pop("events")
+        entry = dict(time=datetime.now().isoformat(timespec="milliseconds"), kind="summary", **snapshot)
+        self.log.info(json.dumps(entry, ensure_ascii=False))
+        return self.path
+
+
+recorder = Recorder()
+
+
+# =========================
+# Spans and counters
+# =========================
+class Span:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        recorder.record(self.name, (time.perf_counter() - self.started) * 1000)
+        return False
+
+
+class NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+def span(name, detail=None):
+    # with span("render.refresh", screen): ... ; the detail is appended only when enabled
+    if not ENABLED:
+        return NULL_SPAN
+    return Span(f"{name}.{detail}" if detail is not None else name)
+
+
+def traced(name):
+    # Decorator form of span(); without diagnostics the function is returned as is
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                recorder.record(name, (time.perf_counter() - started) * 1000)
+        return wrapper
+    return decorate
+
+
+def count(name, n=1):
+    if ENABLED:
+        recorder.add(name, n)
+
+
+# =========================
+# Stall detection
+# =========================
+class StallDetector:
+    # The UI thread calls beat() every interval_ms (a Tk after() loop); a watchdog thread
+    # reports a stall when no beat arrived for threshold_ms, with the UI thread's stack at
+    # that moment, and records the full length of the stall once beats resume.
+    def __init__(self, threshold_ms=STALL_MS, interval_ms=50, target=None, stack_depth=12):
+        self.threshold = threshold_ms / 1000
+        self.interval_ms = interval_ms
+        self.stack_depth = stack_depth
+        self.target = target or main_thread()
+        self.last_beat = time.perf_counter()
+        self.stalls = 0
+        self._stalled_since = None
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self.last_beat = time.perf_counter()
+            self._thread = Thread(target=self._watch, name="stall-detector", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def beat(self):
+        with self._lock:
+            now = time.perf_counter()
+            stalled_since, self._stalled_since = self._stalled_since, None
+            self.last_beat = now
+        if stalled_since is not None:
+            recorder.record("main_thread.stall", (now - stalled_since) * 1000)
+
+    def _watch(self):
+        while not self._stop.wait(self.threshold / 4):
+            with self._lock:
+                last = self.last_beat
+                if self._stalled_since is not None or time.perf_counter() - last < self.threshold:
+                    continue
+                self._stalled_since = last
+            self.stalls += 1
+            recorder.add("main_thread.stalls")
+            frame = sys._current_frames().get(self.target.ident)
+            stack = traceback.format_stack(frame)[-self.stack_depth:] if frame is not None else []
+            recorder.event("stall", after_ms=round((time.perf_counter() - last) * 1000, 1),
+                           stack="".join(stack))
@@ -0,0 +1,2329 @@
+import json
+import operator
+import os
+import time
+import atexit
+import bisect
+import csv
+import html
+import heapq
+import random
+import re
+import sqlite3
+import sys
+import unicodedata
+from collections.abc import Mapping, MutableMapping
+from datetime import datetime, timedelta
+from threading import Thread, Condition, Lock
+
+import diagnostics
+
+
+# =========================
+# Training history log
+# =========================
+class HistoryLog:
+    # Append-only JSON Lines log: one review per line, so recording an answer costs
+    # a few hundred bytes instead of re-serializing the whole history.
+    def __init__(self, path, legacy_path=None, fsync=False):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.fsync = fsync
+        self.bad_lines = 0
+        self._needs_newline = False
+
+    def migrate_legacy(self):
+        # One-time conversion of the old indent=2 JSON array into the line log
+        if os.path.exists(self.path) or not self.legacy_path or not os.path.exists(self.legacy_path):
+            return
+        try:
+            with open(self.legacy_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except ValueError as e:
+            # truncated or corrupt: set aside for inspection, the history starts empty
+            print(f"Error reading {self.legacy_path}: {e}")
+            os.replace(self.legacy_path, self.legacy_path + ".corrupt")
+            return
+        entries = [e for e in data if isinstance(e, dict)] if isinstance(data, list) else []
+        self.rewrite(entries)
+        os.replace(self.legacy_path, self.legacy_path + ".migrated")
+
+    def iter_entries(self):
+        self.bad_lines = 0
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # torn write from a crash, skipped and dropped by the next compaction
+                    self.bad_lines += 1
+                    continue
+                if isinstance(entry, dict):
+                    yield entry
+                else:
+                    self.bad_lines += 1
+
+    @diagnostics.traced("persist.history_load")
+    def load(self):
+        self.migrate_legacy()
+        entries = list(self.iter_entries())
+        self._needs_newline = self._ends_without_newline()
+        return entries
+
+    def count_entries(self):
+        # Non-blank lines without parsing them; equals len(load()) unless some lines are corrupt
+        self.migrate_legacy()
+        count = 0
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                for line in f:
+                    if line.strip():
+                        count += 1
+        self._needs_newline = self._ends_without_newline()
+        return count
+
+    def _ends_without_newline(self):
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() == 0:
+                    return False
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) != b"\n"
+        except OSError:
+            return False
+
+    def append(self, entry):
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        if self._needs_newline:
+            line = "\n" + line
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self._needs_newline = False
+        diagnostics.count("history.bytes_written", len(line))
+
+    @diagnostics.traced("persist.history_rewrite")
+    def rewrite(self, entries):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")))
+                f.write("\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.bad_lines = 0
+        self._needs_newline = False
+
+    def needs_compaction(self):
+        return self.bad_lines > 0 or self._needs_newline
+
+    def compact(self, entries):
+        # Rewrites the log from the entries that survived loading (drops corrupt lines)
+        self.rewrite(entries)
+
+
+# =========================
+# Word records
+# =========================
+class WordRecord(MutableMapping):
+    # One word as a slotted object instead of a dict: no per-word key table, topic, status
+    # and due strings are interned and tags are a tuple of interned strings. It works
+    # wherever the dict did (w["topic"], get, setdefault, `in`, dict(w)); keys that are not
+    # fields are kept in `extra`, so a file loads and saves back with the same keys and values.
+    # Fields the word does not have hold MISSING (an unset slot would make every lookup of
+    # an absent key raise and catch an AttributeError).
+    FIELDS = ("id", "word", "translation", "sentence", "date_added", "review_count",
+              "last_reviewed", "topic", "tags", "status", "ease", "reps", "interval", "due")
+    FIELD_SET = frozenset(FIELDS)
+    INTERNED = frozenset(("topic", "status", "due"))
+    MISSING = object()
+    read_fields = staticmethod(operator.attrgetter(*FIELDS))  # all fields in one C call
+    __slots__ = FIELDS + ("extra",)
+
+    def __init__(self, data=()):
+        # __setitem__ inlined: this runs once per word on every load
+        missing = self.MISSING
+        for key in self.FIELDS:
+            setattr(self, key, missing)
+        self.extra = None
+        fields = self.FIELD_SET
+        interned = self.INTERNED
+        intern = sys.intern
+        for key, value in (data.items() if isinstance(data, Mapping) else data):
+            if key not in fields:
+                if self.extra is None:
+                    self.extra = {}
+                self.extra[key] = value
+                continue
+            if key == "tags" and isinstance(value, (list, tuple)):
+                value = tuple(intern(t) if type(t) is str else t for t in value)
+            elif key in interned and type(value) is str:
+                value = intern(value)
+            setattr(self, key, value)
+
+    def __getitem__(self, key):
+        if key in self.FIELD_SET:
+            value = getattr(self, key)
+            if value is not self.MISSING:
+                return value
+        elif self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in self.FIELD_SET:
+            value = getattr(self, key)
+            return default if value is self.MISSING else value
+        return self.extra.get(key, default) if self.extra is not None else default
+
+    def __setitem__(self, key, value):
+        if key in self.FIELD_SET:
+            if key == "tags" and isinstance(value, (list, tuple)):
+                value = tuple(sys.intern(t) if type(t) is str else t for t in value)
+            elif key in self.INTERNED and type(value) is str:
+                value = sys.intern(value)
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self.FIELD_SET and getattr(self, key) is not self.MISSING:
+            setattr(self, key, self.MISSING)
+        elif key not in self.FIELD_SET and self.extra is not None and key in self.extra:
+            del self.extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in self.FIELD_SET:
+            return getattr(self, key) is not self.MISSING
+        return self.extra is not None and key in self.extra
+
+    def __iter__(self):
+        missing = self.MISSING
+        for key, value in zip(self.FIELDS, self.read_fields(self)):
+            if value is not missing:
+                yield key
+        if self.extra:
+            yield from list(self.extra)
+
+    def __len__(self):
+        return sum(1 for _key in self)
+
+    def setdefault(self, key, default=None):
+        value = self.get(key, self.MISSING)
+        if value is self.MISSING:
+            self[key] = default
+            return self[key]
+        return value
+
+    def to_dict(self):
+        # plain dict for JSON, tags as a list again
+        missing = self.MISSING
+        data = {key: value for key, value in zip(self.FIELDS, self.read_fields(self)) if value is not missing}
+        tags = data.get("tags")
+        if type(tags) is tuple:
+            data["tags"] = list(tags)
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __eq__(self, other):
+        # Slot values compared directly: "id" comes first, so `in` and list.remove over
+        # different words stop at the first field without building any dicts
+        if self is other:
+            return True
+        if isinstance(other, WordRecord):
+            if self.id != other.id:
+                return False
+            return self.read_fields(self) == other.read_fields(other) and (self.extra or None) == (other.extra or None)
+        if isinstance(other, Mapping):
+            missing = self.MISSING
+            if other.get("id", missing) != self.get("id", missing):
+                return False
+            keys = 0
+            for key, value in other.items():
+                mine = self.get(key, missing)
+                if key == "tags" and isinstance(value, (list, tuple)) and isinstance(mine, tuple):
+                    value = tuple(value)
+                if mine is missing or mine != value:
+                    return False
+                keys += 1
+            return keys == len(self)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"WordRecord({self.to_dict()!r})"
+
+
+# =========================
+# Words persistence
+# =========================
+def atomic_write_json(path, data, indent=None):
+    # Write to a temp file in the same directory, then rename over the target:
+    # a crash leaves either the old file or the new one, never a truncated one.
+    # Returns the number of bytes written.
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+        size = f.tell()
+    os.replace(tmp_path, path)
+    return size
+
+
+class DebouncedJsonWriter:
+    # Write-behind persistence: mark_dirty() is cheap and returns immediately, a background
+    # thread writes one snapshot once no new changes arrived for flush_interval seconds
+    # (or max_delay after the first pending change at the latest), or right away after
+    # request_flush(). A failed write is retried with a growing delay.
+    def __init__(self, path, snapshot, flush_interval=2.0, max_delay=10.0, indent=2):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.snapshot = snapshot
+        self.flush_interval = flush_interval
+        self.max_delay = max_delay
+        self.indent = indent
+        self.write_count = 0
+        self._cond = Condition()
+        self._write_lock = Lock()
+        self._dirty = False
+        self._first_dirty_at = None
+        self._last_dirty_at = None
+        self._flush_requested = False
+        self._failures = 0
+        self._retry_at = 0.0
+        self._closed = False
+        self._thread = None
+
+    def mark_dirty(self):
+        with self._cond:
+            now = time.monotonic()
+            if not self._dirty:
+                self._first_dirty_at = now
+            self._dirty = True
+            self._last_dirty_at = now
+            if self._thread is None and not self._closed:
+                self._thread = Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def request_flush(self):
+        # Non-blocking flush(): the background thread writes the pending changes now
+        with self._cond:
+            if self._dirty:
+                self._flush_requested = True
+                self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._dirty and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                while self._dirty and not self._closed:
+                    now = time.monotonic()
+                    if self._flush_requested:
+                        break
+                    deadline = max(min(self._last_dirty_at + self.flush_interval,
+                                       self._first_dirty_at + self.max_delay), self._retry_at)
+                    if now >= deadline:
+                        break
+                    self._cond.wait(deadline - now)
+                if self._closed:
+                    return
+            self.flush()
+
+    def flush(self):
+        with self._write_lock:
+            with self._cond:
+                if not self._dirty:
+                    return False
+                self._dirty = False
+                self._flush_requested = False
+            try:
+                with diagnostics.span("persist.write", self.name):
+                    size = atomic_write_json(self.path, self.snapshot(), indent=self.indent)
+                self.write_count += 1
+                diagnostics.count("persist.bytes_written", size)
+                self._failures = 0
+                return True
+            except Exception as e:
+                print(f"Error saving {self.path}: {e}")
+                with self._cond:
+                    # the same error is likely to happen again (missing dir, full disk):
+                    # retry after flush_interval (at least 1s), doubled per failure up to max_delay
+                    self._dirty = True
+                    self._failures += 1
+                    delay = min(max(self.flush_interval, 1.0) * 2 ** min(self._failures - 1, 16),
+                                max(self.max_delay, 1.0))
+                    self._retry_at = time.monotonic() + delay
+                return False
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+
+# =========================
+# Review statistics
+# =========================
+class StatsAggregator:
+    # Running review statistics: add() is O(1) per review, so the dashboard never rescans
+    # the history. Persisted as JSON together with the number of entries it covers.
+    VERSION = 1
+
+    def __init__(self):
+        self.total = 0
+        self.daily_correct = {}
+        self.by_type = {}
+        self.best_day = None
+        self._streak_cache = None
+
+    def add(self, entry):
+        self.total += 1
+        ttype = entry.get("testType", "practice")
+        counts = self.by_type.get(ttype)
+        if counts is None:
+            counts = self.by_type[ttype] = {"correct": 0, "total": 0}
+        counts["total"] += 1
+        if entry.get("result") == "correct":
+            counts["correct"] += 1
+            day = entry.get("date")
+            if day:
+                value = self.daily_correct.get(day, 0) + 1
+                self.daily_correct[day] = value
+                if self.best_day is None or value > self.best_day["value"]:
+                    self.best_day = {"date": day, "value": value}
+        self._streak_cache = None
+
+    @classmethod
+    def from_entries(cls, entries):
+        stats = cls()
+        for entry in entries:
+            stats.add(entry)
+        return stats
+
+    @classmethod
+    def from_counts(cls, total, daily_correct, by_type):
+        stats = cls()
+        stats.total = total
+        stats.daily_correct = dict(daily_correct)
+        stats.by_type = {t: dict(c) for t, c in by_type.items()}
+        if stats.daily_correct:
+            day, value = max(stats.daily_correct.items(), key=lambda kv: kv[1])
+            stats.best_day = {"date": day, "value": value}
+        return stats
+
+    def streak(self, daily_goal, today=None):
+        # Consecutive days from today backwards with correct >= daily_goal (max 365)
+        today = today or datetime.now().date()
+        key = (today, daily_goal)
+        if self._streak_cache is not None and self._streak_cache[0] == key:
+            return self._streak_cache[1]
+        streak = 0
+        for i in range(0, 365):
+            if self.daily_correct.get((today - timedelta(days=i)).isoformat(), 0) >= daily_goal:
+                streak += 1
+            else:
+                break
+        self._streak_cache = (key, streak)
+        return streak
+
+    def accuracy(self):
+        return {
+            ttype: int((vals["correct"] / vals["total"]) * 100) if vals["total"] else 0
+            for ttype, vals in self.by_type.items()
+        }
+
+    def to_dict(self):
+        return {
+            "version": self.VERSION,
+            "entries": self.total,
+            "daily_correct": self.daily_correct,
+            "by_type": self.by_type,
+            "best_day": self.best_day,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if not isinstance(data, dict) or data.get("version") != cls.VERSION:
+            return None
+        stats = cls()
+        stats.total = data.get("entries", 0)
+        stats.daily_correct = data.get("daily_correct") or {}
+        stats.by_type = data.get("by_type") or {}
+        stats.best_day = data.get("best_day")
+        return stats
+
+
+# =========================
+# SQLite storage
+# =========================
+class SQLiteStore:
+    # Optional indexed backend for words and review history (LINGVO_STORAGE=sqlite).
+    # The row id is the word's stable "id"; history rows reference it in word_key.
+    WORD_COLUMNS = ("word", "translation", "sentence", "date_added", "review_count",
+                    "last_reviewed", "topic", "status")
+    HISTORY_COLUMNS = {"date": "date", "wordId": "word_key", "result": "result",
+                       "testType": "test_type", "sessionId": "session_id", "timestamp": "timestamp"}
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS words (
+            id INTEGER PRIMARY KEY,
+            word TEXT NOT NULL,
+            translation TEXT NOT NULL DEFAULT '',
+            sentence TEXT,
+            date_added TEXT,
+            review_count INTEGER NOT NULL DEFAULT 0,
+            last_reviewed TEXT,
+            topic TEXT NOT NULL DEFAULT 'Без темы',
+            status TEXT NOT NULL DEFAULT 'New',
+            extra TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_words_topic ON words(topic);
+        CREATE INDEX IF NOT EXISTS idx_words_status ON words(status);
+        CREATE INDEX IF NOT EXISTS idx_words_topic_status ON words(topic, status);
+
+        CREATE TABLE IF NOT EXISTS word_tags (
+            word_id INTEGER NOT NULL REFERENCES words(id) ON DELETE CASCADE,
+            tag TEXT NOT NULL,
+            tag_lower TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_word_tags_tag ON word_tags(tag_lower, word_id);
+        CREATE INDEX IF NOT EXISTS idx_word_tags_word ON word_tags(word_id);
+
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY,
+            date TEXT,
+            word_key INTEGER,
+            result TEXT,
+            test_type TEXT,
+            session_id TEXT,
+            timestamp TEXT,
+            extra TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_history_date ON history(date, result);
+        CREATE INDEX IF NOT EXISTS idx_history_type ON history(test_type, result);
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        # SQLite's built-in lower() only folds ASCII, the app searches Cyrillic too
+        self.conn.create_function("py_lower", 1, lambda s: s.lower() if s else s, deterministic=True)
+        self.conn.executescript(self.SCHEMA)
+        self.conn.commit()
+        self.migrate()
+
+    def migrate(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1:
+            with self.conn:
+                self.rekey_history()
+                self.conn.execute("PRAGMA user_version = 1")
+        if version < 2:
+            # word_key was declared TEXT, which stored the ids as strings ('1'); INTEGER
+            # affinity keeps them integers and leaves the old text keys as they are
+            columns = {row[1]: row[2] for row in self.conn.execute("PRAGMA table_info(history)")}
+            with self.conn:
+                if columns.get("word_key", "").upper() != "INTEGER":
+                    self.conn.execute("ALTER TABLE history RENAME TO history_v1")
+                    self.conn.execute("DROP INDEX IF EXISTS idx_history_date")
+                    self.conn.execute("DROP INDEX IF EXISTS idx_history_type")
+                    self.conn.execute(
+                        "CREATE TABLE history (id INTEGER PRIMARY KEY, date TEXT, word_key INTEGER, "
+                        "result TEXT, test_type TEXT, session_id TEXT, timestamp TEXT, extra TEXT)"
+                    )
+                    self.conn.execute("INSERT INTO history SELECT * FROM history_v1")
+                    self.conn.execute("DROP TABLE history_v1")
+                    self.conn.execute("CREATE INDEX idx_history_date ON history(date, result)")
+                    self.conn.execute("CREATE INDEX idx_history_type ON history(test_type, result)")
+                self.conn.execute("PRAGMA user_version = 2")
+
+    def rekey_history(self):
+        # history used to reference words by their text, now by id
+        self.conn.execute(
+            "UPDATE history SET word_key = (SELECT MIN(w.id) FROM words w WHERE w.word = history.word_key) "
+            "WHERE typeof(word_key) = 'text' AND word_key IN (SELECT word FROM words)"
+        )
+
+    def move_history(self, new_ids):
+        # {old word id: new word id}, e.g. for duplicates merged into another word
+        with self.conn:
+            self.conn.executemany("UPDATE history SET word_key = ? WHERE word_key = ?",
+                                  [(new, old) for old, new in new_ids.items()])
+
+    def close(self):
+        self.conn.close()
+
+    def is_empty(self):
+        return self.conn.execute("SELECT 1 FROM words LIMIT 1").fetchone() is None and \
+            self.conn.execute("SELECT 1 FROM history LIMIT 1").fetchone() is None
+
+    # ---- words ----
+    def _word_row(self, word):
+        extra = {k: v for k, v in word.items()
+                 if k not in self.WORD_COLUMNS and k not in ("tags", "id")}
+        return (
+            word.get("word", ""), word.get("translation", ""), word.get("sentence"),
+            word.get("date_added"), word.get("review_count", 0), word.get("last_reviewed"),
+            word.get("topic", "Без темы"), word.get("status", "New"),
+            json.dumps(extra, ensure_ascii=False) if extra else None,
+        )
+
+    def _replace_tags(self, rowid, tags):
+        self.conn.execute("DELETE FROM word_tags WHERE word_id = ?", (rowid,))
+        self.conn.executemany(
+            "INSERT INTO word_tags (word_id, tag, tag_lower) VALUES (?, ?, ?)",
+            [(rowid, t, t.lower()) for t in tags or []]
+        )
+
+    @diagnostics.traced("sqlite.upsert_words")
+    def upsert_words(self, words):
+        with self.conn:
+            for word in words:
+                row = self._word_row(word)
+                rowid = word.get("id")
+                if rowid is None:
+                    cur = self.conn.execute(
+                        "INSERT INTO words (word, translation, sentence, date_added, review_count, "
+                        "last_reviewed, topic, status, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", row
+                    )
+                    word["id"] = rowid = cur.lastrowid
+                else:
+                    self.conn.execute(
+                        "INSERT INTO words (word, translation, sentence, date_added, review_count, "
+                        "last_reviewed, topic, status, extra, id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT(id) DO UPDATE SET word = excluded.word, translation = excluded.translation, "
+                        "sentence = excluded.sentence, date_added = excluded.date_added, "
+                        "review_count = excluded.review_count, last_reviewed = excluded.last_reviewed, "
+                        "topic = excluded.topic, status = excluded.status, extra = excluded.extra",
+                        row + (rowid,)
+                    )
+                self._replace_tags(rowid, word.get("tags"))
+
+    def delete_words(self, words):
+        rowids = [(w["id"],) for w in words if w.get("id") is not None]
+        with self.conn:
+            self.conn.executemany("DELETE FROM words WHERE id = ?", rowids)
+
+    def rename_topic(self, old_topic, new_topic):
+        with self.conn:
+            self.conn.execute("UPDATE words SET topic = ? WHERE topic = ?", (new_topic, old_topic))
+
+    def load_words(self):
+        tags = {}
+        for word_id, tag in self.conn.execute("SELECT word_id, tag FROM word_tags ORDER BY rowid"):
+            tags.setdefault(word_id, []).append(tag)
+        words = []
+        for row in self.conn.execute(
+                "SELECT id, word, translation, sentence, date_added, review_count, last_reviewed, "
+                "topic, status, extra FROM words ORDER BY id"):
+            word = json.loads(row[9]) if row[9] else {}
+            word.update(zip(self.WORD_COLUMNS, row[1:9]))
+            for optional in ("sentence", "date_added"):
+                if word[optional] is None:
+                    del word[optional]
+            word["tags"] = tags.get(row[0], [])
+            word["id"] = row[0]
+            words.append(word)
+        return words
+
+    def topics(self):
+        return [r[0] for r in self.conn.execute("SELECT DISTINCT topic FROM words ORDER BY topic")]
+
+    @diagnostics.traced("sqlite.filter_word_ids")
+    def filter_word_ids(self, topic=None, tag=None, status=None, search=None):
+        clauses, params = [], []
+        if topic:
+            clauses.append("topic = ?")
+            params.append(topic)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if tag:
+            clauses.append("id IN (SELECT word_id FROM word_tags WHERE tag_lower = ?)")
+            params.append(tag.lower())
+        if search:
+            clauses.append("(instr(py_lower(word), ?) > 0 OR instr(py_lower(translation), ?) > 0)")
+            params.extend([search.lower(), search.lower()])
+        sql = "SELECT id FROM words"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        return [r[0] for r in self.conn.execute(sql + " ORDER BY id", params)]
+
+    # ---- history ----
+    @diagnostics.traced("sqlite.append_history")
+    def append_history(self, entries):
+        rows = []
+        for entry in entries:
+            extra = {k: v for k, v in entry.items() if k not in self.HISTORY_COLUMNS}
+            rows.append(tuple(entry.get(k) for k in self.HISTORY_COLUMNS) +
+                        (json.dumps(extra, ensure_ascii=False) if extra else None,))
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO history (date, word_key, result, test_type, session_id, timestamp, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+
+    def iter_history(self):
+        for row in self.conn.execute(
+                "SELECT date, word_key, result, test_type, session_id, timestamp, extra FROM history ORDER BY id"):
+            entry = json.loads(row[6]) if row[6] else {}
+            entry.update(zip(self.HISTORY_COLUMNS, row[:6]))
+            yield entry
+
+    def review_stats(self):
+        total = self.conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+        daily_correct = dict(self.conn.execute(
+            "SELECT date, COUNT(*) FROM history WHERE result = 'correct' AND date IS NOT NULL GROUP BY date"
+        ))
+        counts = {}
+        for ttype, correct, count in self.conn.execute(
+                "SELECT COALESCE(test_type, 'practice'), SUM(result = 'correct'), COUNT(*) "
+                "FROM history GROUP BY COALESCE(test_type, 'practice')"):
+            counts[ttype] = {"correct": correct, "total": count}
+        return total, daily_correct, counts
+
+    # ---- import ----
+    def import_json_logs(self, words_file, history_log=None):
+        imported_words = imported_history = 0
+        if words_file and os.path.exists(words_file):
+            with open(words_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, list):
+                words = [dict(w) for w in data if isinstance(w, dict)]
+                seen = set()
+                for w in words:
+                    # ids from the JSON file are kept so history keeps pointing at the same words
+                    if not isinstance(w.get("id"), int) or w["id"] in seen:
+                        w.pop("id", None)
+                    seen.add(w.get("id"))
+                # explicit ids first, so new rowids cannot take an id that is still to come
+                words.sort(key=lambda w: "id" not in w)
+                self.upsert_words(words)
+                imported_words = len(words)
+        if history_log is not None:
+            batch = []
+            for entry in history_log.load():
+                batch.append(entry)
+                if len(batch) >= 10000:
+                    self.append_history(batch)
+                    imported_history += len(batch)
+                    batch = []
+            if batch:
+                self.append_history(batch)
+                imported_history += len(batch)
+            with self.conn:
+                self.rekey_history()
+        return imported_words, imported_history
+
+
+# =========================
+# Search index
+# =========================
+class NgramIndex:
+    # Inverted n-gram index for case-insensitive substring search. Queries intersect the
+    # posting lists of the term's n-grams (smallest first) and only verify the survivors.
+    # With sources, the index is built on a background thread (build_async, or the first
+    # query starts it) and queries scan the documents linearly until it is ready, so the
+    # UI thread never waits for a full build.
+    FIELDS = ("word", "translation", "sentence")
+
+    def __init__(self, n=3, fields=FIELDS, sources=None):
+        self.n = n
+        self.fields = fields
+        self.postings = {}
+        self.docs = {}  # id(doc) -> (seq, doc, lowered field texts, group)
+        self._seq = 0
+        # {group: callable returning docs}
+        self.sources = dict(sources or {})
+        self.built = not self.sources
+        self._lock = Lock()
+        self._pending = None  # changes made while a background build runs: (doc, group or None)
+
+    def __len__(self):
+        return len(self.docs)
+
+    def _grams(self, text, n=None):
+        n = n or self.n
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    def _index_grams(self, text):
+        # n-grams plus bigrams, so two-letter queries are answered from postings too
+        grams = self._grams(text)
+        if self.n > 2:
+            grams |= self._grams(text, 2)
+        return grams
+
+    def snapshot_sources(self):
+        return [(group, list(source())) for group, source in self.sources.items()]
+
+    @diagnostics.traced("search.index_build")
+    def build(self):
+        # Synchronous build on the calling thread
+        self.clear()
+        self.built = True
+        for group, docs in self.snapshot_sources():
+            for doc in docs:
+                self.add(doc, group)
+
+    def build_async(self):
+        # The documents are listed here, on the caller's thread; the postings are built on a
+        # worker thread into a separate index that is swapped in together with the changes
+        # recorded meanwhile. Returns the thread, or None when built or already building.
+        with self._lock:
+            if self.built or self._pending is not None:
+                return None
+            self._pending = []
+        thread = Thread(target=self._build_in_background, args=(self.snapshot_sources(),),
+                        name="ngram-index", daemon=True)
+        thread.start()
+        return thread
+
+    @diagnostics.traced("search.index_build")
+    def _build_in_background(self, snapshot):
+        fresh = NgramIndex(self.n, self.fields)
+        try:
+            for group, docs in snapshot:
+                for doc in docs:
+                    fresh.add(doc, group)
+        except Exception as e:
+            print(f"Error building the search index: {e}")
+            with self._lock:
+                self._pending = None
+            return
+        with self._lock:
+            for doc, group in self._pending:
+                if group is None:
+                    fresh.remove(doc)
+                else:
+                    fresh.add(doc, group)
+            self.postings, self.docs, self._seq = fresh.postings, fresh.docs, fresh._seq
+            self._pending = None
+            self.built = True
+
+    def reset(self):
+        # Drops the postings so a large batch of changes is not indexed one document at a
+        # time on the caller's thread; build_async() (or the next query) rebuilds them.
+        with self._lock:
+            if self.sources and self._pending is None:
+                self.built = False
+                self.postings = {}
+                self.docs = {}
+
+    def _defer(self, doc, group):
+        # True when the change was recorded for the running build or is left to a later one
+        with self._lock:
+            if self.built:
+                return False
+            if self._pending is not None:
+                self._pending.append((doc, group))
+            return True
+
+    def add(self, doc, group="words"):
+        if not self.built and self._defer(doc, group):
+            return
+        key = id(doc)
+        old = self.docs.get(key)
+        if old is not None:
+            self._unindex(key, old[2])
+            seq = old[0]
+        else:
+            seq = self._seq
+            self._seq += 1
+
+        texts = {}
+        for field in self.fields:
+            value = doc.get(field)
+            texts[field] = str(value).lower() if value else ""
+
+        grams = set()
+        for text in texts.values():
+            grams |= self._index_grams(text)
+        postings = self.postings
+        for gram in grams:
+            posting = postings.get(gram)
+            if posting is None:
+                postings[gram] = {key}
+            else:
+                posting.add(key)
+        self.docs[key] = (seq, doc, texts, group)
+
+    update = add
+
+    def _unindex(self, key, texts):
+        for text in texts.values():
+            for gram in self._index_grams(text):
+                posting = self.postings.get(gram)
+                if posting is not None:
+                    posting.discard(key)
+                    if not posting:
+                        del self.postings[gram]
+
+    def remove(self, doc):
+        if not self.built and self._defer(doc, None):
+            return
+        entry = self.docs.pop(id(doc), None)
+        if entry is not None:
+            self._unindex(id(doc), entry[2])
+
+    def clear(self):
+        self.postings.clear()
+        self.docs.clear()
+
+    def search(self, term, fields=None, groups=("words",)):
+        term = (term or "").lower()
+        if not term:
+            return []
+        fields = fields or self.fields
+        if not self.built:
+            self.build_async()
+            return self.scan(term, fields, groups)
+
+        if len(term) < 2:
+            # single characters: scan the pre-lowered texts instead
+            candidates = self.docs.keys()
+        else:
+            postings = []
+            for gram in self._grams(term, min(len(term), self.n)):
+                posting = self.postings.get(gram)
+                if not posting:
+                    return []
+                postings.append(posting)
+            postings.sort(key=len)
+            candidates = postings[0].intersection(*postings[1:])
+
+        docs = self.docs
+        hits = []
+        for key in candidates:
+            seq, doc, texts, group = docs[key]
+            if groups is not None and group not in groups:
+                continue
+            for field in fields:
+                if term in texts.get(field, ""):
+                    hits.append((seq, doc))
+                    break
+        hits.sort(key=lambda hit: hit[0])
+        return [doc for _seq, doc in hits]
+
+    def scan(self, term, fields, groups):
+        # Linear search over the sources, same results and order as the index
+        hits = []
+        for group, docs in self.snapshot_sources():
+            if groups is not None and group not in groups:
+                continue
+            for doc in docs:
+                for field in fields:
+                    value = doc.get(field)
+                    if value and term in str(value).lower():
+                        hits.append(doc)
+                        break
+        return hits
+
+
+# =========================
+# External vocabulary files
+# =========================
+class ExternalVocabCache:
+    # Parsed copies of the extra vocabulary files in logs/, revalidated by (mtime, size).
+    # Files are classified by content: only lists of word dicts are kept, review
+    # histories and other JSON are remembered as skipped without holding their data.
+    FIELDS = ("word", "translation", "sentence")
+
+    def __init__(self, directory, exclude=(), check_interval=2.0, on_change=None):
+        self.directory = directory
+        self.exclude = {os.path.abspath(p) for p in exclude}
+        self.check_interval = check_interval
+        self.on_change = on_change
+        self.files = {}  # path -> (mtime_ns, size, kind, items, lowered texts)
+        self._last_check = None
+
+    @staticmethod
+    def classify(data):
+        if not isinstance(data, list):
+            return "other"
+        sample = [item for item in data[:50] if isinstance(item, dict)]
+        if any("word" in item for item in sample):
+            return "vocabulary"
+        if any("result" in item or "wordId" in item for item in sample):
+            return "history"
+        return "other"
+
+    def _parse(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        kind = self.classify(data)
+        if kind != "vocabulary":
+            return kind, [], []
+        items = [item for item in data if isinstance(item, dict)]
+        texts = [tuple(str(item.get(field) or "").lower() for field in self.FIELDS) for item in items]
+        return kind, items, texts
+
+    def refresh(self, force=False):
+        # Within check_interval of the last check nothing touches the disk
+        now = time.monotonic()
+        if not force and self._last_check is not None and now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+
+        changed = False
+        seen = set()
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError as e:
+            print(f"Error reading {self.directory}: {e}")
+            entries = []
+        for entry in entries:
+            if not entry.name.endswith(".json") or not entry.is_file():
+                continue
+            path = os.path.abspath(entry.path)
+            if path in self.exclude:
+                continue
+            seen.add(path)
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            cached = self.files.get(path)
+            if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+                diagnostics.count("cache.external_vocab.hits")
+                continue
+            diagnostics.count("cache.external_vocab.parses")
+            try:
+                kind, items, texts = self._parse(path)
+            except Exception as e:
+                print(f"Error reading {entry.name}: {e}")
+                kind, items, texts = "invalid", [], []
+            self.files[path] = (st.st_mtime_ns, st.st_size, kind, items, texts)
+            self._notify(cached[3] if cached else [], items)
+            changed = True
+
+        for path in [p for p in self.files if p not in seen]:
+            self._notify(self.files.pop(path)[3], [])
+            changed = True
+        return changed
+
+    def _notify(self, old_items, new_items):
+        if self.on_change is not None and (old_items or new_items):
+            self.on_change(old_items, new_items)
+
+    def items(self):
+        for _mtime, _size, _kind, items, _texts in self.files.values():
+            yield from items
+
+    def search(self, term):
+        term = (term or "").lower()
+        if not term:
+            return []
+        results = []
+        for _mtime, _size, _kind, items, texts in self.files.values():
+            for item, lowered in zip(items, texts):
+                if any(term in text for text in lowered):
+                    results.append(item)
+        return results
+
+
+# =========================
+# Topic / status indexes
+# =========================
+class FieldIndex:
+    # Groups words by the value of one field (topic, status): value -> {id(word): word}.
+    # Groups are dropped when they become empty, so the values and their counts are always
+    # current. Fields are changed in place on the word dicts, so whoever changes one calls
+    # update(word) to re-file it. A group is in filing order (a re-filed word goes last), so
+    # words() sorts it by `order`, the word's place in the vocabulary.
+    def __init__(self, field, default, source, order=None):
+        self.field = field
+        self.default = default
+        self.source = source  # callable returning the word list
+        self.order = order
+        self.groups = {}
+        self.filed = {}  # id(word) -> value the word is filed under
+        self.built = False
+
+    def key(self, word):
+        return word.get(self.field, self.default)
+
+    @diagnostics.traced("filter.field_index_build")
+    def build(self):
+        self.groups = {}
+        self.filed.clear()
+        self.built = True
+        for word in self.source():
+            self.add(word)
+
+    def ensure_built(self):
+        if not self.built:
+            self.build()
+
+    def add(self, word):
+        if not self.built:
+            return  # picked up by the lazy build
+        value = self.key(word)
+        self.groups.setdefault(value, {})[id(word)] = word
+        self.filed[id(word)] = value
+
+    def remove(self, word):
+        value = self.filed.pop(id(word), None)
+        group = self.groups.get(value)
+        if group is not None:
+            group.pop(id(word), None)
+            if not group:
+                del self.groups[value]
+
+    def update(self, word):
+        if self.built and self.filed.get(id(word)) != self.key(word):
+            self.remove(word)
+            self.add(word)
+
+    def clear(self):
+        self.built = False
+        self.groups = {}
+        self.filed.clear()
+
+    def values(self):
+        self.ensure_built()
+        return list(self.groups)
+
+    def words(self, value):
+        self.ensure_built()
+        words = list(self.groups.get(value, {}).values())
+        if self.order is not None:
+            words.sort(key=self.order)
+        return words
+
+    def count(self, value):
+        self.ensure_built()
+        return len(self.groups.get(value, ()))
+
+    def counts(self):
+        self.ensure_built()
+        return {value: len(group) for value, group in self.groups.items()}
+
+    def move(self, old, new):
+        # Re-files every word of one group under another value and sets the field on them;
+        # O(words in the group). Returns the moved words.
+        self.ensure_built()
+        group = self.groups.pop(old, None)
+        if not group or old == new:
+            if group:
+                self.groups[old] = group
+            return []
+        target = self.groups.setdefault(new, {})
+        for key, word in group.items():
+            word[self.field] = new
+            target[key] = word
+            self.filed[key] = new
+        return list(group.values())
+
+
+# =========================
+# Spaced repetition
+# =========================
+class ReviewScheduler:
+    # SM-2 scheduling: every word carries interval (days), ease, reps and due ("YYYY-MM-DD").
+    # A min-heap keyed by due date picks the next k words in O(k log n); entries are never
+    # updated in place, a reschedule pushes a new one and the old one is skipped when popped.
+    DEFAULT_EASE = 2.5
+    MIN_EASE = 1.3
+
+    def __init__(self, source):
+        self.source = source  # callable returning the word list
+        self.heap = []  # (due, seq, id(word))
+        self.current = {}  # id(word) -> (due, seq) of its valid heap entry
+        self.words = {}  # id(word) -> word
+        self.built = False
+        self._seq = 0
+
+    @staticmethod
+    def due_key(word):
+        # words never reviewed are due from the day they were added
+        return word.get("due") or (word.get("date_added") or "")[:10]
+
+    @diagnostics.traced("scheduler.build")
+    def build(self):
+        self.heap = []
+        self.current.clear()
+        self.words.clear()
+        for word in self.source():
+            self._seq += 1
+            entry = (self.due_key(word), self._seq, id(word))
+            self.heap.append(entry)
+            self.current[id(word)] = entry[:2]
+            self.words[id(word)] = word
+        heapq.heapify(self.heap)
+        self.built = True
+
+    def ensure_built(self):
+        if not self.built:
+            self.build()
+
+    def add(self, word):
+        if not self.built:
+            return  # picked up by the lazy build
+        self._seq += 1
+        due = self.due_key(word)
+        heapq.heappush(self.heap, (due, self._seq, id(word)))
+        self.current[id(word)] = (due, self._seq)
+        self.words[id(word)] = word
+
+    update = add
+
+    def add_many(self, words):
+        # one heapify instead of a push per word, for imports
+        if not self.built:
+            return
+        for word in words:
+            self._seq += 1
+            entry = (self.due_key(word), self._seq, id(word))
+            self.heap.append(entry)
+            self.current[id(word)] = entry[:2]
+            self.words[id(word)] = word
+        heapq.heapify(self.heap)
+
+    def remove(self, word):
+        self.current.pop(id(word), None)
+        self.words.pop(id(word), None)
+
+    def clear(self):
+        self.built = False
+        self.heap = []
+        self.current.clear()
+        self.words.clear()
+
+    def next_words(self, k, until=None):
+        # The k words due soonest (overdue first), optionally only up to the date `until`
+        self.ensure_built()
+        picked = []
+        kept = []
+        while self.heap and len(picked) < k:
+            due, seq, key = self.heap[0]
+            if until is not None and due > until:
+                break
+            heapq.heappop(self.heap)
+            if self.current.get(key) != (due, seq):
+                continue  # stale entry of a rescheduled or deleted word
+            kept.append((due, seq, key))
+            word = self.words[key]
+            if word.get("translation"):
+                picked.append(word)
+        for entry in kept:
+            heapq.heappush(self.heap, entry)
+        if len(self.heap) > 2 * len(self.current) + 64:
+            self.build()  # mostly stale entries, start over
+        return picked
+
+    def count_due(self, today=None):
+        # Full pass; for labels only
+        self.ensure_built()
+        today = today or datetime.now().date().isoformat()
+        return sum(1 for due, _seq in self.current.values() if due <= today)
+
+    def next_due(self):
+        self.ensure_built()
+        while self.heap:
+            due, seq, key = self.heap[0]
+            if self.current.get(key) == (due, seq):
+                return due
+            heapq.heappop(self.heap)
+        return None
+
+    def review(self, word, quality, today=None):
+        # quality 0..5 as in SM-2; below 3 the word starts over
+        today = today or datetime.now().date()
+        ease = word.get("ease", self.DEFAULT_EASE)
+        reps = word.get("reps", 0)
+        interval = word.get("interval", 0)
+        if quality >= 3:
+            if reps == 0:
+                interval = 1
+            elif reps == 1:
+                interval = 6
+            else:
+                interval = max(1, round(interval * ease))
+            reps += 1
+        else:
+            reps = 0
+            interval = 1
+        ease = max(self.MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+        word["ease"] = round(ease, 3)
+        word["reps"] = reps
+        word["interval"] = interval
+        word["due"] = (today + timedelta(days=interval)).isoformat()
+        self.update(word)
+        return word["due"]
+
+
+# =========================
+# Answer matching
+# =========================
+def bounded_edit_distance(a, b, limit):
+    # Damerau-Levenshtein (optimal string alignment) distance, or limit + 1 as soon as
+    # the distance is known to exceed `limit`; O(len * limit) in the typical case.
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) > len(b):
+        a, b = b, a
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        # only cells within `limit` of the diagonal can stay under the limit
+        low = max(1, i - limit)
+        high = min(len(b), i + limit)
+        if low > 1:
+            current[low - 1] = limit + 1
+        row_min = current[low - 1] if low > 1 else i
+        for j in range(low, high + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        for j in range(high + 1, len(b) + 1):
+            current[j] = limit + 1
+        if row_min > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return min(previous[len(b)], limit + 1)
+
+
+class AnswerMatcher:
+    # Grades a typed answer: "exact" (same after case/space/Unicode normalization), "close"
+    # (differs only in accents or by a typo or two) or "wrong". Every ",", ";" or "/"
+    # separated alternative of the expected answer counts, with and without "(...)" notes.
+    EXACT = "exact"
+    CLOSE = "close"
+    WRONG = "wrong"
+    SEPARATORS = re.compile(r"[,;/]")
+    PARENTHESES = re.compile(r"\([^)]*\)")
+
+    def __init__(self, max_cached=50000):
+        self.max_cached = max_cached
+        self._forms = {}  # expected text -> ((plain, folded), ...)
+
+    @staticmethod
+    def normalize(text):
+        text = unicodedata.normalize("NFKC", text).casefold()
+        return " ".join(text.replace("-", " ").replace("'", "").split()).strip(" .!?")
+
+    @staticmethod
+    def fold(text):
+        decomposed = unicodedata.normalize("NFKD", text)
+        return unicodedata.normalize("NFC", "".join(ch for ch in decomposed if not unicodedata.combining(ch)))
+
+    @staticmethod
+    def allowed_typos(text):
+        if len(text) <= 3:
+            return 0
+        return 1 if len(text) <= 7 else 2
+
+    def variants(self, text):
+        # one answer as typed and without its "(...)" notes, normalized
+        forms = []
+        for variant in (text, self.PARENTHESES.sub(" ", text)):
+            plain = self.normalize(variant)
+            if plain and all(plain != known for known, _folded in forms):
+                forms.append((plain, self.fold(plain)))
+        return forms
+
+    def alternatives(self, text):
+        forms = []
+        for part in [text] + self.SEPARATORS.split(text):
+            for form in self.variants(part):
+                if all(form[0] != known for known, _folded in forms):
+                    forms.append(form)
+        return tuple(forms)
+
+    def expected_forms(self, expected):
+        # the normalized forms of a word are computed once and reused for every review
+        forms = self._forms.get(expected)
+        if forms is None:
+            diagnostics.count("cache.answer_forms.misses")
+            if len(self._forms) >= self.max_cached:
+                self._forms.clear()
+            forms = self._forms[expected] = self.alternatives(expected)
+        return forms
+
+    def grade_forms(self, answers, expected_forms):
+        best = self.WRONG
+        for plain, folded in answers:
+            for expected_plain, expected_folded in expected_forms:
+                if plain == expected_plain:
+                    return self.EXACT
+                if best == self.CLOSE:
+                    continue
+                if folded == expected_folded:
+                    best = self.CLOSE
+                    continue
+                limit = self.allowed_typos(expected_folded)
+                if limit and bounded_edit_distance(folded, expected_folded, limit) <= limit:
+                    best = self.CLOSE
+        return best
+
+    def grade(self, answer, expected):
+        # Only the expected value is split into alternatives. The answer counts as one form;
+        # a typed list ("cat, dog") passes only if every part of it is an accepted alternative,
+        # so listing guesses does not earn a correct answer.
+        expected_forms = self.expected_forms(expected)
+        whole = self.grade_forms(self.variants(answer), expected_forms)
+        if whole == self.EXACT:
+            return whole
+        parts = [part for part in self.SEPARATORS.split(answer) if self.normalize(part)]
+        if len(parts) < 2:
+            return whole
+        grades = {self.grade_forms(self.variants(part), expected_forms) for part in parts}
+        if self.WRONG in grades:
+            return whole
+        return self.CLOSE if self.CLOSE in grades else self.EXACT
+
+
+# =========================
+# Import
+# =========================
+JSON_WHITESPACE = re.compile(r"[ \t\r\n]*")
+
+
+def iter_json_array(f, chunk_size=1 << 16):
+    # Elements of a top-level JSON array, decoded one at a time from chunks of the file,
+    # so memory is bounded by the largest element rather than the file size
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return not eof
+
+    def skip(chars):
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in chars:
+                pos += 1
+            if pos < len(buffer) or not fill():
+                return
+
+    skip(" \t\r\n")
+    if pos >= len(buffer) or buffer[pos] != "[":
+        raise ValueError("expected a JSON array")
+    pos += 1
+    skip(" \t\r\n")
+    if pos < len(buffer) and buffer[pos] == "]":
+        return
+    while True:
+        # exactly one element between "[" or "," and the next "," or "]"
+        skip(" \t\r\n")
+        if pos >= len(buffer):
+            raise ValueError("unterminated JSON array")
+        if buffer[pos] in ",]":
+            raise ValueError(f"unexpected {buffer[pos]!r} in JSON array")
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except ValueError:
+            if fill():
+                continue
+            raise
+        # the element is complete only once "," or "]" follows it; a number cut at the
+        # chunk boundary ("-35" of "-35.0") decodes fine but does not pass this check
+        after = JSON_WHITESPACE.match(buffer, end).end()
+        if after == len(buffer) or buffer[after] not in ",]":
+            if after == len(buffer):
+                problem = "unterminated JSON array"
+            else:
+                problem = f"unexpected {buffer[after]!r} in JSON array"
+            if fill():
+                continue
+            raise ValueError(problem)
+        closed = buffer[after] == "]"
+        pos = after + 1
+        yield item
+        if closed:
+            return
+
+
+class WordImporter:
+    # Streams rows out of a CSV (header optional), JSON array, JSON Lines or Anki TSV
+    # export (front, back[, tags]) as plain dicts; `progress` is the fraction of bytes read.
+    FORMATS = {".csv": "csv", ".json": "json", ".jsonl": "jsonl", ".ndjson": "jsonl",
+               ".tsv": "anki", ".txt": "anki"}
+    COLUMNS = ("word", "translation", "sentence", "topic", "tags")
+    HTML_TAGS = re.compile(r"<[^>]+>")
+
+    def __init__(self, path, fmt=None):
+        self.path = path
+        self.format = fmt or self.FORMATS.get(os.path.splitext(path)[1].lower())
+        if self.format is None:
+            raise ValueError(f"Unsupported file type: {os.path.basename(path)}")
+        self.size = os.path.getsize(path)
+        self._file = None
+
+    @property
+    def progress(self):
+        if self._file is None or not self.size:
+            return 0.0
+        return min(1.0, self._file.buffer.tell() / self.size)
+
+    def rows(self):
+        with open(self.path, "r", encoding="utf-8-sig", newline="") as f:
+            self._file = f
+            try:
+                yield from getattr(self, "_rows_" + self.format)(f)
+            finally:
+                self._file = None
+
+    def _rows_json(self, f):
+        for item in iter_json_array(f):
+            yield item
+
+    def _rows_jsonl(self, f):
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None  # counted as invalid
+
+    def _rows_csv(self, f):
+        reader = csv.reader(f)
+        columns = self.COLUMNS
+        for values in reader:
+            if not values:
+                continue
+            if reader.line_num == 1 and "word" in (v.strip().lower() for v in values):
+                columns = [v.strip().lower() for v in values]
+                continue
+            yield dict(zip(columns, values))
+
+    def clean_anki(self, text):
+        return html.unescape(self.HTML_TAGS.sub(" ", text.replace("<br>", " "))).strip()
+
+    def _rows_anki(self, f):
+        separator = "\t"
+        for line in f:
+            if line.startswith("#"):
+                # Anki file headers: #separator:tab, #html:true, #tags column:3, ...
+                if line.lower().startswith("#separator:"):
+                    name = line.split(":", 1)[1].strip().lower()
+                    separator = {"tab": "\t", "comma": ",", "semicolon": ";", "pipe": "|",
+                                 "space": " "}.get(name, name[:1] or "\t")
+                continue
+            values = line.rstrip("\r\n").split(separator)
+            if len(values) < 2:
+                yield None
+                continue
+            row = {"word": self.clean_anki(values[0]), "translation": self.clean_anki(values[1])}
+            if len(values) > 2 and values[2].strip():
+                row["tags"] = values[2].split()
+            yield row
+
+
+# =========================
+# Vocabulary engine
+# =========================
+class VocabularyEngine:
+    # Words, history, quiz and statistics without any UI; MainApp and cli.py drive it.
+    # on_change(*topics) is called with "words" / "history" after every mutation.
+    DEFAULT_TOPIC = "Без темы"
+    ALL_TOPICS = "Все темы"
+    # batches at least this large rebuild the search index in the background instead
+    BULK_REINDEX = 2000
+
+    def __init__(self, data_dir="logs", storage=None, fold_external=None, on_change=None):
+        self.data_dir = data_dir
+        self.on_change = on_change
+        self.word_stats = {"total": 0, "day": 0, "week": 0, "month": 0}
+        self.test_stats = {
+            "best_score": 0,
+            "average_score": 0,
+            "streak": 0,
+            "total_reviews": 0,
+            "best_day": None,
+            "accuracy_by_type": {}
+        }
+
+        self.daily_goal = 10
+        self.daily_progress = 0
+
+        os.makedirs(data_dir, exist_ok=True)
+        self.words_file = os.path.join(data_dir, "user_words.json")
+        self.history_file = os.path.join(data_dir, "training_history.jsonl")
+        self.legacy_history_file = os.path.join(data_dir, "training_history.json")
+        self.history_log = HistoryLog(self.history_file, legacy_path=self.legacy_history_file)
+
+        # "json" (default) or "sqlite"
+        self.storage_backend = (storage or os.getenv("LINGVO_STORAGE", "json")).lower()
+        self.sqlite_file = os.path.join(data_dir, "lingvo.sqlite3")
+        self.store = SQLiteStore(self.sqlite_file) if self.storage_backend == "sqlite" else None
+        if self.store is not None and self.store.is_empty():
+            try:
+                self.store.import_json_logs(self.words_file, self.history_log)
+            except Exception as e:
+                print(f"Error importing JSON logs into SQLite: {e}")
+
+        self.words = self.load_words()
+        self.search_index = NgramIndex(sources={"words": lambda: self.words})
+        self.scheduler = ReviewScheduler(lambda: self.words)
+        self.topic_index = FieldIndex("topic", self.DEFAULT_TOPIC, lambda: self.words,
+                                      order=lambda w: self.position(w["id"]))
+        self.status_index = FieldIndex("status", "New", lambda: self.words,
+                                       order=lambda w: self.position(w["id"]))
+        self._word_keys = None  # duplicate_key -> word, built on first lookup
+        self.matcher = AnswerMatcher()
+
+        # Other vocabulary files in the data dir, optionally folded into the search index
+        if fold_external is None:
+            fold_external = os.getenv("LINGVO_FOLD_EXTERNAL", "") == "1"
+        self.fold_external_search = fold_external
+        self.external_vocab = ExternalVocabCache(
+            data_dir,
+            exclude=(self.words_file,),
+            on_change=self.on_external_vocab_changed,
+        )
+        if self.fold_external_search:
+            self.search_index.sources["external"] = self.external_vocab.items
+        # Longer than the pause between quiz answers, so a quiz is not one write per answer;
+        # the app calls request_flush() when a quiz ends or is left, max_delay bounds what a crash loses
+        self.words_flush_interval = 30.0
+        self.words_max_delay = 120.0
+        self.words_writer = DebouncedJsonWriter(
+            self.words_file,
+            # a word changed during the copy is dirty again and goes out with the next write
+            snapshot=lambda: [w.to_dict() for w in list(self.words)],
+            flush_interval=self.words_flush_interval,
+            max_delay=self.words_max_delay,
+        )
+        atexit.register(self.words_writer.close)  # unregistered by close()
+        # Parsed on first use only: the statistics are persisted, so startup just counts lines
+        self._training_history = None
+        if self.ids_assigned and self.store is None:
+            self.words_writer.mark_dirty()
+            self.migrate_history_ids()
+        self.stats_file = os.path.join(data_dir, "training_stats.json")
+        self.review_stats = self.load_review_stats()
+        self.stats_writer = DebouncedJsonWriter(
+            self.stats_file, snapshot=lambda: self.review_stats.to_dict(), indent=None,
+            flush_interval=self.words_flush_interval, max_delay=self.words_max_delay,
+        )
+        atexit.register(self.stats_writer.close)
+        self.word_stats["total"] = len(self.words)
+
+    def notify(self, *topics):
+        if self.on_change is not None:
+            self.on_change(*topics)
+
+    def close(self):
+        for writer in (self.words_writer, self.stats_writer):
+            writer.close()
+            atexit.unregister(writer.close)
+        if self.store is not None:
+            self.store.close()
+
+    # =========================
+    # Words
+    # =========================
+    def ensure_word_defaults(self, word: dict) -> WordRecord:
+        if not isinstance(word, WordRecord):
+            word = WordRecord(word)
+        word.setdefault("topic", self.DEFAULT_TOPIC)
+        word.setdefault("tags", [])
+        word.setdefault("status", "New")
+        word.setdefault("review_count", 0)
+        word.setdefault("last_reviewed", None)
+        return word
+
+    @diagnostics.traced("persist.load_words")
+    def load_words(self):
+        words = []
+        try:
+            if self.store is not None:
+                words = [self.ensure_word_defaults(w) for w in self.store.load_words()]
+            elif os.path.exists(self.words_file):
+                with open(self.words_file, "r", encoding="utf-8") as f:
+                    loaded = json.load(f)
+                    if isinstance(loaded, list):
+                        # converted in place, so each parsed dict is freed as soon as its record exists
+                        for i, w in enumerate(loaded):
+                            loaded[i] = self.ensure_word_defaults(w) if isinstance(w, dict) else None
+                        words = [w for w in loaded if w is not None]
+                        del loaded
+        except Exception as e:
+            print(f"Error loading words: {e}")
+
+        # stable ids: kept from the file, assigned once to words that do not have one yet
+        self.words_by_id = {}
+        self.next_id = 1 + max((w["id"] for w in words if isinstance(w.get("id"), int)), default=0)
+        self.ids_assigned = 0
+        for w in words:
+            if not isinstance(w.get("id"), int) or w["id"] in self.words_by_id:
+                self.assign_id(w)
+                self.ids_assigned += 1
+            self.words_by_id[w["id"]] = w
+        self._positions = None
+        return words
+
+    def assign_id(self, word):
+        word["id"] = self.next_id
+        self.next_id += 1
+        return word["id"]
+
+    def position(self, word_id):
+        # id -> index in self.words. The map holds the positions from its last build; single
+        # deletes are recorded in _removed (sorted, in those same positions), so an entry's
+        # current index is its position minus the removals before it. The map is rebuilt
+        # once the removals grow to a fraction of the list, or if an entry does not check out.
+        positions = self._positions
+        if positions is not None:
+            p = positions.get(word_id)
+            if p is not None:
+                p -= bisect.bisect_left(self._removed, p)
+                if p < len(self.words) and self.words[p].get("id") == word_id:
+                    return p
+        self._positions = positions = {w["id"]: i for i, w in enumerate(self.words)}
+        self._removed = []
+        return positions.get(word_id)
+
+    def _remove_at(self, word_id):
+        # del self.words[position] that keeps the position map valid without a rebuild
+        p = self.position(word_id)
+        del self.words[p]
+        bisect.insort(self._removed, self._positions.pop(word_id))
+        if len(self._removed) > 64 + len(self.words) // 16:
+            self._positions = None
+
+    def migrate_history_ids(self):
+        # One-time rewrite of history entries that still name the word instead of its id
+        if self.store is not None:
+            return
+        try:
+            history = self.history_log.load()
+            ids = {}
+            for w in self.words:
+                ids.setdefault(w.get("word"), w["id"])
+            changed = 0
+            for entry in history:
+                word_id = ids.get(entry.get("wordId")) if isinstance(entry.get("wordId"), str) else None
+                if word_id is not None:
+                    entry["wordId"] = word_id
+                    changed += 1
+            if changed or self.history_log.needs_compaction():
+                self.history_log.compact(history)
+            self._training_history = history
+        except Exception as e:
+            print(f"Error migrating history: {e}")
+
+    @diagnostics.traced("persist.save_words")
+    def save_words(self, changed=None):
+        # JSON: coalesced and written in the background, see DebouncedJsonWriter.
+        # SQLite: only the changed words are written (all of them if not given).
+        if self.store is not None:
+            try:
+                changed = self.words if changed is None else changed
+                self.store.upsert_words(changed)
+            except Exception as e:
+                print(f"Error saving words: {e}")
+            self.notify("words")
+            return
+        self.words_writer.mark_dirty()
+        self.notify("words")
+
+    def flush_words(self):
+        return self.words_writer.flush()
+
+    def flush(self):
+        # Writes pending words and statistics now and waits for it (tests, the CLI)
+        self.words_writer.flush()
+        self.stats_writer.flush()
+
+    def request_flush(self):
+        # Same without blocking: the writer threads write right away, e.g. when a quiz ends
+        self.words_writer.request_flush()
+        self.stats_writer.request_flush()
+
+    def new_word(self, word, translation, sentence="", topic="", tags=()):
+        return self.ensure_word_defaults({
+            "word": word.capitalize(),
+            "translation": translation,
+            "sentence": (sentence or "").capitalize(),
+            "date_added": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "review_count": 0,
+            "last_reviewed": None,
+            "topic": topic or self.DEFAULT_TOPIC,
+            "tags": list(tags)
+        })
+
+    def _register(self, word, schedule=True):
+        if not isinstance(word.get("id"), int) or word["id"] in self.words_by_id:
+            self.assign_id(word)
+        self.words.append(word)
+        self.words_by_id[word["id"]] = word
+        if self._positions is not None:
+            # every removal so far was before the end of the list
+            self._positions[word["id"]] = len(self.words) - 1 + len(self._removed)
+        self.search_index.add(word)
+        if schedule:
+            self.scheduler.add(word)
+        self.topic_index.add(word)
+        self.status_index.add(word)
+        self._index_key(word)
+
+    def add_words(self, new_words, count_today=True):
+        # one persistence write for the whole batch
+        new_words = [self.ensure_word_defaults(w) for w in new_words]
+        bulk = len(new_words) >= self.BULK_REINDEX
+        if bulk:
+            # indexing every word on the caller's (UI) thread is the slow part of an import
+            self.search_index.reset()
+        for new_word in new_words:
+            self._register(new_word, schedule=not bulk)
+        if bulk:
+            self.scheduler.add_many(new_words)
+            self.search_index.build_async()
+        self.word_stats["total"] = len(self.words)
+        if count_today:
+            self.word_stats["day"] += len(new_words)
+            self.daily_progress += len(new_words)
+        if new_words:
+            self.save_words(new_words)
+        return new_words
+
+    def add_word(self, word, translation, sentence="", topic="", tags=(), merge=False):
+        # A word that is already in the vocabulary (same word and translation, ignoring case
+        # and spacing) is not added again: it is returned as is, or with merge=True the new
+        # sentence, topic and tags are merged into it
+        if not word or not translation:
+            return None
+        existing = self.find_duplicate(word, translation)
+        if existing is not None:
+            return self.merge_word(existing, sentence, topic, tags) if merge else existing
+        return self.add_words([self.new_word(word, translation, sentence, topic, tags)])[0]
+
+    @staticmethod
+    def duplicate_key(word, translation):
+        return " ".join(str(word).casefold().split()), " ".join(str(translation).casefold().split())
+
+    @property
+    def word_keys(self):
+        if self._word_keys is None:
+            self._word_keys = {}
+            for w in self.words:
+                self._word_keys.setdefault(self.duplicate_key(w.get("word", ""), w.get("translation", "")), w)
+        return self._word_keys
+
+    def _index_key(self, word):
+        if self._word_keys is not None:
+            self._word_keys.setdefault(self.duplicate_key(word.get("word", ""), word.get("translation", "")), word)
+
+    def _unindex_key(self, word):
+        if self._word_keys is not None:
+            key = self.duplicate_key(word.get("word", ""), word.get("translation", ""))
+            if self._word_keys.get(key) is word:
+                del self._word_keys[key]
+
+    def find_duplicate(self, word, translation):
+        return self.word_keys.get(self.duplicate_key(word, translation))
+
+    STATUS_RANK = {"New": 0, "Learning": 1, "Mastered": 2}
+
+    def merge_fields(self, target, sentence="", topic="", tags=(), source=None):
+        # Folds another entry of the same word into `target`: tags are united, new example
+        # sentences appended, a real topic wins over the default one. With `source` (dedup
+        # pass) the review progress of the more advanced copy is kept as well.
+        merged_tags = list(target.get("tags", ()))
+        known = {t.casefold() for t in merged_tags}
+        for tag in tags:
+            if tag.casefold() not in known:
+                merged_tags.append(tag)
+                known.add(tag.casefold())
+        if len(merged_tags) != len(target.get("tags", ())):
+            target["tags"] = merged_tags
+        sentence = (sentence or "").strip()
+        if sentence:
+            current = target.get("sentence") or ""
+            if sentence.casefold() not in current.casefold():
+                target["sentence"] = f"{current}\n{sentence}" if current else sentence
+        if topic and topic != self.DEFAULT_TOPIC and target.get("topic", self.DEFAULT_TOPIC) == self.DEFAULT_TOPIC:
+            target["topic"] = topic
+        if source is not None:
+            if source.get("review_count", 0) > target.get("review_count", 0):
+                for key in ("review_count", "last_reviewed", "interval", "ease", "reps", "due"):
+                    if key in source:
+                        target[key] = source[key]
+            if self.STATUS_RANK.get(source.get("status"), 0) > self.STATUS_RANK.get(target.get("status"), 0):
+                target["status"] = source["status"]
+            if (source.get("date_added") or "9") < (target.get("date_added") or "9"):
+                target["date_added"] = source["date_added"]
+        return target
+
+    def merge_word(self, existing, sentence="", topic="", tags=()):
+        self.merge_fields(existing, (sentence or "").capitalize(), topic, tags)
+        self.topic_index.update(existing)
+        self.status_index.update(existing)
+        self.search_index.update(existing)
+        self.save_words([existing])
+        return existing
+
+    def dedupe(self):
+        # One-shot pass over the vocabulary: later copies are merged into the first one and
+        # removed. Returns the number of removed words.
+        first = {}
+        merged = {}
+        removed = []
+        new_ids = {}
+        for w in self.words:
+            key = self.duplicate_key(w.get("word", ""), w.get("translation", ""))
+            target = first.setdefault(key, w)
+            if target is not w:
+                self.merge_fields(target, w.get("sentence", ""), w.get("topic", ""), w.get("tags", []), source=w)
+                merged[id(target)] = target
+                removed.append(w)
+                new_ids[w["id"]] = target["id"]
+        if not removed:
+            return 0
+        removed_ids = {id(w) for w in removed}
+        merged = list(merged.values())
+        self.words[:] = [w for w in self.words if id(w) not in removed_ids]
+        self._positions = None
+        for w in removed:
+            self.words_by_id.pop(w["id"], None)
+            self.search_index.remove(w)
+            self.scheduler.remove(w)
+            self.topic_index.remove(w)
+            self.status_index.remove(w)
+        for w in merged:
+            self.search_index.update(w)
+            self.scheduler.update(w)
+            self.topic_index.update(w)
+            self.status_index.update(w)
+        self._word_keys = first
+        if self.store is not None:
+            self.store.delete_words(removed)
+            self.save_words(merged)
+        else:
+            self.save_words()
+        self.move_history(new_ids)
+        self.word_stats["total"] = len(self.words)
+        return len(removed)
+
+    def move_history(self, new_ids):
+        # Points the reviews of removed words at the word they were merged into
+        try:
+            if self.store is not None:
+                self.store.move_history(new_ids)
+                return
+            history = self.training_history
+            changed = 0
+            for entry in history:
+                new_id = new_ids.get(entry.get("wordId"))
+                if new_id is not None:
+                    entry["wordId"] = new_id
+                    changed += 1
+            if changed:
+                self.history_log.compact(history)
+        except Exception as e:
+            print(f"Error updating history: {e}")
+
+    def word_from_row(self, row, topic="", date_added=None):
+        # A validated word dict for an imported row, or None if it has no word/translation
+        if not isinstance(row, dict):
+            return None
+        word = str(row.get("word") or "").strip()
+        translation = str(row.get("translation") or "").strip()
+        if not word or not translation:
+            return None
+        # imported words get fresh ids
+        new_word = {k: v for k, v in row.items() if k not in ("id", "_rowid", "") and v not in (None, "")}
+        new_word["word"] = word
+        new_word["translation"] = translation
+        tags = row.get("tags") or []
+        if isinstance(tags, str):
+            tags = [t.strip() for t in re.split(r"[,;]", tags) if t.strip()]
+        new_word["tags"] = [str(t) for t in tags] if isinstance(tags, list) else []
+        if topic:
+            new_word["topic"] = topic
+        if "date_added" not in new_word:
+            new_word["date_added"] = date_added or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return self.ensure_word_defaults(new_word)
+
+    def read_import(self, path, fmt=None, topic="", progress=None, progress_every=2000):
+        # Safe to call from a worker thread: it only reads self.words. Returns the new words
+        # (duplicates of the vocabulary and within the file dropped) and counts; commit them
+        # with add_words(words, count_today=False).
+        importer = WordImporter(path, fmt)
+        seen = {self.duplicate_key(w.get("word", ""), w.get("translation", "")) for w in list(self.words)}
+        new_words = []
+        counts = {"rows": 0, "added": 0, "duplicates": 0, "invalid": 0}
+        date_added = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for row in importer.rows():
+            counts["rows"] += 1
+            word = self.word_from_row(row, topic, date_added)
+            if word is None:
+                counts["invalid"] += 1
+            else:
+                key = self.duplicate_key(word["word"], word["translation"])
+                if key in seen:
+                    counts["duplicates"] += 1
+                else:
+                    seen.add(key)
+                    new_words.append(word)
+            if progress is not None and counts["rows"] % progress_every == 0:
+                progress(importer.progress, counts)
+        counts["added"] = len(new_words)
+        if progress is not None:
+            progress(1.0, counts)
+        return new_words, counts
+
+    def export_words(self, path):
+        atomic_write_json(path, [w.to_dict() for w in list(self.words)], indent=2)
+        return len(self.words)
+
+    def words_missing_translation(self, texts, topic):
+        # Words for the given texts that still need a translation; unknown texts become new words
+        known = {w.get("word", "").lower(): w for w in self.words}
+        targets = []
+        for text in dict.fromkeys(t for t in texts if t):
+            word = known.get(text.lower())
+            if word is None:
+                word = self.ensure_word_defaults({
+                    "word": text.capitalize(),
+                    "translation": "",
+                    "date_added": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    "topic": topic,
+                })
+                self._register(word)
+                known[text.lower()] = word
+            if not word.get("translation"):
+                targets.append(word)
+        self.word_stats["total"] = len(self.words)
+        return targets
+
+    def fill_translations(self, words, results):
+        # words deleted while the batch was running are neither re-indexed nor written back
+        words = [w for w in words if self.words_by_id.get(w.get("id")) is w]
+        changed = []
+        for word in words:
+            translation = results.get(word["word"])
+            if translation and not word.get("translation"):
+                self._unindex_key(word)
+                word["translation"] = translation
+                self._index_key(word)
+                self.search_index.update(word)
+                changed.append(word)
+        if words:
+            # one persistence write for the whole batch (also keeps words added from a file)
+            self.save_words(words)
+        return changed
+
+    def delete_word(self, word):
+        return self.delete_words([word])
+
+    def delete_words(self, words):
+        # Any number of words in one pass over the list and one persistence write
+        targets = {}
+        for w in words:
+            if self.words_by_id.get(w.get("id")) is w:
+                targets[w["id"]] = w
+        if not targets:
+            return 0
+        if len(targets) == 1:
+            self._remove_at(next(iter(targets)))
+        else:
+            self.words[:] = [w for w in self.words if w["id"] not in targets]
+            self._positions = None
+        for word_id, w in targets.items():
+            del self.words_by_id[word_id]
+            self.search_index.remove(w)
+            self.scheduler.remove(w)
+            self.topic_index.remove(w)
+            self.status_index.remove(w)
+            self._unindex_key(w)
+        self.word_stats["total"] = len(self.words)
+        if self.store is not None:
+            try:
+                self.store.delete_words(list(targets.values()))
+            except Exception as e:
+                print(f"Error deleting words: {e}")
+            self.notify("words")
+        else:
+            self.save_words()
+        return len(targets)
+
+    # =========================
+    # Topics / Filters / Search
+    # =========================
+    def get_topics(self):
+        return sorted(self.topic_index.values())
+
+    def topic_counts(self):
+        # topic -> number of words, in order of first use
+        return self.topic_index.counts()
+
+    def status_counts(self):
+        return self.status_index.counts()
+
+    def count_words(self, topic=ALL_TOPICS):
+        if topic == self.ALL_TOPICS:
+            return len(self.words)
+        return self.topic_index.count(topic)
+
+    def rename_topic(self, old_topic, new_topic):
+        # only the words of the topic are touched, and persisted with one write
+        if not new_topic or new_topic == old_topic:
+            return
+        moved = self.topic_index.move(old_topic, new_topic)
+        if not moved:
+            return
+        if self.store is not None:
+            try:
+                self.store.rename_topic(old_topic, new_topic)
+            except Exception as e:
+                print(f"Error renaming topic: {e}")
+        else:
+            self.words_writer.mark_dirty()
+        self.notify("words")
+
+    def delete_topic(self, topic):
+        self.rename_topic(topic, self.DEFAULT_TOPIC)
+
+    @diagnostics.traced("search.words")
+    def search_words(self, term, fields=("word", "translation")):
+        return self.search_index.search(term, fields=fields)
+
+    @diagnostics.traced("search.all")
+    def search_all(self, term):
+        # own words plus the other vocabulary files in the data dir
+        self.external_vocab.refresh()
+        if self.fold_external_search:
+            return self.search_index.search(term, groups=None)
+        return self.search_words(term, fields=NgramIndex.FIELDS) + self.external_vocab.search(term)
+
+    def related_words(self, message, limit=8):
+        # the learner's own words that the message mentions, best matches first
+        found = []
+        seen = set()
+        terms = []
+        for term in re.findall(r"\w{3,}", message.lower()):
+            if term not in terms:
+                terms.append(term)
+        for term in terms[:12]:
+            for w in self.search_words(term):
+                key = id(w)
+                if key in seen:
+                    continue
+                seen.add(key)
+                found.append((w.get("word", ""), w.get("translation", "")))
+                if len(found) >= limit:
+                    return found
+        return found
+
+    def on_external_vocab_changed(self, old_items, new_items):
+        if not self.fold_external_search:
+            return
+        for item in old_items:
+            self.search_index.remove(item)
+        for item in new_items:
+            self.search_index.add(item, "external")
+
+    @diagnostics.traced("filter.words")
+    def filter_words(self, topic="", tag="", status="", search=""):
+        topic = "" if topic == "All" else topic
+        status = "" if status == "All" else status
+        # the search, topic or status index narrows the set first, the remaining filters run
+        # on those words only
+        if search:
+            filtered_words = self.search_words(search)
+        elif tag and self.store is not None:
+            ids = self.store.filter_word_ids(topic=topic, tag=tag, status=status)
+            return [self.words_by_id[i] for i in ids]
+        elif topic:
+            filtered_words = self.topic_index.words(topic)
+        elif status:
+            filtered_words = self.status_index.words(status)
+        else:
+            filtered_words = self.words[:]
+        if topic:
+            filtered_words = [w for w in filtered_words if w.get("topic", self.DEFAULT_TOPIC) == topic]
+        if tag:
+            filtered_words = [w for w in filtered_words if tag.lower() in [t.lower() for t in w.get("tags", [])]]
+        if status:
+            filtered_words = [w for w in filtered_words if w.get("status", "New") == status]
+        return filtered_words
+
+    def get_today_words(self):
+        # due today or overdue, most overdue first
+        return self.scheduler.next_words(self.daily_goal, until=datetime.now().date().isoformat())
+
+    # =========================
+    # Quiz
+    # =========================
+    def make_quiz(self, words=None, topic=ALL_TOPICS, size=10, rng=random):
+        # a list of (word, direction, prompt, answer); direction is "forward" (word -> translation)
+        # or "reverse". The words due soonest are asked, overdue ones first.
+        if words is None and topic == self.ALL_TOPICS:
+            words = self.scheduler.next_words(size)
+        else:
+            # a topic's words come from the topic index: popping the global heap until enough
+            # of them turn up would walk the whole deck for a small topic
+            if words is None:
+                words = self.topic_index.words(topic)
+            words = heapq.nsmallest(size, (w for w in words if w.get("translation")), key=ReviewScheduler.due_key)
+        words = list(words)
+        rng.shuffle(words)
+        questions = []
+        for word in words:
+            if rng.choice([True, False]):
+                questions.append((word, "forward", word["word"], word["translation"]))
+            else:
+                questions.append((word, "reverse", word["translation"], word["word"]))
+        return questions
+
+    # SM-2 quality for each grade: a close answer counts, but the word comes back sooner
+    GRADE_QUALITY = {AnswerMatcher.EXACT: 5, AnswerMatcher.CLOSE: 3, AnswerMatcher.WRONG: 1}
+
+    def check_answer(self, word, answer, expected, test_type="practice"):
+        # returns the grade, see AnswerMatcher
+        grade = self.matcher.grade(answer, expected)
+        correct = grade != AnswerMatcher.WRONG
+        if correct:
+            word["review_count"] = word.get("review_count", 0) + 1
+            word["status"] = "Learning" if word["review_count"] < 3 else "Mastered"
+        else:
+            word["status"] = word.get("status", "New")
+        self.status_index.update(word)
+        word["last_reviewed"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.scheduler.review(word, self.GRADE_QUALITY[grade])
+        self.log_review(word, correct, test_type=test_type, grade=grade)
+        self.save_words([word])
+        return grade
+
+    def record_score(self, score):
+        if score > self.test_stats["best_score"]:
+            self.test_stats["best_score"] = score
+        if self.test_stats["average_score"] == 0:
+            self.test_stats["average_score"] = score
+        else:
+            self.test_stats["average_score"] = (self.test_stats["average_score"] + score) // 2
+        self.notify("history")
+
+    # =========================
+    # History / Statistics
+    # =========================
+    @property
+    def training_history(self):
+        if self._training_history is None:
+            self._training_history = self.load_history()
+        return self._training_history
+
+    @diagnostics.traced("persist.load_history")
+    def load_history(self):
+        if self.store is not None:
+            # Statistics are aggregated in SQL, only this session's reviews are kept in memory
+            return []
+        try:
+            history = self.history_log.load()
+            if self.history_log.needs_compaction():
+                self.history_log.compact(history)
+            return history
+        except Exception as e:
+            print(f"Error loading history: {e}")
+        return []
+
+    def save_history(self):
+        # Full rewrite (compaction); the hot path only appends via log_review
+        try:
+            self.history_log.compact(self.training_history)
+        except Exception as e:
+            print(f"Error saving history: {e}")
+
+    @diagnostics.traced("stats.load")
+    def load_review_stats(self):
+        # Persisted aggregates are trusted only if they cover exactly the stored history
+        try:
+            if self.store is not None:
+                expected = self.store.conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+            else:
+                expected = self.history_log.count_entries()
+            if os.path.exists(self.stats_file):
+                with open(self.stats_file, "r", encoding="utf-8") as f:
+                    stats = StatsAggregator.from_dict(json.load(f))
+                if stats is not None and stats.total == expected:
+                    return stats
+        except Exception as e:
+            print(f"Error loading statistics: {e}")
+
+        if self.store is not None:
+            stats = StatsAggregator.from_counts(*self.store.review_stats())
+        else:
+            stats = StatsAggregator.from_entries(self.training_history)
+        try:
+            atomic_write_json(self.stats_file, stats.to_dict())
+        except Exception as e:
+            print(f"Error saving statistics: {e}")
+        return stats
+
+    @diagnostics.traced("stats.log_review")
+    def log_review(self, word: dict, correct: bool, test_type: str = "practice", grade=None):
+        entry = {
+            "date": datetime.now().strftime("%Y-%m-%d"),
+            "wordId": word.get("id"),
+            "result": "correct" if correct else "incorrect",
+            "testType": test_type,
+            "sessionId": datetime.now().strftime("%Y%m%d%H%M%S"),
+            "timestamp": datetime.now().isoformat()
+        }
+        if grade is not None:
+            entry["grade"] = grade
+        if self._training_history is not None:
+            self._training_history.append(entry)
+        try:
+            if self.store is not None:
+                self.store.append_history([entry])
+            else:
+                self.history_log.append(entry)
+        except Exception as e:
+            print(f"Error saving history: {e}")
+        self.review_stats.add(entry)
+        self.stats_writer.mark_dirty()
+        self.notify("history")
+
+    @diagnostics.traced("stats.update")
+    def update_statistics(self):
+        stats = self.review_stats
+        self.test_stats["total_reviews"] = stats.total
+        self.test_stats["streak"] = stats.streak(self.daily_goal)
+        self.test_stats["best_day"] = dict(stats.best_day) if stats.best_day else None
+        self.test_stats["accuracy_by_type"] = stats.accuracy()
+        return self.test_stats
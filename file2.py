@@ -1,17 +1,266 @@
-import customtkinter as ctk
-import json
-import os
-import requests
-import httpx
-from bs4 import BeautifulSoup
-import pyperclip
-from datetime import datetime, timedelta
-from threading import Thread
-import random
+import time
+
+STARTUP_STARTED = time.perf_counter()
+
+import customtkinter as ctk  # noqa: E402
+import json  # noqa: E402
+import os  # noqa: E402
+from threading import Thread  # noqa: E402
+from tkinter import filedialog, messagebox  # noqa: E402
+
+import diagnostics  # noqa: E402
+from engine import VocabularyEngine  # noqa: E402
+from services import (  # noqa: E402
+    TRANSLATE_URL, BatchTranslator, ChatStream, ConversationStore, HttpClientPool, TranslationCache,
+    extract_translation, iter_sse_deltas, translate_params,
+)
+
+# httpx (with asyncio, in services.py), bs4 and pyperclip are imported where they are used:
+# together they add ~100 ms to startup and are only needed once the translator or the AI
+# chat is used.
+
+
+# =========================
+# Startup timing
+# =========================
+class StartupTimer:
+    # Per-phase startup report for LINGVO_STARTUP_TIMING=1, measured from the first line
+    # of this module. The budget is for time to first window on a low-end laptop.
+    BUDGET_MS = 1000
+
+    def __init__(self, started, enabled=False, budget_ms=BUDGET_MS):
+        self.started = started
+        self.enabled = enabled
+        self.budget_ms = budget_ms
+        self.phases = []
+        self.finished = False
+        self._last = started
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self._last) * 1000))
+        self._last = now
+
+    def total_ms(self):
+        return (self._last - self.started) * 1000
+
+    def report(self):
+        self.finished = True
+        if not self.enabled:
+            return
+        total = self.total_ms()
+        for phase, ms in self.phases:
+            print(f"[startup] {phase:<13} {ms:8.1f} ms")
+        verdict = "within" if total <= self.budget_ms else "OVER"
+        print(f"[startup] {'first window':<13} {total:8.1f} ms ({verdict} the {self.budget_ms} ms budget)")
+
+
+# =========================
+# Widgets
+# =========================
+class VirtualList(ctk.CTkFrame):
+    # Scrollable list that only materializes the visible rows. A fixed pool of row
+    # widgets (create_row) is rebound to other items (bind_row) while scrolling, so
+    # opening or scrolling the list costs the same for 10 items or 100k.
+    def __init__(self, master, create_row, bind_row, row_height=60, **kwargs):
+        super().__init__(master, **kwargs)
+        self.create_row = create_row
+        self.bind_row = bind_row
+        self.row_height = row_height
+        self.items = []
+        self.top = 0
+        self.rows = []
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+
+        self.body = ctk.CTkFrame(self, fg_color="transparent")
+        self.body.grid(row=0, column=0, sticky="nsew", padx=2, pady=2)
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.message_label = ctk.CTkLabel(self.body, text="", font=("Arial", 14))
+
+        self.body.bind("<Configure>", lambda _event: self._ensure_pool())
+        self._bind_wheel(self.body)
+        self._bind_wheel(self.message_label)
+
+    def _bind_wheel(self, widget):
+        # CTk widgets forward bind() to their internal canvas/label, so only recurse into CTk children
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            widget.bind(sequence, self._on_wheel, add="+")
+        for child in widget.winfo_children():
+            if isinstance(child, ctk.CTkBaseClass):
+                self._bind_wheel(child)
+
+    def visible_count(self):
+        height = self.body.winfo_height()
+        if height <= 1:
+            height = int(self.body.cget("height") or self.row_height)
+        return max(1, height // self.row_height + 1)
+
+    def _ensure_pool(self):
+        needed = self.visible_count()
+        while len(self.rows) < needed:
+            row = self.create_row(self.body)
+            self._bind_wheel(row)
+            self.rows.append(row)
+        self.render()
+
+    def set_items(self, items, message=""):
+        self.items = items
+        self.top = 0
+        if items or not message:
+            self.message_label.place_forget()
+        else:
+            self.message_label.configure(text=message)
+            self.message_label.place(relx=0.5, y=20, anchor="n")
+        self._ensure_pool()
+
+    def show_message(self, message):
+        self.set_items([], message=message)
+
+    def scroll_to(self, top):
+        max_top = max(0, len(self.items) - self.visible_count() + 1)
+        self.top = max(0, min(int(top), max_top))
+        self.render()
+
+    @diagnostics.traced("render.list_rows")
+    def render(self):
+        for i, row in enumerate(self.rows):
+            index = self.top + i
+            if index < len(self.items):
+                self.bind_row(row, self.items[index])
+                row.place(x=0, y=i * self.row_height, relwidth=1, height=self.row_height - 4)
+            else:
+                row.place_forget()
+        total = len(self.items)
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + self.visible_count() - 1) / total))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self.scroll_to(float(value) * len(self.items))
+        elif action == "scroll":
+            value = float(value)
+            direction = (value > 0) - (value < 0)
+            step = self.visible_count() - 1 if unit == "pages" else 3
+            self.scroll_to(self.top + direction * step)
+
+    def _on_wheel(self, event):
+        if getattr(event, "num", None) == 4:
+            delta = -1
+        elif getattr(event, "num", None) == 5:
+            delta = 1
+        else:
+            delta = -1 if event.delta > 0 else 1
+        self.scroll_to(self.top + delta * 3)
+
+
+class ScreenManager:
+    # Builds every screen once into its own frame and keeps it alive. Navigation hides the
+    # current frame and shows the next one; a screen's refresh() runs only when data it
+    # depends on changed (see notify) since it was last shown.
+    def __init__(self, container):
+        self.container = container
+        self.screens = {}
+        self.frames = {}
+        self.versions = {}
+        self.seen = {}
+        self.current = None
+        self.transient = None
+        self.transient_on_hide = None
+        self.timing = os.getenv("LINGVO_SCREEN_TIMING", "") == "1"
+        self.last_switch_ms = None
+
+    def register(self, name, build, refresh=None, depends=(), on_show=None, on_hide=None):
+        self.screens[name] = {
+            "build": build, "refresh": refresh, "depends": tuple(depends),
+            "on_show": on_show, "on_hide": on_hide,
+        }
+
+    def notify(self, *topics):
+        for topic in topics:
+            self.versions[topic] = self.versions.get(topic, 0) + 1
+        # the visible screen is updated right away, hidden ones on their next show
+        if self.current in self.screens and self._is_stale(self.current):
+            self._refresh(self.current)
+
+    def _versions_for(self, name):
+        return tuple(self.versions.get(topic, 0) for topic in self.screens[name]["depends"])
+
+    def _is_stale(self, name):
+        return self.seen.get(name) != self._versions_for(name)
+
+    def _refresh(self, name):
+        self.seen[name] = self._versions_for(name)
+        refresh = self.screens[name]["refresh"]
+        if refresh is not None:
+            with diagnostics.span("render.refresh", name):
+                refresh()
+
+    def _hide_current(self):
+        if self.transient is not None:
+            self.transient.destroy()
+            self.transient = None
+            on_hide, self.transient_on_hide = self.transient_on_hide, None
+            if on_hide is not None:
+                on_hide()
+        elif self.current in self.frames:
+            self.frames[self.current].pack_forget()
+            on_hide = self.screens[self.current]["on_hide"]
+            if on_hide is not None:
+                on_hide()
+
+    def show(self, name):
+        started = time.perf_counter()
+        if self.current == name and self.transient is None:
+            if self._is_stale(name):
+                self._refresh(name)
+            return self.frames[name]
+
+        self._hide_current()
+        spec = self.screens[name]
+        frame = self.frames.get(name)
+        if frame is None:
+            frame = ctk.CTkFrame(self.container, fg_color="transparent", corner_radius=0)
+            self.frames[name] = frame
+            with diagnostics.span("render.build", name):
+                spec["build"](frame)
+            self._refresh(name)
+        elif self._is_stale(name):
+            self._refresh(name)
+        if spec["on_show"] is not None:
+            spec["on_show"]()
+        frame.pack(fill="both", expand=True)
+        self.current = name
+        self._report(name, started)
+        return frame
+
+    def show_transient(self, name, on_hide=None):
+        # One-off screens (quiz, results) are still rebuilt each time
+        started = time.perf_counter()
+        self._hide_current()
+        self.transient_on_hide = on_hide
+        self.transient = ctk.CTkFrame(self.container, fg_color="transparent", corner_radius=0)
+        self.transient.pack(fill="both", expand=True)
+        self.current = name
+        self.container.after_idle(lambda: self._report(name, started))
+        return self.transient
+
+    def _report(self, name, started):
+        if not self.timing:
+            return
+        self.container.update_idletasks()
+        self.last_switch_ms = (time.perf_counter() - started) * 1000
+        print(f"[screens] {name}: {self.last_switch_ms:.1f} ms")
 
 
 class MainApp(ctk.CTk):
     def __init__(self):
+        self.startup = StartupTimer(STARTUP_STARTED, enabled=os.getenv("LINGVO_STARTUP_TIMING", "") == "1")
+        self.startup.mark("imports")
         super().__init__()
         self.title("LingvoMaster Pro")
         self.geometry("1000x650")
@@ -21,40 +270,51 @@ class MainApp(ctk.CTk):
         ctk.set_appearance_mode("dark")
         ctk.set_default_color_theme("blue")
 
+        self.startup.mark("window")
+
         # Data + UI
         self.initialize_data()
         self.setup_main_ui()
+        self.startup.mark("main screen")
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.bind("<Map>", self.on_first_map, add="+")
+
+    def on_first_map(self, event):
+        if event.widget is self and not self.startup.finished:
+            # after_idle: the first frame has been drawn by the time this runs
+            self.after_idle(self.finish_startup)
+
+    def finish_startup(self):
+        if self.startup.finished:
+            return
+        self.startup.mark("first paint")
+        self.startup.report()
+        # search scans linearly until the index is ready, so the first query never waits for it
+        self.engine.search_index.build_async()
+        if diagnostics.ENABLED:
+            self.start_diagnostics()
 
     # =========================
     # Data / Storage
     # =========================
     def initialize_data(self):
-        self.word_stats = {"total": 0, "day": 0, "week": 0, "month": 0}
-        self.test_stats = {
-            "best_score": 0,
-            "average_score": 0,
-            "streak": 0,
-            "total_reviews": 0,
-            "best_day": None,
-            "accuracy_by_type": {}
-        }
-
-        self.daily_goal = 10
-        self.daily_progress = 0
-
-        os.makedirs("logs", exist_ok=True)
-        self.words_file = "logs/user_words.json"
-        self.history_file = "logs/training_history.json"
-
-        self.words = self.load_words()
-        self.training_history = self.load_history()
-        self.word_stats["total"] = len(self.words)
+        self.engine = VocabularyEngine("logs", on_change=self.notify_data_changed)
+        self.startup.mark("data")
 
         self.last_selected_topic = "Все темы"
 
         # AI Chat config (лучше держать ключ в переменной окружения)
         self.api_url = "https://openrouter.ai/api/v1/chat/completions"
         self.api_key = os.getenv("OPENROUTER_API_KEY", "")  # <- положи ключ в переменную окружения
+        self.ai_stream = None
+        self.ai_flush_interval_ms = 50
+        self.conversation = ConversationStore(
+            system_prompt=(
+                "You are a friendly language learning assistant. Explain words, grammar and usage "
+                "briefly and reuse the learner's own vocabulary in examples when it fits."
+            ),
+            budget=int(os.getenv("LINGVO_CHAT_BUDGET", "3000"))
+        )
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "HTTP-Referer": "https://www.webstylepress.com",
@@ -62,6 +322,15 @@ class MainApp(ctk.CTk):
             "Content-Type": "application/json"
         }
 
+        self.translation_cache = TranslationCache(os.path.join(self.engine.data_dir, "translation_cache.sqlite3"))
+        # Language pair of the user's words as "source:target" (e.g. fr:ru); empty disables
+        # answering translator lookups from the vocabulary
+        self.vocab_languages = tuple(os.getenv("LINGVO_VOCAB_LANGUAGES", "").split(":"))
+        if len(self.vocab_languages) != 2 or not all(self.vocab_languages):
+            self.vocab_languages = None
+        self.vocab_cache_version = None
+        self.http = HttpClientPool()
+
         self.languages = {
             "Auto Detect": "auto", "Armenian": "hy", "English": "en", "French": "fr",
             "Spanish": "es", "German": "de", "Russian": "ru", "Chinese": "zh",
@@ -71,78 +340,7 @@ class MainApp(ctk.CTk):
             "Ukrainian": "uk", "Czech": "cs", "Finnish": "fi", "Hungarian": "hu",
             "Romanian": "ro", "Thai": "th", "Vietnamese": "vi", "Indonesian": "id"
         }
-
-    def ensure_word_defaults(self, word: dict) -> dict:
-        word.setdefault("topic", "Без темы")
-        word.setdefault("tags", [])
-        word.setdefault("status", "New")
-        word.setdefault("review_count", 0)
-        word.setdefault("last_reviewed", None)
-        return word
-
-    def load_words(self):
-        try:
-            if os.path.exists(self.words_file):
-                with open(self.words_file, "r", encoding="utf-8") as f:
-                    loaded = json.load(f)
-                    if isinstance(loaded, list):
-                        return [self.ensure_word_defaults(w) for w in loaded if isinstance(w, dict)]
-        except Exception as e:
-            print(f"Error loading words: {e}")
-        return []
-
-    def save_words(self):
-        try:
-            with open(self.words_file, "w", encoding="utf-8") as f:
-                json.dump(self.words, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"Error saving words: {e}")
-
-    def load_history(self):
-        try:
-            if os.path.exists(self.history_file):
-                with open(self.history_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    return data if isinstance(data, list) else []
-        except Exception as e:
-            print(f"Error loading history: {e}")
-        return []
-
-    def save_history(self):
-        try:
-            with open(self.history_file, "w", encoding="utf-8") as f:
-                json.dump(self.training_history, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"Error saving history: {e}")
-
-    def log_review(self, word: dict, correct: bool, test_type: str = "practice"):
-        entry = {
-            "date": datetime.now().strftime("%Y-%m-%d"),
-            "wordId": word.get("word"),
-            "result": "correct" if correct else "incorrect",
-            "testType": test_type,
-            "sessionId": datetime.now().strftime("%Y%m%d%H%M%S"),
-            "timestamp": datetime.now().isoformat()
-        }
-        self.training_history.append(entry)
-        self.save_history()
-
-    # =========================
-    # Topics / Filters helpers
-    # =========================
-    def get_topics(self):
-        topics = {w.get("topic", "Без темы") for w in self.words}
-        return sorted(topics)
-
-    def get_words_for_quiz(self, selected_topic: str):
-        if selected_topic == "Все темы":
-            return list(self.words)
-        return [w for w in self.words if w.get("topic", "Без темы") == selected_topic]
-
-    def get_today_words(self):
-        if not self.words:
-            return []
-        return self.words[:min(self.daily_goal, len(self.words))]
+        self.startup.mark("services")
 
     # =========================
     # UI Shell
@@ -162,8 +360,31 @@ class MainApp(ctk.CTk):
         self.content_frame.grid_columnconfigure(0, weight=1)
         self.content_frame.grid_rowconfigure(1, weight=1)
 
+        self.screens = ScreenManager(self.content_frame)
+        self.register_screens()
         self.show_main_screen()
 
+    def register_screens(self):
+        register = self.screens.register
+        register("main", self.build_main_screen, self.refresh_main_screen, depends=("words", "history"))
+        register("add_word", self.build_add_word_screen, self.refresh_add_word_screen, depends=("words",),
+                 on_show=self.reset_add_word_form)
+        register("search", self.build_search_screen, self.refresh_search_screen, depends=("words",))
+        register("all_words", self.build_all_words, self.refresh_all_words, depends=("words",))
+        register("topics", self.build_topics_screen, self.refresh_topics_screen, depends=("words",))
+        register("delete_word", self.build_delete_word_screen, self.search_word_to_delete, depends=("words",))
+        register("topic_selection", self.build_topic_selection, self.refresh_topic_selection,
+                 depends=("words",), on_show=self.refresh_topic_selection)
+        register("translator", self.build_translator, self.refresh_translator, depends=("words",))
+        register("ai_chat", self.build_ai_chat, on_hide=self.cancel_ai_stream)
+        register("import_export", self.build_import_export)
+        register("diagnostics", self.build_diagnostics, on_show=self.refresh_diagnostics)
+
+    def notify_data_changed(self, *topics):
+        screens = getattr(self, "screens", None)
+        if screens is not None:
+            screens.notify(*topics)
+
     def setup_menu(self):
         menu_frame = ctk.CTkFrame(self, corner_radius=0)
         menu_frame.grid(row=0, column=0, sticky="nsew")
@@ -183,8 +404,10 @@ class MainApp(ctk.CTk):
             ("✏️ Practice", self.show_topic_selection),
             ("🌐 Translator", self.show_translator),
             ("🤖 AI Chat", self.show_ai_chat),
-            ("📂 Import/Export", self.open_json_manager),
+            ("📂 Import/Export", self.show_import_export),
         ]
+        if diagnostics.ENABLED:
+            buttons.append(("🩺 Diagnostics", self.show_diagnostics))
 
         for text, command in buttons:
             btn = ctk.CTkButton(
@@ -215,34 +438,28 @@ class MainApp(ctk.CTk):
     # Main / Dashboard
     # =========================
     def show_main_screen(self):
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
+        self.screens.show("main")
 
+    def build_main_screen(self, parent):
         # Daily progress
-        progress_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+        progress_frame = ctk.CTkFrame(parent, fg_color="transparent")
         progress_frame.pack(fill="x", padx=30, pady=20)
 
-        ctk.CTkLabel(
-            progress_frame,
-            text=f"📅 Daily Progress: {self.daily_progress}/{self.daily_goal}",
-            font=("Arial", 16, "bold")
-        ).pack(side="left")
+        self.progress_text_label = ctk.CTkLabel(progress_frame, text="", font=("Arial", 16, "bold"))
+        self.progress_text_label.pack(side="left")
 
-        progress_bar = ctk.CTkProgressBar(
+        self.progress_bar = ctk.CTkProgressBar(
             progress_frame,
             width=200,
             height=10,
             corner_radius=5,
             progress_color="#4CC2FF"
         )
-        progress_bar.pack(side="left", padx=10)
-        progress_bar.set(self.daily_progress / self.daily_goal if self.daily_goal else 0)
-
-        self.update_statistics()
+        self.progress_bar.pack(side="left", padx=10)
 
         # Today to learn
         today_frame = ctk.CTkFrame(
-            self.content_frame,
+            parent,
             corner_radius=12,
             border_width=1,
             border_color=("#E0E0E0", "#383838"),
@@ -253,26 +470,19 @@ class MainApp(ctk.CTk):
         ctk.CTkLabel(today_frame, text="Сегодня учить", font=("Arial", 18, "bold"), pady=10)\
             .pack(anchor="w", padx=20)
 
-        today_words = self.get_today_words()
-        if today_words:
-            words_list = ", ".join([w.get("word", "") for w in today_words])
-            ctk.CTkLabel(today_frame, text=words_list, font=("Arial", 14), wraplength=700)\
-                .pack(anchor="w", padx=20, pady=5)
-        else:
-            ctk.CTkLabel(today_frame, text="Добавь слова, чтобы начать", font=("Arial", 14))\
-                .pack(anchor="w", padx=20, pady=5)
+        self.today_words_label = ctk.CTkLabel(today_frame, text="", font=("Arial", 14), wraplength=700)
+        self.today_words_label.pack(anchor="w", padx=20, pady=5)
 
-        start_btn = ctk.CTkButton(
+        self.start_training_button = ctk.CTkButton(
             today_frame,
             text="Начать тренировку",
             width=180,
-            state=("normal" if today_words else "disabled"),
             command=self.show_topic_selection
         )
-        start_btn.pack(padx=20, pady=10)
+        self.start_training_button.pack(padx=20, pady=10)
 
         # Stats
-        stats_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+        stats_frame = ctk.CTkFrame(parent, fg_color="transparent")
         stats_frame.pack(fill="both", expand=True, padx=30, pady=10)
 
         stats_card = ctk.CTkFrame(
@@ -294,33 +504,20 @@ class MainApp(ctk.CTk):
         grid_frame = ctk.CTkFrame(stats_card, fg_color="transparent")
         grid_frame.pack(pady=10)
 
-        ctk.CTkLabel(grid_frame, text=f"📝 Total Words: {self.word_stats['total']}", font=("Arial", 14))\
-            .grid(row=0, column=0, padx=20, pady=5, sticky="w")
-        ctk.CTkLabel(grid_frame, text=f"📅 New Today: {self.word_stats['day']}", font=("Arial", 14))\
-            .grid(row=1, column=0, padx=20, pady=5, sticky="w")
-
-        ctk.CTkLabel(grid_frame, text=f"🏆 Best Score: {self.test_stats['best_score']}%", font=("Arial", 14))\
-            .grid(row=0, column=1, padx=20, pady=5, sticky="w")
-        ctk.CTkLabel(grid_frame, text=f"📊 Average: {self.test_stats['average_score']}%", font=("Arial", 14))\
-            .grid(row=1, column=1, padx=20, pady=5, sticky="w")
-
-        ctk.CTkLabel(grid_frame, text=f"🔥 Streak: {self.test_stats.get('streak', 0)}", font=("Arial", 14))\
-            .grid(row=0, column=2, padx=20, pady=5, sticky="w")
-        ctk.CTkLabel(grid_frame, text=f"🔁 Total Reviews: {self.test_stats.get('total_reviews', 0)}", font=("Arial", 14))\
-            .grid(row=1, column=2, padx=20, pady=5, sticky="w")
-
-        best_day = self.test_stats.get("best_day")
-        best_day_text = f"Best Day: {best_day['date']} ({best_day['value']})" if best_day else "Best Day: —"
-        ctk.CTkLabel(grid_frame, text=best_day_text, font=("Arial", 14))\
-            .grid(row=2, column=0, padx=20, pady=5, sticky="w")
-
-        accuracy_lines = [f"{ttype}: {value}%" for ttype, value in self.test_stats.get("accuracy_by_type", {}).items()]
-        accuracy_text = "; ".join(accuracy_lines) if accuracy_lines else "No practice data yet"
-        ctk.CTkLabel(grid_frame, text=f"Accuracy by type: {accuracy_text}", font=("Arial", 13))\
-            .grid(row=2, column=1, padx=20, pady=5, sticky="w")
+        self.stat_labels = {}
+        layout = [
+            ("total", 0, 0, 14), ("day", 1, 0, 14),
+            ("best_score", 0, 1, 14), ("average", 1, 1, 14),
+            ("streak", 0, 2, 14), ("reviews", 1, 2, 14),
+            ("best_day", 2, 0, 14), ("accuracy", 2, 1, 13),
+        ]
+        for key, row, column, size in layout:
+            label = ctk.CTkLabel(grid_frame, text="", font=("Arial", size))
+            label.grid(row=row, column=column, padx=20, pady=5, sticky="w")
+            self.stat_labels[key] = label
 
         motivation_frame = ctk.CTkFrame(
-            self.content_frame,
+            parent,
             corner_radius=12,
             border_width=1,
             border_color=("#E0E0E0", "#383838"),
@@ -328,27 +525,59 @@ class MainApp(ctk.CTk):
         )
         motivation_frame.pack(fill="x", padx=30, pady=20)
 
-        ctk.CTkLabel(
-            motivation_frame,
-            text=f"🔥 Words left today: {max(0, self.daily_goal - self.daily_progress)}",
-            font=("Arial", 14),
-            pady=10
-        ).pack()
+        self.words_left_label = ctk.CTkLabel(motivation_frame, text="", font=("Arial", 14), pady=10)
+        self.words_left_label.pack()
+
+    def refresh_main_screen(self):
+        engine = self.engine
+        self.progress_text_label.configure(text=f"📅 Daily Progress: {engine.daily_progress}/{engine.daily_goal}")
+        self.progress_bar.set(engine.daily_progress / engine.daily_goal if engine.daily_goal else 0)
+
+        test_stats = engine.update_statistics()
+        word_stats = engine.word_stats
+
+        today_words = engine.get_today_words()
+        next_due = engine.scheduler.next_due() if engine.words else None
+        if today_words:
+            self.today_words_label.configure(text=", ".join([w.get("word", "") for w in today_words]))
+        elif next_due:
+            self.today_words_label.configure(text=f"На сегодня всё! Следующее повторение: {next_due}")
+        else:
+            self.today_words_label.configure(text="Добавь слова, чтобы начать")
+        self.start_training_button.configure(state=("normal" if engine.words else "disabled"))
+
+        best_day = test_stats.get("best_day")
+        accuracy_lines = [f"{ttype}: {value}%" for ttype, value in test_stats.get("accuracy_by_type", {}).items()]
+        accuracy_text = "; ".join(accuracy_lines) if accuracy_lines else "No practice data yet"
+        texts = {
+            "total": f"📝 Total Words: {word_stats['total']}",
+            "day": f"📅 New Today: {word_stats['day']}",
+            "best_score": f"🏆 Best Score: {test_stats['best_score']}%",
+            "average": f"📊 Average: {test_stats['average_score']}%",
+            "streak": f"🔥 Streak: {test_stats.get('streak', 0)}",
+            "reviews": f"🔁 Total Reviews: {test_stats.get('total_reviews', 0)}",
+            "best_day": f"Best Day: {best_day['date']} ({best_day['value']})" if best_day else "Best Day: —",
+            "accuracy": f"Accuracy by type: {accuracy_text}",
+        }
+        for key, text in texts.items():
+            self.stat_labels[key].configure(text=text)
+
+        self.words_left_label.configure(text=f"🔥 Words left today: {max(0, engine.daily_goal - engine.daily_progress)}")
 
     # =========================
     # AI Chat
     # =========================
     def show_ai_chat(self):
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
+        self.screens.show("ai_chat")
 
-        title_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+    def build_ai_chat(self, parent):
+        title_frame = ctk.CTkFrame(parent, fg_color="transparent")
         title_frame.pack(pady=10)
 
         ctk.CTkLabel(title_frame, text="🤖 AI Language Assistant", font=("Arial", 20, "bold")).pack()
 
         self.chat_display = ctk.CTkTextbox(
-            self.content_frame,
+            parent,
             wrap="word",
             font=("Arial", 14),
             fg_color=("#444654", "#444654"),
@@ -357,7 +586,7 @@ class MainApp(ctk.CTk):
         )
         self.chat_display.pack(fill="both", expand=True, padx=20, pady=(0, 10))
 
-        input_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+        input_frame = ctk.CTkFrame(parent, fg_color="transparent")
         input_frame.pack(fill="x", padx=20, pady=(0, 20))
 
         self.user_input = ctk.CTkEntry(
@@ -380,8 +609,20 @@ class MainApp(ctk.CTk):
         )
         send_button.pack(side="right")
 
+        new_chat_button = ctk.CTkButton(
+            input_frame,
+            text="New chat",
+            command=self.new_ai_chat,
+            width=100,
+            fg_color="transparent",
+            border_width=1,
+            border_color=("#D0D0D0", "#404040"),
+            font=("Arial", 14)
+        )
+        new_chat_button.pack(side="right", padx=(0, 10))
+
         back_button = ctk.CTkButton(
-            self.content_frame,
+            parent,
             text="Back to Main",
             command=self.show_main_screen,
             fg_color="transparent",
@@ -405,87 +646,160 @@ class MainApp(ctk.CTk):
         if not user_message:
             return
 
+        # a new message supersedes the reply that is still streaming
+        self.cancel_ai_stream()
         self.user_input.delete(0, "end")
         self.add_ai_message("You", user_message)
 
-        self.user_input.configure(state="disabled")
-        self.add_ai_message("AI", "Thinking...")
-        Thread(target=self.get_ai_response, args=(user_message,), daemon=True).start()
+        self.conversation.add("user", user_message)
+        messages = self.conversation.build_messages(self.engine.related_words(user_message))
 
-    def get_ai_response(self, user_message):
+        stream = ChatStream()
+        self.ai_stream = stream
+        self.begin_ai_reply()
+        Thread(target=self.get_ai_response, args=(messages, stream), daemon=True).start()
+
+    def new_ai_chat(self):
+        self.cancel_ai_stream()
+        self.conversation.clear()
+        self.chat_display.configure(state="normal")
+        self.chat_display.delete("1.0", "end")
+        self.chat_display.configure(state="disabled")
+        self.add_ai_message("AI", "Hello! I'm your language learning assistant. How can I help you today?")
+
+    def get_ai_response(self, messages, stream):
         try:
             if not self.api_key:
-                self.after(0, lambda: self.update_ai_chat("Error: OPENROUTER_API_KEY is not set."))
+                self.after(0, lambda: self.finish_ai_reply(stream, "Error: OPENROUTER_API_KEY is not set."))
                 return
 
             payload = {
                 "model": "deepseek/deepseek-r1:free",
-                "messages": [{"role": "user", "content": user_message}]
+                "messages": messages,
+                "stream": True
             }
 
-            response = requests.post(
+            with self.http.stream(
+                "POST",
                 self.api_url,
                 headers=self.headers,
-                data=json.dumps(payload),
+                content=json.dumps(payload),
                 timeout=30
-            )
-            response.raise_for_status()
-            data = response.json()
-            ai_response = data.get("choices", [{}])[0].get("message", {}).get("content", "No response received.")
-            self.after(0, lambda: self.update_ai_chat(ai_response))
+            ) as response:
+                if response.status_code >= 400:
+                    response.read()
+                    response.raise_for_status()
+                if "text/event-stream" in response.headers.get("content-type", ""):
+                    for delta in iter_sse_deltas(response.iter_lines(), lambda: stream.cancelled):
+                        self.push_ai_tokens(stream, delta)
+                    if stream.cancelled:
+                        response.close()  # drop the connection instead of reading the rest
+                else:
+                    # the endpoint answered with a regular completion
+                    response.read()
+                    data = response.json()
+                    message = data.get("choices", [{}])[0].get("message", {})
+                    self.push_ai_tokens(stream, message.get("content") or "No response received.")
+            self.after(0, lambda: self.finish_ai_reply(stream))
         except Exception as e:
-            self.after(0, lambda: self.update_ai_chat(f"Error: {str(e)}"))
+            message = f"Error: {str(e)}"
+            self.after(0, lambda: self.finish_ai_reply(stream, message))
 
-    def update_ai_chat(self, response):
+    def push_ai_tokens(self, stream, text):
+        # worker thread: one Tk callback per batch of tokens, not per token
+        if stream.push(text):
+            self.after(self.ai_flush_interval_ms, lambda: self.flush_ai_tokens(stream))
+
+    def begin_ai_reply(self):
         self.chat_display.configure(state="normal")
-        # remove last "Thinking..." line block
-        try:
-            self.chat_display.delete("end-2l", "end")
-        except Exception:
-            pass
+        self.chat_display.insert("end", "AI: ")
+        self.chat_display.mark_set("ai_reply_start", "end-1c")
+        self.chat_display.mark_gravity("ai_reply_start", "left")
+        self.chat_display.insert("end", "Thinking...")
+        self.chat_display.mark_set("ai_reply", "end-1c")
+        self.chat_display.configure(state="disabled")
+        self.chat_display.see("end")
 
-        self.add_ai_message("AI", response)
-        self.user_input.configure(state="normal")
-        self.user_input.focus()
+    def write_ai_reply(self, stream, text):
+        if stream.finished or not text:
+            return
+        self.chat_display.configure(state="normal")
+        if not stream.started:
+            stream.started = True
+            self.chat_display.delete("ai_reply_start", "ai_reply")
+        self.chat_display.insert("ai_reply", text)
+        self.chat_display.configure(state="disabled")
+        self.chat_display.see("end")
+
+    def flush_ai_tokens(self, stream):
+        self.write_ai_reply(stream, stream.drain())
+
+    def finish_ai_reply(self, stream, error=None):
+        if stream.finished:
+            return
+        self.flush_ai_tokens(stream)
+        if error:
+            self.write_ai_reply(stream, error if not stream.started else f"\n{error}")
+        elif stream.cancelled:
+            self.write_ai_reply(stream, " [stopped]" if stream.started else "[stopped]")
+        elif not stream.started:
+            self.write_ai_reply(stream, "No response received.")
+        stream.finished = True
+        if stream.started and not error:
+            self.conversation.add("assistant", stream.text)
+        self.chat_display.configure(state="normal")
+        self.chat_display.insert("ai_reply", "\n\n")
+        self.chat_display.configure(state="disabled")
+        self.chat_display.see("end")
+        if self.ai_stream is stream:
+            self.ai_stream = None
+
+    def cancel_ai_stream(self):
+        stream = getattr(self, "ai_stream", None)
+        if stream is not None:
+            stream.cancel()
+            self.finish_ai_reply(stream)
 
     # =========================
     # Translator
     # =========================
     def show_translator(self):
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
+        self.screens.show("translator")
 
-        title_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+    def build_translator(self, parent):
+        title_frame = ctk.CTkFrame(parent, fg_color="transparent")
         title_frame.pack(pady=10)
         ctk.CTkLabel(title_frame, text="🌐 Translator", font=("Arial", 20, "bold")).pack()
 
-        input_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+        input_frame = ctk.CTkFrame(parent, fg_color="transparent")
         input_frame.pack(pady=10)
 
         ctk.CTkLabel(input_frame, text="Enter text to translate:", font=("Arial", 14)).pack(anchor="w")
         self.translate_input = ctk.CTkEntry(input_frame, width=400, font=("Arial", 14))
         self.translate_input.pack(pady=5)
 
-        lang_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+        lang_frame = ctk.CTkFrame(parent, fg_color="transparent")
         lang_frame.pack(pady=10)
 
         ctk.CTkLabel(lang_frame, text="From:", font=("Arial", 14)).grid(row=0, column=0, padx=5, sticky="w")
         self.from_lang_var = ctk.StringVar(value="French")
-        from_menu = ctk.CTkOptionMenu(lang_frame, variable=self.from_lang_var, values=list(self.languages.keys()), width=150)
+        from_menu = ctk.CTkOptionMenu(lang_frame, variable=self.from_lang_var, values=list(self.languages.keys()),
+                                      width=150)
         from_menu.grid(row=0, column=1, padx=5)
 
         ctk.CTkLabel(lang_frame, text="To:", font=("Arial", 14)).grid(row=0, column=2, padx=5, sticky="w")
         self.to_lang_var = ctk.StringVar(value="Russian")
-        to_menu = ctk.CTkOptionMenu(lang_frame, variable=self.to_lang_var, values=list(self.languages.keys())[1:], width=150)
+        to_menu = ctk.CTkOptionMenu(lang_frame, variable=self.to_lang_var, values=list(self.languages.keys())[1:],
+                                    width=150)
         to_menu.grid(row=0, column=3, padx=5)
 
         translate_button = ctk.CTkButton(
-            self.content_frame, text="Translate", command=self.translate_text,
+            parent, text="Translate", command=self.translate_text,
             width=150, height=40, font=("Arial", 14, "bold")
         )
         translate_button.pack(pady=15)
 
-        output_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+        output_frame = ctk.CTkFrame(parent, fg_color="transparent")
         output_frame.pack(pady=10)
 
         ctk.CTkLabel(output_frame, text="Translation:", font=("Arial", 14, "bold")).pack(anchor="w")
@@ -497,8 +811,34 @@ class MainApp(ctk.CTk):
                                     width=150, height=30)
         copy_button.pack(pady=5)
 
+        self.cache_stats_label = ctk.CTkLabel(output_frame, text="", font=("Arial", 11),
+                                              text_color=("gray50", "gray70"))
+        self.cache_stats_label.pack(pady=2)
+
+        # Batch mode: fill missing translations for a topic, a tag or a word list file
+        batch_frame = ctk.CTkFrame(parent, fg_color="transparent")
+        batch_frame.pack(pady=5)
+
+        ctk.CTkLabel(batch_frame, text="Batch:", font=("Arial", 14, "bold")).grid(row=0, column=0, padx=5)
+        self.batch_topic_combo = ctk.CTkComboBox(batch_frame, values=["Все темы"], width=160)
+        self.batch_topic_combo.grid(row=0, column=1, padx=5)
+        self.batch_tag_entry = ctk.CTkEntry(batch_frame, width=120, placeholder_text="Tag (optional)")
+        self.batch_tag_entry.grid(row=0, column=2, padx=5)
+        self.batch_button = ctk.CTkButton(batch_frame, text="Translate missing", width=140,
+                                          command=self.translate_selection_batch)
+        self.batch_button.grid(row=0, column=3, padx=5)
+        self.batch_file_button = ctk.CTkButton(batch_frame, text="From file...", width=110,
+                                               command=self.translate_file_batch)
+        self.batch_file_button.grid(row=0, column=4, padx=5)
+
+        self.batch_progress = ctk.CTkProgressBar(batch_frame, width=400, height=8, progress_color="#4CC2FF")
+        self.batch_progress.grid(row=1, column=0, columnspan=5, pady=(8, 0))
+        self.batch_progress.set(0)
+        self.batch_status_label = ctk.CTkLabel(batch_frame, text="", font=("Arial", 11))
+        self.batch_status_label.grid(row=2, column=0, columnspan=5)
+
         back_button = ctk.CTkButton(
-            self.content_frame,
+            parent,
             text="Back to Main",
             command=self.show_main_screen,
             fg_color="transparent",
@@ -508,6 +848,94 @@ class MainApp(ctk.CTk):
         )
         back_button.pack(pady=10)
 
+    def warm_translation_cache(self):
+        # The vocabulary is only known to be in the configured language pair; it is rebuilt
+        # when the words changed since the last time, not on every refresh
+        version = self.screens.versions.get("words", 0)
+        if not self.vocab_languages or self.vocab_cache_version == version:
+            return
+        self.vocab_cache_version = version
+        pairs = [(w.get("word"), w.get("translation")) for w in self.engine.words]
+        self.translation_cache.set_vocabulary(pairs, *self.vocab_languages)
+
+    def refresh_translator(self):
+        topics = ["Все темы"] + self.engine.get_topics()
+        self.batch_topic_combo.configure(values=topics)
+        if self.batch_topic_combo.get() not in topics:
+            self.batch_topic_combo.set("Все темы")
+        self.warm_translation_cache()
+
+    # ---- batch translation ----
+    def translate_selection_batch(self):
+        topic = self.batch_topic_combo.get()
+        words = self.engine.filter_words(
+            topic="" if topic == "Все темы" else topic,
+            tag=self.batch_tag_entry.get().strip(),
+        )
+        self.start_batch_translation([w for w in words if not w.get("translation")])
+
+    def translate_file_batch(self):
+        # One word per line (txt), or the first column of a CSV/TSV file
+        path = filedialog.askopenfilename(filetypes=[("Word lists", "*.txt *.csv *.tsv"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            with open(path, "r", encoding="utf-8-sig") as f:
+                texts = [line.replace("\t", ",").split(",")[0].strip() for line in f]
+        except Exception as e:
+            self.batch_status_label.configure(text=f"Error: {e}")
+            return
+
+        topic = os.path.splitext(os.path.basename(path))[0]
+        targets = self.engine.words_missing_translation(texts, topic)
+        self.start_batch_translation(targets)
+
+    def start_batch_translation(self, words):
+        if not words:
+            self.batch_status_label.configure(text="Nothing to translate")
+            return
+        source = self.languages[self.from_lang_var.get()]
+        target = self.languages[self.to_lang_var.get()]
+        self.batch_button.configure(state="disabled")
+        self.batch_file_button.configure(state="disabled")
+        self.batch_progress.set(0)
+        self.batch_status_label.configure(text=f"Translating 0/{len(words)}...")
+        Thread(target=self.perform_batch_translation, args=(words, source, target), daemon=True).start()
+
+    def perform_batch_translation(self, words, source, target):
+        translator = BatchTranslator(self.http, self.translation_cache)
+
+        def progress(done, total, text, _translation):
+            self.after(0, lambda: self.on_batch_progress(done, total, text))
+
+        try:
+            results = translator.translate([w["word"] for w in words], source, target, progress)
+        except Exception as e:
+            message = f"Error: {e}"
+            self.after(0, lambda: self.finish_batch_translation(words, {}, message))
+            return
+        self.after(0, lambda: self.finish_batch_translation(words, results))
+
+    def on_batch_progress(self, done, total, text):
+        self.batch_progress.set(done / total if total else 1)
+        self.batch_status_label.configure(text=f"Translating {done}/{total}: {text}")
+
+    def finish_batch_translation(self, words, results, message=None):
+        changed = self.engine.fill_translations(words, results)
+        self.batch_button.configure(state="normal")
+        self.batch_file_button.configure(state="normal")
+        self.batch_status_label.configure(
+            text=message or f"Filled {len(changed)} of {len(words)} missing translations"
+        )
+
+    def update_cache_stats_label(self):
+        stats = self.translation_cache.stats
+        hits = stats["memory_hits"] + stats["disk_hits"] + stats["vocabulary_hits"]
+        self.cache_stats_label.configure(
+            text=f"Cache: {hits} hits ({stats['memory_hits']} memory, {stats['disk_hits']} disk, "
+                 f"{stats['vocabulary_hits']} vocabulary), {stats['misses']} misses"
+        )
+
     def translate_text(self):
         text = self.translate_input.get().strip()
         if not text:
@@ -521,50 +949,63 @@ class MainApp(ctk.CTk):
         self.translate_output.insert("end", "Translating...")
         self.translate_output.configure(state="disabled")
 
+        source = self.languages[from_lang]
+        target = self.languages[to_lang]
+        cached = self.translation_cache.get(text, source, target)
+        if cached is not None:
+            self.display_translation(cached)
+            return
+
         Thread(target=self.perform_translation, args=(text, from_lang, to_lang), daemon=True).start()
 
     def perform_translation(self, text, from_lang, to_lang):
+        source = self.languages[from_lang]
+        target = self.languages[to_lang]
         try:
-            base_url = "https://translate.google.com/m"
-            params = {"hl": self.languages[to_lang], "sl": self.languages[from_lang], "q": text}
+            response = self.http.get(TRANSLATE_URL, params=translate_params(text, source, target), timeout=20)
+            if response.status_code != 200:
+                raise Exception("Translation service unavailable")
 
-            with httpx.Client() as client:
-                response = client.get(base_url, params=params, timeout=20)
-                if response.status_code != 200:
-                    raise Exception("Translation service unavailable")
-
-                soup = BeautifulSoup(response.text, "html.parser")
-                result = soup.find("div", class_="result-container")
-                translation = result.text if result else "Translation not found"
-                self.after(0, lambda: self.display_translation(translation))
+            translation = extract_translation(response.text)
+            if translation is not None:
+                self.translation_cache.put(text, source, target, translation)
+            else:
+                translation = "Translation not found"
+            self.after(0, lambda: self.display_translation(translation))
 
         except Exception as e:
-            self.after(0, lambda: self.display_translation(f"Error: {str(e)}"))
+            # offline or rate-limited: an expired cache entry is better than nothing
+            stale = self.translation_cache.get(text, source, target, allow_stale=True)
+            message = stale if stale is not None else f"Error: {str(e)}"
+            self.after(0, lambda: self.display_translation(message))
 
     def display_translation(self, text):
         self.translate_output.configure(state="normal")
         self.translate_output.delete("1.0", "end")
         self.translate_output.insert("end", text)
         self.translate_output.configure(state="disabled")
+        self.update_cache_stats_label()
 
     def copy_translation(self):
         text = self.translate_output.get("1.0", "end-1c")
         if text and text != "Translating..." and not text.startswith("Error:"):
+            import pyperclip
+
             pyperclip.copy(text)
 
     # =========================
     # Delete Word
     # =========================
     def show_delete_word_screen(self):
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
+        self.screens.show("delete_word")
 
-        title_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+    def build_delete_word_screen(self, parent):
+        title_frame = ctk.CTkFrame(parent, fg_color="transparent")
         title_frame.pack(pady=10)
 
         ctk.CTkLabel(title_frame, text="🗑️ Delete Word", font=("Arial", 20, "bold")).pack()
 
-        search_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+        search_frame = ctk.CTkFrame(parent, fg_color="transparent")
         search_frame.pack(pady=10)
 
         ctk.CTkLabel(search_frame, text="Search word to delete:", font=("Arial", 14)).pack(side="left", padx=5)
@@ -575,13 +1016,40 @@ class MainApp(ctk.CTk):
         search_button = ctk.CTkButton(search_frame, text="Search", command=self.search_word_to_delete, width=80)
         search_button.pack(side="left", padx=5)
 
-        self.delete_results_frame = ctk.CTkScrollableFrame(
-            self.content_frame, height=300, fg_color=("#F8F8F8", "#333333")
+        # ids of the checked words; kept across searches until they are deleted or cleared
+        self.delete_selection = set()
+        selection_frame = ctk.CTkFrame(parent, fg_color="transparent")
+        selection_frame.pack(pady=5)
+
+        ctk.CTkButton(
+            selection_frame, text="Select all results", command=self.select_all_to_delete, width=140
+        ).pack(side="left", padx=5)
+        ctk.CTkButton(
+            selection_frame, text="Clear selection", command=self.clear_delete_selection, width=120
+        ).pack(side="left", padx=5)
+        self.delete_selected_button = ctk.CTkButton(
+            selection_frame,
+            text="Delete selected (0)",
+            command=self.delete_selected_words,
+            width=160,
+            fg_color="#ff5555",
+            hover_color="#cc0000",
+            state="disabled"
         )
-        self.delete_results_frame.pack(fill="both", expand=True, padx=20, pady=10)
+        self.delete_selected_button.pack(side="left", padx=5)
+
+        self.delete_results_list = VirtualList(
+            parent,
+            create_row=self.create_delete_row,
+            bind_row=self.bind_delete_row,
+            row_height=44,
+            height=300,
+            fg_color=("#F8F8F8", "#333333")
+        )
+        self.delete_results_list.pack(fill="both", expand=True, padx=20, pady=10)
 
         back_button = ctk.CTkButton(
-            self.content_frame,
+            parent,
             text="Back to Main",
             command=self.show_main_screen,
             fg_color="transparent",
@@ -592,44 +1060,73 @@ class MainApp(ctk.CTk):
         back_button.pack(pady=10)
 
     def search_word_to_delete(self):
-        for widget in self.delete_results_frame.winfo_children():
-            widget.destroy()
-
         search_term = self.delete_search_entry.get().strip().lower()
         if not search_term:
+            self.delete_results_list.set_items([])
             return
 
-        found_words = [
-            w for w in self.words
-            if search_term in w.get("word", "").lower() or search_term in w.get("translation", "").lower()
-        ]
-
-        if not found_words:
-            ctk.CTkLabel(self.delete_results_frame, text="No words found matching your search", font=("Arial", 14))\
-                .pack(pady=20)
-            return
-
-        for word in found_words:
-            word_frame = ctk.CTkFrame(
-                self.delete_results_frame, corner_radius=8, border_width=1, border_color=("#E0E0E0", "#383838")
-            )
-            word_frame.pack(fill="x", pady=2, padx=2)
+        found_words = self.engine.search_words(search_term)
+        self.delete_results_list.set_items(found_words, message="No words found matching your search")
+        self.update_delete_selection()
+
+    def create_delete_row(self, parent):
+        row = ctk.CTkFrame(parent, corner_radius=8, border_width=1, border_color=("#E0E0E0", "#383838"))
+        row.check = ctk.CTkCheckBox(row, text="", width=24)
+        row.check.pack(side="left", padx=(10, 0), pady=5)
+        row.title_label = ctk.CTkLabel(row, text="", font=("Arial", 14))
+        row.title_label.pack(side="left", padx=10, pady=5)
+        row.delete_button = ctk.CTkButton(row, text="Delete", width=80, fg_color="#ff5555", hover_color="#cc0000")
+        row.delete_button.pack(side="right", padx=5)
+        return row
+
+    def bind_delete_row(self, row, word):
+        row.title_label.configure(text=f"{word['word']} - {word['translation']}")
+        row.delete_button.configure(command=lambda w=word: self.delete_word(w))
+        # rows are recycled while scrolling, so the check state comes from the selection set
+        if word["id"] in self.delete_selection:
+            row.check.select()
+        else:
+            row.check.deselect()
+        row.check.configure(command=lambda w=word, c=row.check: self.toggle_delete_selection(w, c.get()))
 
-            ctk.CTkLabel(word_frame, text=f"{word['word']} - {word['translation']}", font=("Arial", 14))\
-                .pack(side="left", padx=10, pady=5)
+    def toggle_delete_selection(self, word, checked):
+        if checked:
+            self.delete_selection.add(word["id"])
+        else:
+            self.delete_selection.discard(word["id"])
+        self.update_delete_selection()
+
+    def select_all_to_delete(self):
+        self.delete_selection.update(w["id"] for w in self.delete_results_list.items)
+        self.delete_results_list.render()
+        self.update_delete_selection()
+
+    def clear_delete_selection(self):
+        self.delete_selection.clear()
+        self.delete_results_list.render()
+        self.update_delete_selection()
+
+    def update_delete_selection(self):
+        # drop ids of words that no longer exist
+        self.delete_selection.intersection_update(self.engine.words_by_id)
+        count = len(self.delete_selection)
+        self.delete_selected_button.configure(
+            text=f"Delete selected ({count})", state="normal" if count else "disabled"
+        )
 
-            delete_btn = ctk.CTkButton(
-                word_frame, text="Delete", command=lambda w=word: self.delete_word(w),
-                width=80, fg_color="#ff5555", hover_color="#cc0000"
-            )
-            delete_btn.pack(side="right", padx=5)
+    def delete_selected_words(self):
+        words = [self.engine.words_by_id[i] for i in self.delete_selection if i in self.engine.words_by_id]
+        if not words:
+            return
+        if not messagebox.askyesno("Delete words", f"Delete {len(words)} selected words?", parent=self):
+            return
+        self.delete_selection.clear()
+        self.engine.delete_words(words)
+        self.update_delete_selection()
 
     def delete_word(self, word):
-        if word in self.words:
-            self.words.remove(word)
-            self.save_words()
-            self.word_stats["total"] = len(self.words)
-        self.show_delete_word_screen()
+        self.delete_selection.discard(word.get("id"))
+        self.engine.delete_word(word)
 
     # =========================
     # Add Word
@@ -639,29 +1136,27 @@ class MainApp(ctk.CTk):
             return
 
         tags = [t.strip() for t in (tags_text or "").split(",") if t.strip()]
-        new_word = self.ensure_word_defaults({
-            "word": word.capitalize(),
-            "translation": translation,
-            "sentence": (sentence or "").capitalize(),
-            "date_added": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "review_count": 0,
-            "last_reviewed": None,
-            "topic": topic or "Без темы",
-            "tags": tags
-        })
-
-        self.words.append(new_word)
-        self.word_stats["total"] = len(self.words)
-        self.word_stats["day"] += 1
-        self.daily_progress += 1
-        self.save_words()
+        existing = self.engine.find_duplicate(word, translation)
+        if existing is not None:
+            merge = messagebox.askyesno(
+                "Word already exists",
+                f"'{existing['word']} — {existing['translation']}' is already in your vocabulary "
+                f"(topic: {existing.get('topic', 'Без темы')}).\n\n"
+                "Merge the new tags, sentence and topic into it?",
+                parent=self
+            )
+            if not merge:
+                return
+            self.engine.merge_word(existing, sentence, topic, tags)
+        else:
+            self.engine.add_word(word, translation, sentence, topic, tags)
         self.show_main_screen()
 
     def show_add_word_screen(self):
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
+        self.screens.show("add_word")
 
-        form_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+    def build_add_word_screen(self, parent):
+        form_frame = ctk.CTkFrame(parent, fg_color="transparent")
         form_frame.pack(pady=50)
 
         ctk.CTkLabel(form_frame, text="➕ Add New Word", font=("Arial", 20, "bold"), pady=20).pack()
@@ -679,10 +1174,9 @@ class MainApp(ctk.CTk):
         sentence_entry.pack(pady=5)
 
         ctk.CTkLabel(form_frame, text="Topic:", font=("Arial", 14)).pack(pady=5)
-        topics = self.get_topics() or ["Без темы"]
-        topic_combo = ctk.CTkComboBox(form_frame, values=topics, width=300)
-        topic_combo.set(topics[0])
+        topic_combo = ctk.CTkComboBox(form_frame, values=["Без темы"], width=300)
         topic_combo.pack(pady=5)
+        self.add_topic_combo = topic_combo
 
         new_topic_entry = ctk.CTkEntry(form_frame, width=300, placeholder_text="New topic (optional)")
         new_topic_entry.pack(pady=5)
@@ -691,6 +1185,8 @@ class MainApp(ctk.CTk):
         tags_entry = ctk.CTkEntry(form_frame, width=300, placeholder_text="travel, food, verbs")
         tags_entry.pack(pady=5)
 
+        self.add_word_entries = [word_entry, translation_entry, sentence_entry, new_topic_entry, tags_entry]
+
         button_frame = ctk.CTkFrame(form_frame, fg_color="transparent")
         button_frame.pack(pady=20)
 
@@ -717,25 +1213,36 @@ class MainApp(ctk.CTk):
             border_color=("#D0D0D0", "#404040")
         ).pack(side="left", padx=10)
 
+    def refresh_add_word_screen(self):
+        topics = self.engine.get_topics() or ["Без темы"]
+        self.add_topic_combo.configure(values=topics)
+        if self.add_topic_combo.get() not in topics:
+            self.add_topic_combo.set(topics[0])
+
+    def reset_add_word_form(self):
+        # the form used to be rebuilt empty on every visit
+        for entry in self.add_word_entries:
+            entry.delete(0, "end")
+
     # =========================
     # Search
     # =========================
     def show_search_screen(self):
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
+        self.screens.show("search")
 
-        search_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+    def build_search_screen(self, parent):
+        search_frame = ctk.CTkFrame(parent, fg_color="transparent")
         search_frame.pack(pady=20)
 
         ctk.CTkLabel(search_frame, text="🔍 Search Word", font=("Arial", 20, "bold"), pady=10).pack()
 
-        search_entry = ctk.CTkEntry(search_frame, width=300, placeholder_text="Enter word to search...")
-        search_entry.pack(pady=10)
+        self.search_entry = ctk.CTkEntry(search_frame, width=300, placeholder_text="Enter word to search...")
+        self.search_entry.pack(pady=10)
 
         ctk.CTkButton(
             search_frame,
             text="Search",
-            command=lambda: self.perform_search(search_entry.get()),
+            command=lambda: self.perform_search(self.search_entry.get()),
             width=120
         ).pack(pady=5)
 
@@ -749,83 +1256,53 @@ class MainApp(ctk.CTk):
             border_color=("#D0D0D0", "#404040")
         ).pack(pady=5)
 
-        self.search_results_frame = ctk.CTkScrollableFrame(self.content_frame, height=300)
-        self.search_results_frame.pack(fill="both", expand=True, padx=30, pady=10)
+        self.search_results_list = VirtualList(
+            parent,
+            create_row=self.create_search_row,
+            bind_row=self.bind_search_row,
+            row_height=84,
+            height=300
+        )
+        self.search_results_list.pack(fill="both", expand=True, padx=30, pady=10)
 
     def perform_search(self, search_term):
-        for widget in self.search_results_frame.winfo_children():
-            widget.destroy()
-
         if not search_term:
-            ctk.CTkLabel(self.search_results_frame, text="Please enter a search term", font=("Arial", 14))\
-                .pack(pady=10)
+            self.search_results_list.show_message("Please enter a search term")
             return
 
         search_term = search_term.lower()
-        found = False
-
-        for word in self.words:
-            if (search_term in word.get("word", "").lower() or
-                    search_term in word.get("translation", "").lower() or
-                    (word.get("sentence") and search_term in word.get("sentence", "").lower())):
-                found = True
-                self.display_search_result(word)
-
-        for filename in os.listdir("logs"):
-            if filename.endswith(".json") and filename != "user_words.json":
-                try:
-                    with open(os.path.join("logs", filename), "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                        if isinstance(data, list):
-                            for item in data:
-                                if isinstance(item, dict):
-                                    if (search_term in item.get("word", "").lower() or
-                                            search_term in item.get("translation", "").lower() or
-                                            search_term in item.get("sentence", "").lower()):
-                                        found = True
-                                        self.display_search_result(item)
-                except Exception as e:
-                    print(f"Error reading {filename}: {e}")
-
-        if not found:
-            ctk.CTkLabel(self.search_results_frame, text=f"No results found for '{search_term}'", font=("Arial", 14))\
-                .pack(pady=10)
-
-    def display_search_result(self, word_data):
-        result_frame = ctk.CTkFrame(
-            self.search_results_frame,
-            corner_radius=8,
-            border_width=1,
-            border_color=("#E0E0E0", "#383838")
-        )
-        result_frame.pack(fill="x", pady=5, padx=5)
 
-        ctk.CTkLabel(
-            result_frame,
-            text=f"{word_data.get('word', 'N/A')} - {word_data.get('translation', 'N/A')}",
-            font=("Arial", 14, "bold")
-        ).pack(anchor="w", padx=10, pady=5)
+        results = self.engine.search_all(search_term)
+
+        self.search_results_list.set_items(results, message=f"No results found for '{search_term}'")
 
-        if word_data.get("sentence"):
-            ctk.CTkLabel(result_frame, text=f"Example: {word_data['sentence']}", font=("Arial", 12))\
-                .pack(anchor="w", padx=10, pady=2)
+    def refresh_search_screen(self):
+        if self.search_entry.get().strip():
+            self.perform_search(self.search_entry.get())
 
-        if word_data.get("date_added"):
-            ctk.CTkLabel(
-                result_frame,
-                text=f"Added: {word_data['date_added']}",
-                font=("Arial", 10),
-                text_color=("gray50", "gray70")
-            ).pack(anchor="w", padx=10, pady=2)
+    def create_search_row(self, parent):
+        row = ctk.CTkFrame(parent, corner_radius=8, border_width=1, border_color=("#E0E0E0", "#383838"))
+        row.title_label = ctk.CTkLabel(row, text="", font=("Arial", 14, "bold"), anchor="w")
+        row.title_label.pack(fill="x", padx=10, pady=(5, 0))
+        row.sentence_label = ctk.CTkLabel(row, text="", font=("Arial", 12), anchor="w")
+        row.sentence_label.pack(fill="x", padx=10)
+        row.date_label = ctk.CTkLabel(row, text="", font=("Arial", 10), text_color=("gray50", "gray70"), anchor="w")
+        row.date_label.pack(fill="x", padx=10)
+        return row
+
+    def bind_search_row(self, row, word_data):
+        row.title_label.configure(text=f"{word_data.get('word', 'N/A')} - {word_data.get('translation', 'N/A')}")
+        row.sentence_label.configure(text=f"Example: {word_data['sentence']}" if word_data.get("sentence") else "")
+        row.date_label.configure(text=f"Added: {word_data['date_added']}" if word_data.get("date_added") else "")
 
     # =========================
     # All Words + Filters
     # =========================
     def show_all_words(self):
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
+        self.screens.show("all_words")
 
-        all_words_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+    def build_all_words(self, parent):
+        all_words_frame = ctk.CTkFrame(parent, fg_color="transparent")
         all_words_frame.pack(fill="both", expand=True, padx=20, pady=20)
 
         ctk.CTkLabel(all_words_frame, text="📖 All Words", font=("Arial", 20, "bold"), pady=10).pack()
@@ -838,15 +1315,14 @@ class MainApp(ctk.CTk):
         self.current_status_filter = getattr(self, "current_status_filter", "")
         self.current_search_filter = getattr(self, "current_search_filter", "")
 
-        topics = ["All"] + self.get_topics()
         ctk.CTkLabel(filter_frame, text="Topic", font=("Arial", 12)).grid(row=0, column=0, padx=5, pady=5)
         topic_combo = ctk.CTkComboBox(
             filter_frame,
-            values=topics,
+            values=["All"],
             width=160,
             command=lambda _v: self.apply_filters(topic_combo, tag_entry, status_combo, search_entry)
         )
-        topic_combo.set(self.current_topic_filter or topics[0])
+        topic_combo.set(self.current_topic_filter or "All")
         topic_combo.grid(row=1, column=0, padx=5, pady=5)
 
         ctk.CTkLabel(filter_frame, text="Tag", font=("Arial", 12)).grid(row=0, column=1, padx=5, pady=5)
@@ -879,8 +1355,16 @@ class MainApp(ctk.CTk):
         ctk.CTkButton(filter_frame, text="Reset", width=120, command=self.reset_filters)\
             .grid(row=1, column=5, padx=10, pady=5)
 
-        self.words_list_frame = ctk.CTkScrollableFrame(all_words_frame, height=400, fg_color=("#F8F8F8", "#333333"))
-        self.words_list_frame.pack(fill="both", expand=True)
+        self.words_list = VirtualList(
+            all_words_frame,
+            create_row=self.create_word_row,
+            bind_row=self.bind_word_row,
+            row_height=104,
+            height=400,
+            fg_color=("#F8F8F8", "#333333")
+        )
+        self.words_list.pack(fill="both", expand=True)
+        self.filter_widgets = (topic_combo, tag_entry, status_combo, search_entry)
 
         ctk.CTkButton(
             all_words_frame,
@@ -893,59 +1377,46 @@ class MainApp(ctk.CTk):
             font=("Arial", 12)
         ).pack(pady=10)
 
+    def refresh_all_words(self):
+        topic_combo = self.filter_widgets[0]
+        topics = ["All"] + self.engine.get_topics()
+        topic_combo.configure(values=topics)
+        if topic_combo.get() not in topics:
+            topic_combo.set("All")
+            self.current_topic_filter = "All"
         self.display_all_words()
 
     def display_all_words(self):
-        for widget in self.words_list_frame.winfo_children():
-            widget.destroy()
-
-        if not self.words:
-            ctk.CTkLabel(self.words_list_frame, text="Your word list is empty", font=("Arial", 14))\
-                .pack(pady=20)
+        if not self.engine.words:
+            self.words_list.show_message("Your word list is empty")
             return
 
-        filtered_words = self.words[:]
-        topic = getattr(self, "current_topic_filter", "")
-        tag = getattr(self, "current_tag_filter", "")
-        status = getattr(self, "current_status_filter", "")
-        search = getattr(self, "current_search_filter", "").lower()
-
-        if topic and topic != "All":
-            filtered_words = [w for w in filtered_words if w.get("topic", "Без темы") == topic]
-        if tag:
-            filtered_words = [w for w in filtered_words if tag.lower() in [t.lower() for t in w.get("tags", [])]]
-        if status and status != "All":
-            filtered_words = [w for w in filtered_words if w.get("status", "New") == status]
-        if search:
-            filtered_words = [
-                w for w in filtered_words
-                if search in w.get("word", "").lower() or search in w.get("translation", "").lower()
-            ]
-
-        for word in filtered_words:
-            word_frame = ctk.CTkFrame(
-                self.words_list_frame, corner_radius=8, border_width=1, border_color=("#E0E0E0", "#383838")
-            )
-            word_frame.pack(fill="x", pady=2, padx=2)
-
-            ctk.CTkLabel(word_frame, text=f"{word['word']} - {word['translation']}", font=("Arial", 14))\
-                .pack(anchor="w", padx=10, pady=5)
-
-            meta_text = f"Topic: {word.get('topic', 'Без темы')} | Status: {word.get('status', 'New')}"
-            ctk.CTkLabel(word_frame, text=meta_text, font=("Arial", 12), text_color=("gray60", "gray70"))\
-                .pack(anchor="w", padx=10)
-
-            if word.get("tags"):
-                ctk.CTkLabel(word_frame, text=f"Tags: {', '.join(word.get('tags', []))}", font=("Arial", 12))\
-                    .pack(anchor="w", padx=10)
-
-            if word.get("sentence"):
-                ctk.CTkLabel(
-                    word_frame,
-                    text=f"Example: {word['sentence']}",
-                    font=("Arial", 12),
-                    text_color=("gray50", "gray70")
-                ).pack(anchor="w", padx=10, pady=2)
+        filtered_words = self.engine.filter_words(
+            topic=getattr(self, "current_topic_filter", ""),
+            tag=getattr(self, "current_tag_filter", ""),
+            status=getattr(self, "current_status_filter", ""),
+            search=getattr(self, "current_search_filter", ""),
+        )
+        self.words_list.set_items(filtered_words, message="No words match the filters")
+
+    def create_word_row(self, parent):
+        row = ctk.CTkFrame(parent, corner_radius=8, border_width=1, border_color=("#E0E0E0", "#383838"))
+        row.title_label = ctk.CTkLabel(row, text="", font=("Arial", 14), anchor="w")
+        row.title_label.pack(fill="x", padx=10, pady=(5, 0))
+        row.meta_label = ctk.CTkLabel(row, text="", font=("Arial", 12), text_color=("gray60", "gray70"), anchor="w")
+        row.meta_label.pack(fill="x", padx=10)
+        row.tags_label = ctk.CTkLabel(row, text="", font=("Arial", 12), anchor="w")
+        row.tags_label.pack(fill="x", padx=10)
+        row.sentence_label = ctk.CTkLabel(row, text="", font=("Arial", 12), text_color=("gray50", "gray70"),
+                                          anchor="w")
+        row.sentence_label.pack(fill="x", padx=10)
+        return row
+
+    def bind_word_row(self, row, word):
+        row.title_label.configure(text=f"{word['word']} - {word['translation']}")
+        row.meta_label.configure(text=f"Topic: {word.get('topic', 'Без темы')} | Status: {word.get('status', 'New')}")
+        row.tags_label.configure(text=f"Tags: {', '.join(word['tags'])}" if word.get("tags") else "")
+        row.sentence_label.configure(text=f"Example: {word['sentence']}" if word.get("sentence") else "")
 
     def apply_filters(self, topic_combo, tag_entry, status_combo, search_entry):
         self.current_topic_filter = topic_combo.get()
@@ -959,32 +1430,48 @@ class MainApp(ctk.CTk):
         self.current_tag_filter = ""
         self.current_status_filter = "All"
         self.current_search_filter = ""
-        self.show_all_words()
+        topic_combo, tag_entry, status_combo, search_entry = self.filter_widgets
+        topic_combo.set("All")
+        tag_entry.delete(0, "end")
+        status_combo.set("All")
+        search_entry.delete(0, "end")
+        self.display_all_words()
 
     # =========================
     # Topics screen
     # =========================
     def show_topics_screen(self):
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
+        self.screens.show("topics")
 
-        frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+    def build_topics_screen(self, parent):
+        frame = ctk.CTkFrame(parent, fg_color="transparent")
         frame.pack(fill="both", expand=True, padx=20, pady=20)
 
         ctk.CTkLabel(frame, text="🏷️ Topics", font=("Arial", 20, "bold"), pady=10).pack()
 
-        topics_data = {}
-        for w in self.words:
-            topics_data.setdefault(w.get("topic", "Без темы"), []).append(w)
+        self.topics_list_frame = ctk.CTkScrollableFrame(frame, height=400)
+        self.topics_list_frame.pack(fill="both", expand=True, pady=10)
 
-        list_frame = ctk.CTkScrollableFrame(frame, height=400)
-        list_frame.pack(fill="both", expand=True, pady=10)
+        ctk.CTkButton(
+            frame,
+            text="Back",
+            command=self.show_main_screen,
+            fg_color="transparent",
+            border_width=1,
+            border_color=("#D0D0D0", "#404040"),
+            width=140
+        ).pack(pady=10)
+
+    def refresh_topics_screen(self):
+        list_frame = self.topics_list_frame
+        for widget in list_frame.winfo_children():
+            widget.destroy()
 
-        for topic, items in topics_data.items():
+        for topic, count in self.engine.topic_counts().items():
             row = ctk.CTkFrame(list_frame, corner_radius=8, border_width=1, border_color=("#E0E0E0", "#383838"))
             row.pack(fill="x", pady=4, padx=4)
 
-            ctk.CTkLabel(row, text=f"{topic} ({len(items)} words)", font=("Arial", 14, "bold"))\
+            ctk.CTkLabel(row, text=f"{topic} ({count} words)", font=("Arial", 14, "bold"))\
                 .pack(side="left", padx=10)
 
             rename_entry = ctk.CTkEntry(row, width=180, placeholder_text="Rename")
@@ -1006,80 +1493,45 @@ class MainApp(ctk.CTk):
                 command=lambda t=topic: self.delete_topic(t)
             ).pack(side="right", padx=5)
 
-        ctk.CTkButton(
-            frame,
-            text="Back",
-            command=self.show_main_screen,
-            fg_color="transparent",
-            border_width=1,
-            border_color=("#D0D0D0", "#404040"),
-            width=140
-        ).pack(pady=10)
-
     def rename_topic(self, old_topic, new_topic):
-        if not new_topic:
-            return
-        for w in self.words:
-            if w.get("topic", "Без темы") == old_topic:
-                w["topic"] = new_topic
-        self.save_words()
-        self.show_topics_screen()
+        self.engine.rename_topic(old_topic, new_topic)
 
     def delete_topic(self, topic):
-        for w in self.words:
-            if w.get("topic", "Без темы") == topic:
-                w["topic"] = "Без темы"
-        self.save_words()
-        self.show_topics_screen()
+        self.engine.delete_topic(topic)
 
     # =========================
     # Topic selection + Quiz
     # =========================
     def show_topic_selection(self):
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
+        self.screens.show("topic_selection")
 
-        selection_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+    def build_topic_selection(self, parent):
+        selection_frame = ctk.CTkFrame(parent, fg_color="transparent")
         selection_frame.pack(fill="both", expand=True, padx=30, pady=30)
 
         ctk.CTkLabel(selection_frame, text="Выберите тему для квиза", font=("Arial", 18, "bold"))\
             .pack(pady=(0, 20))
 
-        topics = ["Все темы"] + self.get_topics()
-        topics = list(dict.fromkeys(topics))
-        initial_topic = self.last_selected_topic if self.last_selected_topic in topics else "Все темы"
+        self.quiz_info_label = ctk.CTkLabel(selection_frame, text="", font=("Arial", 13))
+        self.quiz_info_label.pack(pady=5)
 
-        info_label = ctk.CTkLabel(selection_frame, text="", font=("Arial", 13))
-        info_label.pack(pady=5)
-
-        start_button = ctk.CTkButton(
+        self.quiz_start_button = ctk.CTkButton(
             selection_frame,
             text="Начать квиз",
             width=180,
-            command=lambda: self.start_test(selected_topic=topic_combo.get())
+            command=lambda: self.start_test(selected_topic=self.quiz_topic_combo.get())
         )
-        start_button.pack(pady=15)
-
-        def update_state():
-            selected = topic_combo.get()
-            available_words = self.get_words_for_quiz(selected)
-            if available_words:
-                start_button.configure(state="normal")
-                info_label.configure(text=f"Слов в теме: {len(available_words)}")
-            else:
-                start_button.configure(state="disabled")
-                info_label.configure(text="В теме нет слов")
+        self.quiz_start_button.pack(pady=15)
 
-        topic_combo = ctk.CTkComboBox(
+        self.quiz_topic_combo = ctk.CTkComboBox(
             selection_frame,
-            values=topics,
+            values=["Все темы"],
             state="readonly",
             width=240,
             font=("Arial", 14),
-            command=lambda _v: update_state()
+            command=lambda _v: self.update_quiz_selection_state()
         )
-        topic_combo.set(initial_topic)
-        topic_combo.pack(pady=10)
+        self.quiz_topic_combo.pack(pady=10)
 
         ctk.CTkButton(
             selection_frame,
@@ -1091,20 +1543,34 @@ class MainApp(ctk.CTk):
             command=self.show_main_screen
         ).pack(pady=5)
 
-        update_state()
+    def refresh_topic_selection(self):
+        topics = ["Все темы"] + self.engine.get_topics()
+        topics = list(dict.fromkeys(topics))
+        self.quiz_topic_combo.configure(values=topics)
+        self.quiz_topic_combo.set(self.last_selected_topic if self.last_selected_topic in topics else "Все темы")
+        self.update_quiz_selection_state()
+
+    def update_quiz_selection_state(self):
+        available = self.engine.count_words(self.quiz_topic_combo.get())
+        if available:
+            self.quiz_start_button.configure(state="normal")
+            self.quiz_info_label.configure(text=f"Слов в теме: {available}")
+        else:
+            self.quiz_start_button.configure(state="disabled")
+            self.quiz_info_label.configure(text="В теме нет слов")
 
     def start_test(self, selected_words=None, selected_topic="Все темы"):
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
+        # the answers are written together once the quiz screen is left (finished or cancelled)
+        parent = self.screens.show_transient("quiz", on_hide=self.engine.request_flush)
 
-        target_words = selected_words if selected_words is not None else self.get_words_for_quiz(selected_topic)
+        self.test_questions = self.engine.make_quiz(selected_words, topic=selected_topic)
         self.last_selected_topic = selected_topic
 
-        if not target_words:
-            ctk.CTkLabel(self.content_frame, text="No words available for testing. Add some words first!",
+        if not self.test_questions:
+            ctk.CTkLabel(parent, text="No words available for testing. Add some words first!",
                          font=("Arial", 16)).pack(pady=50)
             ctk.CTkButton(
-                self.content_frame,
+                parent,
                 text="Back to Main",
                 command=self.show_main_screen,
                 width=120,
@@ -1115,11 +1581,10 @@ class MainApp(ctk.CTk):
             ).pack(pady=10)
             return
 
-        self.test_words = random.sample(target_words, min(10, len(target_words)))
         self.current_test_index = 0
         self.correct_answers = 0
 
-        test_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+        test_frame = ctk.CTkFrame(parent, fg_color="transparent")
         test_frame.pack(fill="both", expand=True, padx=30, pady=30)
 
         ctk.CTkLabel(test_frame, text=f"Practice — Тема: {selected_topic}", font=("Arial", 18, "bold"))\
@@ -1136,10 +1601,13 @@ class MainApp(ctk.CTk):
                                       width=120, font=("Arial", 14))
         submit_button.pack(pady=10)
 
-        self.progress_label = ctk.CTkLabel(test_frame, text=f"Question 1 of {len(self.test_words)}",
+        self.progress_label = ctk.CTkLabel(test_frame, text=f"Question 1 of {len(self.test_questions)}",
                                            font=("Arial", 12))
         self.progress_label.pack(pady=5)
 
+        self.feedback_label = ctk.CTkLabel(test_frame, text="", font=("Arial", 12), wraplength=500)
+        self.feedback_label.pack(pady=5)
+
         back_button = ctk.CTkButton(
             test_frame,
             text="Cancel Test",
@@ -1154,20 +1622,18 @@ class MainApp(ctk.CTk):
         self.show_next_test_question()
 
     def show_next_test_question(self):
-        if self.current_test_index >= len(self.test_words):
+        if self.current_test_index >= len(self.test_questions):
             self.show_test_results()
             return
 
-        current_word = self.test_words[self.current_test_index]
+        _word, direction, prompt, _answer = self.test_questions[self.current_test_index]
 
-        if random.choice([True, False]):
-            self.question_label.configure(text=f"What is the translation of: '{current_word['word']}'?")
-            self.correct_answer = current_word["translation"]
+        if direction == "forward":
+            self.question_label.configure(text=f"What is the translation of: '{prompt}'?")
         else:
-            self.question_label.configure(text=f"What is the word for: '{current_word['translation']}'?")
-            self.correct_answer = current_word["word"]
+            self.question_label.configure(text=f"What is the word for: '{prompt}'?")
 
-        self.progress_label.configure(text=f"Question {self.current_test_index + 1} of {len(self.test_words)}")
+        self.progress_label.configure(text=f"Question {self.current_test_index + 1} of {len(self.test_questions)}")
         self.answer_entry.delete(0, "end")
 
     def check_test_answer(self):
@@ -1175,36 +1641,28 @@ class MainApp(ctk.CTk):
         if not user_answer:
             return
 
-        current_word = self.test_words[self.current_test_index]
-        if user_answer.lower() == self.correct_answer.lower():
+        current_word, _direction, _prompt, answer = self.test_questions[self.current_test_index]
+        grade = self.engine.check_answer(current_word, user_answer, answer, test_type="practice")
+        if grade == "exact":
             self.correct_answers += 1
-            current_word["review_count"] = current_word.get("review_count", 0) + 1
-            current_word["status"] = "Learning" if current_word["review_count"] < 3 else "Mastered"
-            correct = True
+            self.feedback_label.configure(text="✅ Correct", text_color="#4CC2FF")
+        elif grade == "close":
+            self.correct_answers += 1
+            self.feedback_label.configure(text=f"✏️ Almost: {answer}", text_color="#E0A800")
         else:
-            current_word["status"] = current_word.get("status", "New")
-            correct = False
-
-        self.log_review(current_word, correct, test_type="practice")
-        self.save_words()
+            self.feedback_label.configure(text=f"❌ Correct answer: {answer}", text_color="#FF5555")
 
         self.current_test_index += 1
         self.show_next_test_question()
 
     def show_test_results(self):
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
+        parent = self.screens.show_transient("quiz_results")
 
-        score = int((self.correct_answers / len(self.test_words)) * 100) if self.test_words else 0
+        score = int((self.correct_answers / len(self.test_questions)) * 100) if self.test_questions else 0
 
-        if score > self.test_stats["best_score"]:
-            self.test_stats["best_score"] = score
-        if self.test_stats["average_score"] == 0:
-            self.test_stats["average_score"] = score
-        else:
-            self.test_stats["average_score"] = (self.test_stats["average_score"] + score) // 2
+        self.engine.record_score(score)
 
-        results_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+        results_frame = ctk.CTkFrame(parent, fg_color="transparent")
         results_frame.pack(fill="both", expand=True, padx=30, pady=30)
 
         if score >= 80:
@@ -1220,7 +1678,7 @@ class MainApp(ctk.CTk):
         ctk.CTkLabel(results_frame, text="Practice Results", font=("Arial", 24, "bold"), pady=20).pack()
         ctk.CTkLabel(results_frame, text=f"You scored: {score}%", font=("Arial", 20), text_color=color)\
             .pack(pady=10)
-        ctk.CTkLabel(results_frame, text=f"{self.correct_answers} correct out of {len(self.test_words)}",
+        ctk.CTkLabel(results_frame, text=f"{self.correct_answers} correct out of {len(self.test_questions)}",
                      font=("Arial", 16)).pack(pady=5)
         ctk.CTkLabel(results_frame, text=result_text, font=("Arial", 18), text_color=color).pack(pady=20)
 
@@ -1228,57 +1686,204 @@ class MainApp(ctk.CTk):
                       width=150, font=("Arial", 14)).pack(pady=20)
 
     # =========================
-    # Misc
+    # Import / Export
     # =========================
-    def open_json_manager(self):
-        print("Import/Export will be implemented here")
+    def show_import_export(self):
+        self.screens.show("import_export")
 
-    def toggle_theme(self):
-        current = ctk.get_appearance_mode()
-        ctk.set_appearance_mode("light" if current == "dark" else "dark")
+    def build_import_export(self, parent):
+        frame = ctk.CTkFrame(parent, fg_color="transparent")
+        frame.pack(fill="both", expand=True, padx=20, pady=20)
+
+        ctk.CTkLabel(frame, text="📂 Import / Export", font=("Arial", 20, "bold"), pady=10).pack()
+        ctk.CTkLabel(
+            frame,
+            text="CSV (word, translation, sentence, topic, tags), JSON array, JSON Lines "
+                 "or an Anki text export (front, back, tags). Duplicates are skipped.",
+            font=("Arial", 12),
+            wraplength=600
+        ).pack(pady=(0, 10))
+
+        import_frame = ctk.CTkFrame(frame, fg_color="transparent")
+        import_frame.pack(pady=10)
+
+        self.import_topic_entry = ctk.CTkEntry(import_frame, width=220,
+                                               placeholder_text="Topic for all words (optional)")
+        self.import_topic_entry.grid(row=0, column=0, padx=5)
+        self.import_button = ctk.CTkButton(import_frame, text="Import file...", width=140,
+                                           command=self.start_import)
+        self.import_button.grid(row=0, column=1, padx=5)
+        self.export_button = ctk.CTkButton(import_frame, text="Export to JSON...", width=140,
+                                           command=self.export_words)
+        self.export_button.grid(row=0, column=2, padx=5)
+        self.dedupe_button = ctk.CTkButton(import_frame, text="Remove duplicates", width=140,
+                                           command=self.remove_duplicates)
+        self.dedupe_button.grid(row=0, column=3, padx=5)
+
+        self.import_progress = ctk.CTkProgressBar(import_frame, width=500, height=8, progress_color="#4CC2FF")
+        self.import_progress.grid(row=1, column=0, columnspan=4, pady=(12, 0))
+        self.import_progress.set(0)
+        self.import_status_label = ctk.CTkLabel(import_frame, text="", font=("Arial", 12))
+        self.import_status_label.grid(row=2, column=0, columnspan=4, pady=5)
+
+        ctk.CTkButton(
+            frame,
+            text="Back to Main",
+            command=self.show_main_screen,
+            fg_color="transparent",
+            border_width=1,
+            border_color=("#D0D0D0", "#404040"),
+            font=("Arial", 12)
+        ).pack(pady=10)
+
+    def start_import(self):
+        path = filedialog.askopenfilename(filetypes=[
+            ("Word lists", "*.csv *.json *.jsonl *.ndjson *.tsv *.txt"),
+            ("All files", "*.*")
+        ])
+        if not path:
+            return
+        topic = self.import_topic_entry.get().strip()
+        self.import_button.configure(state="disabled")
+        self.import_progress.set(0)
+        self.import_status_label.configure(text=f"Reading {os.path.basename(path)}...")
+        Thread(target=self.perform_import, args=(path, topic), daemon=True).start()
+
+    def perform_import(self, path, topic):
+        def progress(fraction, counts):
+            rows = counts["rows"]
+            self.after(0, lambda: self.on_import_progress(fraction, rows))
+
+        try:
+            new_words, counts = self.engine.read_import(path, topic=topic, progress=progress)
+        except Exception as e:
+            message = f"Error: {e}"
+            self.after(0, lambda: self.finish_import([], None, message))
+            return
+        self.after(0, lambda: self.finish_import(new_words, counts))
+
+    def on_import_progress(self, fraction, rows):
+        self.import_progress.set(fraction)
+        self.import_status_label.configure(text=f"Reading... {rows} rows")
+
+    def finish_import(self, new_words, counts, message=None):
+        # back on the Tk thread: one add + one persistence write for the whole file
+        self.engine.add_words(new_words, count_today=False)
+        self.import_button.configure(state="normal")
+        self.import_progress.set(1 if counts else 0)
+        if counts:
+            message = (f"Imported {counts['added']} of {counts['rows']} rows "
+                       f"({counts['duplicates']} duplicates, {counts['invalid']} invalid)")
+        self.import_status_label.configure(text=message)
+
+    def remove_duplicates(self):
+        removed = self.engine.dedupe()
+        self.import_status_label.configure(
+            text=f"Merged and removed {removed} duplicate words" if removed else "No duplicates found"
+        )
+
+    def export_words(self):
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON", "*.json")])
+        if not path:
+            return
+        try:
+            count = self.engine.export_words(path)
+            self.import_status_label.configure(text=f"Exported {count} words to {os.path.basename(path)}")
+        except Exception as e:
+            self.import_status_label.configure(text=f"Error: {e}")
 
     # =========================
-    # Statistics
+    # Diagnostics (LINGVO_DIAGNOSTICS=1)
     # =========================
-    def update_statistics(self):
-        self.test_stats["total_reviews"] = len(self.training_history)
-
-        daily_correct = {}
-        for entry in self.training_history:
-            if entry.get("result") == "correct":
-                d = entry.get("date")
-                if d:
-                    daily_correct[d] = daily_correct.get(d, 0) + 1
-
-        # Streak: consecutive days from today backwards, where correct >= daily_goal
-        streak = 0
-        today = datetime.now().date()
-        for i in range(0, 365):  # max lookback
-            day = (today - timedelta(days=i)).strftime("%Y-%m-%d")
-            if daily_correct.get(day, 0) >= self.daily_goal:
-                streak += 1
+    def start_diagnostics(self):
+        # after the first paint: the startup itself is reported by StartupTimer
+        diagnostics.recorder.attach_file(os.path.join(self.engine.data_dir, "diagnostics.log"))
+        self.stall_detector = diagnostics.StallDetector()
+        self.stall_detector.start()
+        self.diagnostics_heartbeat()
+
+    def diagnostics_heartbeat(self):
+        self.stall_detector.beat()
+        self.heartbeat_job = self.after(self.stall_detector.interval_ms, self.diagnostics_heartbeat)
+
+    def show_diagnostics(self):
+        self.screens.show("diagnostics")
+
+    def build_diagnostics(self, parent):
+        frame = ctk.CTkFrame(parent, fg_color="transparent")
+        frame.pack(fill="both", expand=True, padx=20, pady=20)
+
+        ctk.CTkLabel(frame, text="🩺 Diagnostics", font=("Arial", 20, "bold"), pady=10).pack()
+
+        self.diagnostics_text = ctk.CTkTextbox(frame, font=("Courier New", 12), wrap="none")
+        self.diagnostics_text.pack(fill="both", expand=True, pady=10)
+
+        buttons = ctk.CTkFrame(frame, fg_color="transparent")
+        buttons.pack(pady=5)
+        ctk.CTkButton(buttons, text="Refresh", width=120, command=self.refresh_diagnostics)\
+            .pack(side="left", padx=5)
+        ctk.CTkButton(buttons, text="Write to log", width=120, command=self.dump_diagnostics)\
+            .pack(side="left", padx=5)
+        ctk.CTkButton(buttons, text="Reset", width=120, command=self.reset_diagnostics)\
+            .pack(side="left", padx=5)
+        ctk.CTkButton(
+            buttons,
+            text="Back",
+            command=self.show_main_screen,
+            fg_color="transparent",
+            border_width=1,
+            border_color=("#D0D0D0", "#404040"),
+            width=120
+        ).pack(side="left", padx=5)
+
+    def refresh_diagnostics(self, note=""):
+        snapshot = diagnostics.recorder.snapshot()
+        lines = [f"Uptime {snapshot['uptime_s']} s, log: {diagnostics.recorder.path or 'not attached'}"]
+        if note:
+            lines.append(note)
+        lines += ["", f"{'span':<34}{'calls':>8}{'total ms':>12}{'mean ms':>10}{'max ms':>10}"]
+        for name, span in snapshot["spans"].items():
+            lines.append(f"{name:<34}{span['calls']:>8}{span['total_ms']:>12.1f}"
+                         f"{span['mean_ms']:>10.2f}{span['max_ms']:>10.1f}")
+        lines += ["", "counters"]
+        lines += [f"  {name:<32}{value:>12}" for name, value in snapshot["counters"].items()]
+        lines += ["", "recent slow spans and stalls (newest first)"]
+        for event in reversed(snapshot["events"][-30:]):
+            if event["kind"] == "stall":
+                lines.append(f"  {event['time']}  stall, no UI beat for {event['after_ms']} ms")
+                lines += ["      " + line for line in event["stack"].splitlines()[-6:]]
             else:
-                break
-        self.test_stats["streak"] = streak
+                lines.append(f"  {event['time']}  {event['span']} {event['ms']} ms ({event['thread']})")
 
-        if daily_correct:
-            best_day = max(daily_correct.items(), key=lambda kv: kv[1])
-            self.test_stats["best_day"] = {"date": best_day[0], "value": best_day[1]}
-        else:
-            self.test_stats["best_day"] = None
-
-        counts = {}
-        for entry in self.training_history:
-            ttype = entry.get("testType", "practice")
-            counts.setdefault(ttype, {"correct": 0, "total": 0})
-            counts[ttype]["total"] += 1
-            if entry.get("result") == "correct":
-                counts[ttype]["correct"] += 1
-
-        accuracy = {}
-        for ttype, vals in counts.items():
-            accuracy[ttype] = int((vals["correct"] / vals["total"]) * 100) if vals["total"] else 0
-        self.test_stats["accuracy_by_type"] = accuracy
+        self.diagnostics_text.configure(state="normal")
+        self.diagnostics_text.delete("1.0", "end")
+        self.diagnostics_text.insert("end", "\n".join(lines))
+        self.diagnostics_text.configure(state="disabled")
+
+    def dump_diagnostics(self):
+        path = diagnostics.recorder.dump()
+        self.refresh_diagnostics(note=f"Totals written to {path}" if path else "No log file attached")
+
+    def reset_diagnostics(self):
+        diagnostics.recorder.reset()
+        self.refresh_diagnostics()
+
+    # =========================
+    # Misc
+    # =========================
+
+    def on_close(self):
+        if getattr(self, "stall_detector", None) is not None:
+            self.stall_detector.stop()
+            self.after_cancel(self.heartbeat_job)
+        self.engine.close()
+        self.translation_cache.close()
+        self.http.close()
+        self.destroy()
+
+    def toggle_theme(self):
+        current = ctk.get_appearance_mode()
+        ctk.set_appearance_mode("light" if current == "dark" else "dark")
 
 
 if __name__ == "__main__":
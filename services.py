@@ -0,0 +1,574 @@
+import importlib.util
+import json
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from html.parser import HTMLParser
+from threading import Event, Lock
+
+import diagnostics
+
+# The translator and AI chat plumbing, kept free of Tk so the CLI, the benchmarks and the
+# tests can import it. httpx, asyncio and bs4 are imported where they are used.
+
+
+# =========================
+# Translation cache
+# =========================
+class TranslationCache:
+    # Two levels keyed by (normalized text, source, target): an in-memory LRU in front of a
+    # SQLite table. Disk entries expire after ttl seconds and the table is trimmed to
+    # max_entries by last use. The user's own vocabulary is a separate fallback, see
+    # set_vocabulary(). Safe to use from the translator worker threads.
+    def __init__(self, path, memory_size=512, ttl=30 * 24 * 3600, max_entries=50000):
+        self.path = path
+        self.memory_size = memory_size
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory = OrderedDict()
+        self.vocabulary = {}
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "stale_hits": 0, "vocabulary_hits": 0, "misses": 0}
+        self._lock = Lock()
+        self._puts_since_trim = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS translations (
+                text TEXT NOT NULL,
+                source TEXT NOT NULL,
+                target TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (text, source, target)
+            );
+            CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations(last_used);
+        """)
+        self.conn.commit()
+
+    @staticmethod
+    def normalize(text):
+        return " ".join(text.split()).lower()
+
+    def get(self, text, source, target, allow_stale=False):
+        key = (self.normalize(text), source, target)
+        now = time.time()
+        with self._lock:
+            cached = self.memory.get(key)
+            if cached is not None and now - cached[1] <= self.ttl:
+                self.memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                diagnostics.count("cache.translation.memory_hits")
+                return cached[0]
+
+            row = self.conn.execute(
+                "SELECT translation, created FROM translations WHERE text = ? AND source = ? AND target = ?", key
+            ).fetchone()
+            if row is not None:
+                fresh = now - row[1] <= self.ttl
+                if fresh or allow_stale:
+                    with self.conn:
+                        self.conn.execute(
+                            "UPDATE translations SET last_used = ? WHERE text = ? AND source = ? AND target = ?",
+                            (now,) + key
+                        )
+                    if fresh:
+                        self._remember(key, row[0], row[1])
+                        self.stats["disk_hits"] += 1
+                        diagnostics.count("cache.translation.disk_hits")
+                    else:
+                        self.stats["stale_hits"] += 1
+                        diagnostics.count("cache.translation.stale_hits")
+                    return row[0]
+
+            translation = self.vocabulary.get(key)
+            if translation is not None:
+                self.stats["vocabulary_hits"] += 1
+                diagnostics.count("cache.translation.vocabulary_hits")
+                return translation
+
+            self.stats["misses"] += 1
+            diagnostics.count("cache.translation.misses")
+            return None
+
+    def _remember(self, key, translation, created):
+        self.memory[key] = (translation, created)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def put(self, text, source, target, translation):
+        key = (self.normalize(text), source, target)
+        now = time.time()
+        with self._lock:
+            self._remember(key, translation, now)
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO translations (text, source, target, translation, created, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", key + (translation, now, now)
+                )
+            self._puts_since_trim += 1
+            if self._puts_since_trim >= 100:
+                self._trim(now)
+
+    def _trim(self, now):
+        self._puts_since_trim = 0
+        with self.conn:
+            self.conn.execute("DELETE FROM translations WHERE created < ?", (now - self.ttl,))
+            self.conn.execute(
+                "DELETE FROM translations WHERE rowid IN ("
+                "SELECT rowid FROM translations ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def set_vocabulary(self, pairs, source, target):
+        # Replaces the user's word/translation pairs, looked up in both directions. Only
+        # consulted when neither level has the text, so they never shadow a translation from
+        # the service, and they are never written to disk
+        vocabulary = {}
+        for text, translation in pairs:
+            if text and translation:
+                vocabulary[(self.normalize(text), source, target)] = translation
+                vocabulary.setdefault((self.normalize(translation), target, source), text)
+        with self._lock:
+            self.vocabulary = vocabulary
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+# =========================
+# HTTP
+# =========================
+class HttpClientPool:
+    # One long-lived httpx.Client shared by the translator and the AI chat, so requests
+    # reuse kept-alive connections instead of paying DNS + TCP + TLS setup every time.
+    # httpx.Client is thread-safe; the client itself is created lazily on first use.
+    def __init__(self, max_connections=10, max_keepalive=5, keepalive_expiry=60.0,
+                 connect_timeout=5.0, read_timeout=30.0, http2=None):
+        self.http2 = http2
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._client = None
+        self._lock = Lock()
+
+    def client_settings(self):
+        import httpx
+
+        if self.http2 is None:
+            # HTTP/2 needs the optional "h2" package (pip install httpx[http2])
+            self.http2 = importlib.util.find_spec("h2") is not None
+        return {
+            "http2": self.http2,
+            "limits": httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            "timeout": httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+        }
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                import httpx
+
+                self._client = httpx.Client(**self.client_settings())
+            return self._client
+
+    def async_client(self):
+        # AsyncClient is bound to one event loop, so batch jobs get their own with the same settings
+        import httpx
+
+        return httpx.AsyncClient(**self.client_settings())
+
+    def get(self, url, **kwargs):
+        with diagnostics.span("net.get"):
+            return self.client.get(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        with diagnostics.span("net.post"):
+            return self.client.post(url, **kwargs)
+
+    def stream(self, method, url, **kwargs):
+        diagnostics.count("net.streams")
+        return self.client.stream(method, url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+# =========================
+# Translation service
+# =========================
+TRANSLATE_URL = "https://translate.google.com/m"
+
+
+def translate_params(text, source, target):
+    return {"hl": target, "sl": source, "q": text}
+
+
+RESULT_CLASS = "result-container"
+
+
+class ResultContainerParser(HTMLParser):
+    # Collects the text of the first div.result-container and stops listening after it
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.depth = 0
+        self.parts = []
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if self.done or tag != "div":
+            return
+        if self.depth:
+            self.depth += 1
+        elif RESULT_CLASS in (dict(attrs).get("class") or "").split():
+            self.depth = 1
+
+    def handle_endtag(self, tag):
+        if self.depth and tag == "div":
+            self.depth -= 1
+            self.done = not self.depth
+
+    def handle_data(self, data):
+        if self.depth and not self.done:
+            self.parts.append(data)
+
+
+# content that is not markup: <script> and <style> elements and comments
+RAW_TEXT_START = re.compile(r"<(script|style)\b|<!--", re.I)
+RAW_TEXT_END = {"script": re.compile(r"</script", re.I), "style": re.compile(r"</style", re.I), None: re.compile("-->")}
+
+
+def inside_raw_text(html, position):
+    # True when position is in a <script> or <style> element or a comment that is not
+    # closed before it, where a "<div class=...>" is only text
+    index = 0
+    while True:
+        opened = RAW_TEXT_START.search(html, index, position)
+        if opened is None:
+            return False
+        name = opened.group(1)
+        closed = RAW_TEXT_END[name and name.lower()].search(html, opened.end(), position)
+        if closed is None:
+            return True
+        index = closed.end()
+
+
+def extract_translation_fast(html, chunk_size=2048):
+    # Jumps to the <div> that carries the class and parses only from there, a chunk at a time
+    position = html.find(RESULT_CLASS)
+    while position != -1:
+        start = html.rfind("<div", 0, position)
+        if start != -1 and html.find(">", start, position) == -1 and not inside_raw_text(html, start):
+            parser = ResultContainerParser()
+            for offset in range(start, len(html), chunk_size):
+                parser.feed(html[offset:offset + chunk_size])
+                if parser.done:
+                    return "".join(parser.parts)
+            if parser.depth:
+                return None  # unclosed div, let the full parser decide
+        position = html.find(RESULT_CLASS, position + len(RESULT_CLASS))
+    return None
+
+
+def extract_translation_soup(html):
+    from bs4 import BeautifulSoup
+
+    result = BeautifulSoup(html, "html.parser").find("div", class_=RESULT_CLASS)
+    return result.text if result else None
+
+
+# tried in order, the first non-None result wins
+TRANSLATION_EXTRACTORS = [extract_translation_fast, extract_translation_soup]
+
+
+def extract_translation(html, extractors=None):
+    if RESULT_CLASS not in html:
+        return None  # nothing any parser could match
+    for extractor in extractors or TRANSLATION_EXTRACTORS:
+        result = extractor(html)
+        if result is not None:
+            return result
+    return None
+
+
+class TokenBucket:
+    # Allows `rate` requests per second on average with bursts of up to `capacity`
+    def __init__(self, rate, capacity=None):
+        import asyncio
+
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        import asyncio
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class BatchTranslator:
+    # Translates many strings concurrently: at most `concurrency` requests in flight,
+    # `rate` requests per second, retries with exponential backoff for network errors,
+    # 429 and 5xx. Cached translations are answered without a request.
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, http, cache=None, concurrency=4, rate=4.0, retries=3, backoff=1.0):
+        self.http = http
+        self.cache = cache
+        self.concurrency = concurrency
+        self.rate = rate
+        self.retries = retries
+        self.backoff = backoff
+
+    def translate(self, texts, source, target, progress=None):
+        # Blocking entry point for worker threads
+        import asyncio
+
+        return asyncio.run(self.run(texts, source, target, progress))
+
+    async def run(self, texts, source, target, progress=None):
+        import asyncio
+
+        texts = list(dict.fromkeys(t for t in texts if t))
+        results = {}
+        done = 0
+        semaphore = asyncio.Semaphore(self.concurrency)
+        bucket = TokenBucket(self.rate)
+
+        async with self.http.async_client() as client:
+            async def worker(text):
+                nonlocal done
+                translation = self.cache.get(text, source, target) if self.cache else None
+                if translation is None:
+                    async with semaphore:
+                        translation = await self._fetch(client, bucket, text, source, target)
+                    if translation is not None and self.cache:
+                        self.cache.put(text, source, target, translation)
+                results[text] = translation
+                done += 1
+                if progress is not None:
+                    progress(done, len(texts), text, translation)
+
+            await asyncio.gather(*(worker(text) for text in texts))
+        return results
+
+    async def _fetch(self, client, bucket, text, source, target):
+        import asyncio
+        import httpx
+
+        for attempt in range(self.retries + 1):
+            await bucket.acquire()
+            try:
+                with diagnostics.span("net.batch_get"):
+                    response = await client.get(TRANSLATE_URL, params=translate_params(text, source, target))
+                if response.status_code == 200:
+                    return extract_translation(response.text)
+                if response.status_code not in self.RETRY_STATUSES:
+                    return None
+            except httpx.HTTPError as e:
+                if attempt == self.retries:
+                    print(f"Error translating {text!r}: {e}")
+                    return None
+            if attempt < self.retries:
+                diagnostics.count("net.retries")
+                await asyncio.sleep(self.backoff * (2 ** attempt))
+        return None
+
+
+# =========================
+# AI chat streaming
+# =========================
+def iter_sse_deltas(lines, cancelled=None):
+    # Yields the content deltas of an OpenAI-style SSE completion stream. cancelled() is
+    # checked for every line, so reasoning deltas and keep-alives do not delay a cancel
+    for line in lines:
+        if cancelled is not None and cancelled():
+            return
+        if not line or line.startswith(":") or not line.startswith("data:"):
+            continue  # blank separators, keep-alive comments, other fields
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            continue
+        if chunk.get("error"):
+            error = chunk["error"]
+            raise Exception(error.get("message", str(error)) if isinstance(error, dict) else str(error))
+        for choice in chunk.get("choices") or []:
+            content = (choice.get("delta") or {}).get("content")
+            if content:
+                yield content
+
+
+class ChatStream:
+    # Hand-off between the streaming worker thread and the Tk thread: tokens are
+    # buffered and drained in batches by at most one pending after() callback.
+    def __init__(self):
+        self.cancel_event = Event()
+        self.started = False
+        self.finished = False
+        self._lock = Lock()
+        self._buffer = []
+        self._parts = []
+        self._flush_scheduled = False
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    @property
+    def text(self):
+        with self._lock:
+            return "".join(self._parts)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def push(self, text):
+        # True when the caller has to schedule a flush
+        with self._lock:
+            self._buffer.append(text)
+            self._parts.append(text)
+            if self._flush_scheduled:
+                return False
+            self._flush_scheduled = True
+            return True
+
+    def drain(self):
+        with self._lock:
+            text = "".join(self._buffer)
+            self._buffer.clear()
+            self._flush_scheduled = False
+            return text
+
+
+class ConversationStore:
+    # Multi-turn chat history kept under a token budget. Turns that no longer fit are
+    # folded into a short extractive summary, so the request size stays bounded. The budget
+    # covers the whole request: system prompt, vocabulary, summary and turns.
+    def __init__(self, system_prompt="", budget=3000, summary_budget=300, vocab_budget=300):
+        self.system_prompt = system_prompt
+        self.budget = budget
+        self.summary_budget = summary_budget
+        self.vocab_budget = vocab_budget
+        self.turns = []  # [role, content, tokens]
+        self.summary_lines = []
+
+    @staticmethod
+    def estimate_tokens(text):
+        # ~4 characters per token for the Latin/Cyrillic text the chat sees
+        return len(text) // 4 + 1
+
+    @staticmethod
+    def clip(text, tokens):
+        # at most `tokens` by estimate_tokens
+        limit = max(tokens, 1) * 4 - 1
+        return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+    def add(self, role, content):
+        self.turns.append([role, content, self.estimate_tokens(content)])
+
+    def clear(self):
+        self.turns.clear()
+        self.summary_lines.clear()
+
+    @property
+    def summary(self):
+        return "\n".join(self.summary_lines)
+
+    def summarize(self, role, content):
+        # first sentence of the dropped turn; the oldest lines go once the summary is full
+        first = content.strip().split("\n", 1)[0]
+        for mark in (". ", "? ", "! "):
+            if mark in first:
+                first = first.split(mark, 1)[0] + mark.strip()
+                break
+        self.summary_lines.append(f"{role}: {self.clip(first, 40)}")
+        self.trim_summary(self.summary_budget)
+
+    def trim_summary(self, tokens):
+        # the oldest lines go first
+        while self.summary_lines and self.estimate_tokens(self.summary) > tokens:
+            self.summary_lines.pop(0)
+
+    def vocabulary_block(self, vocabulary, tokens=None):
+        # at most `tokens` (vocab_budget by default) including the heading
+        tokens = self.vocab_budget if tokens is None else tokens
+        heading = "Words from the learner's vocabulary related to this message:"
+        lines = []
+        used = self.estimate_tokens(heading)
+        for word, translation in vocabulary:
+            line = f"- {word} — {translation}"
+            used += self.estimate_tokens(line)
+            if used > tokens:
+                break
+            lines.append(line)
+        if not lines:
+            return ""
+        return heading + "\n" + "\n".join(lines)
+
+    def build_messages(self, vocabulary=()):
+        # The vocabulary and the summary get at most a quarter each of what the system
+        # prompt leaves (and never more than their own budgets), so at least half goes
+        # to the turns; the newest turn is clipped if it alone does not fit
+        system = self.system_prompt
+        share = max(0, self.budget - (self.estimate_tokens(system) if system else 0)) // 4
+        vocab = self.vocabulary_block(vocabulary, min(self.vocab_budget, share))
+        if vocab:
+            system = f"{system}\n\n{vocab}" if system else vocab
+        summary_tokens = min(self.summary_budget, share)
+
+        # keep the newest turns that fit, fold the rest into the summary for good
+        available = self.budget - (self.estimate_tokens(system) if system else 0)
+        if self.summary_lines or sum(turn[2] for turn in self.turns) > available:
+            available -= summary_tokens + 10  # + the summary heading
+        keep = 0
+        used = 0
+        for turn in reversed(self.turns):
+            if keep and used + turn[2] > available:
+                break
+            used += turn[2]
+            keep += 1
+        dropped, self.turns = self.turns[:len(self.turns) - keep], self.turns[len(self.turns) - keep:]
+        for role, content, _tokens in dropped:
+            self.summarize(role, content)
+        self.trim_summary(summary_tokens)
+
+        messages = []
+        if system:
+            messages.append({"role": "system", "content": system})
+        if self.summary_lines:
+            messages.append({"role": "system", "content": "Summary of the earlier conversation:\n" + self.summary})
+        for index, (role, content, tokens) in enumerate(self.turns):
+            if index == 0 and tokens > available:
+                content = self.clip(content, available)  # a single oversized message
+            messages.append({"role": role, "content": content})
+        return messages
+
+    def payload_tokens(self, messages):
+        return sum(self.estimate_tokens(m["content"]) for m in messages)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# engine.py, services.py and diagnostics.py live at the repository root, next to file2.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,532 @@
+import atexit
+import io
+import json
+import os
+import random
+import sqlite3
+import time
+
+import pytest
+
+from engine import (
+    AnswerMatcher,
+    DebouncedJsonWriter,
+    HistoryLog,
+    SQLiteStore,
+    VocabularyEngine,
+    WordRecord,
+    bounded_edit_distance,
+    iter_json_array,
+)
+
+BACKENDS = ("json", "sqlite")
+
+
+def make_engine(data_dir, storage="json"):
+    return VocabularyEngine(data_dir=str(data_dir), storage=storage)
+
+
+def write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def read_lines(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# =========================
+# HistoryLog
+# =========================
+def test_history_log_migrates_legacy_array(tmp_path):
+    legacy = tmp_path / "training_history.json"
+    entries = [{"date": "2024-01-01", "wordId": 1, "result": "correct"},
+               {"date": "2024-01-02", "wordId": 2, "result": "incorrect"}]
+    write_json(legacy, entries + ["not an entry"])
+    log = HistoryLog(str(tmp_path / "training_history.jsonl"), legacy_path=str(legacy))
+
+    assert log.count_entries() == 2
+    assert log.load() == entries
+    assert not legacy.exists()
+    assert (tmp_path / "training_history.json.migrated").exists()
+
+
+def test_history_log_sets_corrupt_legacy_file_aside(tmp_path):
+    legacy = tmp_path / "training_history.json"
+    legacy.write_text('[{"date": "2024-01-01", "wordId"', encoding="utf-8")
+    log = HistoryLog(str(tmp_path / "training_history.jsonl"), legacy_path=str(legacy))
+
+    assert log.count_entries() == 0
+    assert log.load() == []
+    assert (tmp_path / "training_history.json.corrupt").exists()
+
+
+def test_history_log_skips_torn_lines_and_compacts(tmp_path):
+    path = tmp_path / "training_history.jsonl"
+    path.write_text('{"wordId": 1}\n{"wordId": 2, "res\n[1]\n{"wordId": 3}', encoding="utf-8")
+    log = HistoryLog(str(path))
+
+    entries = log.load()
+    assert entries == [{"wordId": 1}, {"wordId": 3}]
+    assert log.bad_lines == 2
+    assert log.needs_compaction()
+
+    log.compact(entries)
+    assert not log.needs_compaction()
+    assert read_lines(path) == entries
+
+
+def test_history_log_appends_after_a_missing_newline(tmp_path):
+    path = tmp_path / "training_history.jsonl"
+    path.write_text('{"wordId": 1}', encoding="utf-8")
+    log = HistoryLog(str(path))
+
+    log.load()
+    log.append({"wordId": 2})
+    log.append({"wordId": 3})
+    assert read_lines(path) == [{"wordId": 1}, {"wordId": 2}, {"wordId": 3}]
+
+
+# =========================
+# DebouncedJsonWriter
+# =========================
+def test_writer_coalesces_changes_into_one_flush(tmp_path):
+    path = tmp_path / "data.json"
+    state = {"n": 0}
+    writer = DebouncedJsonWriter(str(path), snapshot=lambda: dict(state), flush_interval=60)
+    for i in range(50):
+        state["n"] = i
+        writer.mark_dirty()
+
+    assert writer.flush() is True
+    assert writer.flush() is False
+    assert writer.write_count == 1
+    assert json.loads(path.read_text(encoding="utf-8")) == {"n": 49}
+    writer.close()
+
+
+def test_writer_writes_in_the_background_after_the_interval(tmp_path):
+    path = tmp_path / "data.json"
+    writer = DebouncedJsonWriter(str(path), snapshot=lambda: [1, 2], flush_interval=0.05)
+    writer.mark_dirty()
+    deadline = time.monotonic() + 5
+    while writer.write_count == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert writer.write_count == 1
+    assert json.loads(path.read_text(encoding="utf-8")) == [1, 2]
+    writer.close()
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_writer_request_flush_writes_in_the_background(tmp_path):
+    path = tmp_path / "data.json"
+    writing = []
+
+    def snapshot():
+        writing.append(True)
+        time.sleep(0.2)
+        return {"saved": True}
+
+    writer = DebouncedJsonWriter(str(path), snapshot=snapshot, flush_interval=60)
+    writer.request_flush()  # nothing pending: no write
+    writer.mark_dirty()
+    started = time.perf_counter()
+    writer.request_flush()
+    assert time.perf_counter() - started < 0.1
+    assert wait_for(lambda: writer.write_count == 1)
+    assert len(writing) == 1
+    assert json.loads(path.read_text(encoding="utf-8")) == {"saved": True}
+    writer.close()
+
+
+def test_writer_backs_off_after_a_failed_write(tmp_path, capsys):
+    attempts = []
+
+    def snapshot():
+        attempts.append(time.monotonic())
+        return {}
+
+    writer = DebouncedJsonWriter(str(tmp_path / "missing" / "data.json"), snapshot=snapshot,
+                                 flush_interval=0.01, max_delay=10)
+    writer.mark_dirty()
+    time.sleep(0.5)
+    assert len(attempts) == 1
+    assert writer.write_count == 0
+
+    # the data dir comes back: the retry after the delay succeeds
+    (tmp_path / "missing").mkdir()
+    assert wait_for(lambda: writer.write_count == 1, timeout=3)
+    assert len(attempts) == 2
+    assert attempts[1] - attempts[0] >= 1.0
+    writer.close()
+    assert "Error saving" in capsys.readouterr().out
+
+
+def test_engine_close_unregisters_its_writers(tmp_path, monkeypatch):
+    registered = []
+    monkeypatch.setattr(atexit, "register", registered.append)
+    monkeypatch.setattr(atexit, "unregister", registered.remove)
+    for _ in range(3):
+        make_engine(tmp_path).close()
+    assert registered == []
+
+
+def test_writer_close_flushes_pending_changes(tmp_path):
+    path = tmp_path / "data.json"
+    writer = DebouncedJsonWriter(str(path), snapshot=lambda: {"saved": True}, flush_interval=60)
+    writer.mark_dirty()
+    writer.close()
+
+    assert writer.write_count == 1
+    assert json.loads(path.read_text(encoding="utf-8")) == {"saved": True}
+    assert not os.path.exists(str(path) + ".tmp")
+
+
+# =========================
+# iter_json_array
+# =========================
+CHUNK_SIZES = (1, 2, 3, 5, 7, 64)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("text", [
+    "[]",
+    " \n[ ] ",
+    "[1]",
+    "[1, 2 ,3]",
+    "[-35.0, 1e5, true, null]",
+    '[{"word": "кот", "tags": ["a", "b"]}, "x,]", [[]]]',
+])
+def test_iter_json_array_matches_json_loads(text, chunk_size):
+    assert list(iter_json_array(io.StringIO(text), chunk_size)) == json.loads(text)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("text", ["", "{}", "[", "[1", "[1,", "[1,,2]", "[,1]", "[1,]", "[1 2]", "[1}"])
+def test_iter_json_array_rejects_invalid_arrays(text, chunk_size):
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO(text), chunk_size))
+
+
+def test_iter_json_array_number_cut_at_chunk_boundary():
+    items = [-35.0, 12345, "abc"] * 50
+    text = json.dumps(items)
+    for chunk_size in range(1, 12):
+        assert list(iter_json_array(io.StringIO(text), chunk_size)) == items
+
+
+# =========================
+# bounded_edit_distance
+# =========================
+def osa_distance(a, b):
+    rows = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i in range(len(a) + 1):
+        rows[i][0] = i
+    for j in range(len(b) + 1):
+        rows[0][j] = j
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            rows[i][j] = min(rows[i - 1][j] + 1, rows[i][j - 1] + 1, rows[i - 1][j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                rows[i][j] = min(rows[i][j], rows[i - 2][j - 2] + 1)
+    return rows[len(a)][len(b)]
+
+
+@pytest.mark.parametrize("a, b, expected", [
+    ("", "", 0),
+    ("кошка", "кошка", 0),
+    ("cat", "cut", 1),
+    ("cat", "act", 1),
+    ("house", "hose", 1),
+    ("", "abc", 3),
+])
+def test_bounded_edit_distance_examples(a, b, expected):
+    assert bounded_edit_distance(a, b, 3) == expected
+
+
+def test_bounded_edit_distance_matches_full_distance_within_the_limit():
+    rng = random.Random(7)
+    for _ in range(500):
+        a = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 8)))
+        b = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 8)))
+        limit = rng.randint(0, 3)
+        full = osa_distance(a, b)
+        assert bounded_edit_distance(a, b, limit) == (full if full <= limit else limit + 1)
+
+
+# =========================
+# AnswerMatcher
+# =========================
+@pytest.mark.parametrize("answer, expected, grade", [
+    ("кошка", "Кошка", AnswerMatcher.EXACT),
+    ("  Кошка! ", "кошка", AnswerMatcher.EXACT),
+    ("ёж", "еж", AnswerMatcher.CLOSE),
+    ("cafe", "café", AnswerMatcher.CLOSE),
+    ("maison", "maisson", AnswerMatcher.CLOSE),
+    ("house", "maison", AnswerMatcher.WRONG),
+    ("cat", "cat, dog", AnswerMatcher.EXACT),
+    ("dog", "cat; dog / pet", AnswerMatcher.EXACT),
+    ("run", "run (fast)", AnswerMatcher.EXACT),
+    ("dog, cat", "cat; dog", AnswerMatcher.EXACT),
+    ("house, mose", "mouse; house", AnswerMatcher.CLOSE),
+    ("кошка, собака, дом, яблоко", "яблоко", AnswerMatcher.WRONG),
+    ("cat, mouse", "cat, dog", AnswerMatcher.WRONG),
+])
+def test_answer_matcher_grades(answer, expected, grade):
+    assert AnswerMatcher().grade(answer, expected) == grade
+
+
+def test_topic_quiz_asks_the_topics_words_due_soonest(tmp_path):
+    engine = make_engine(tmp_path)
+    words = engine.add_words([engine.new_word(f"w{i}", f"t{i}", topic="A" if i % 5 else "B") for i in range(50)])
+    for i, w in enumerate(words):
+        w["due"] = f"2024-01-{50 - i:02d}" if i < 31 else "2024-02-01"
+    engine.scheduler.build()
+    words[5]["translation"] = ""
+
+    picked = [word for word, *_question in engine.make_quiz(topic="B", size=3, rng=random.Random(1))]
+    assert sorted(w["word"] for w in picked) == ["W20", "W25", "W30"]
+    assert len(engine.make_quiz(topic="B", size=20)) == 9
+    assert len(engine.make_quiz(size=20)) == 20
+    engine.close()
+
+
+def test_check_answer_updates_the_word_and_history(tmp_path):
+    engine = make_engine(tmp_path)
+    word = engine.add_word("chat", "кошка")
+    assert engine.check_answer(word, "кошка", word["translation"]) == AnswerMatcher.EXACT
+    assert engine.check_answer(word, "собака", word["translation"]) == AnswerMatcher.WRONG
+
+    assert [e["result"] for e in engine.training_history] == ["correct", "incorrect"]
+    assert engine.review_stats.total == 2
+    engine.close()
+
+
+# =========================
+# Delete / dedupe / index consistency
+# =========================
+def assert_consistent(engine):
+    words = engine.words
+    assert engine.words_by_id == {w["id"]: w for w in words}
+    for i, w in enumerate(words):
+        assert engine.position(w["id"]) == i
+    topics = {}
+    for w in words:
+        topics[w.get("topic")] = topics.get(w.get("topic"), 0) + 1
+    assert engine.topic_counts() == topics
+    for w in words:
+        assert w in engine.search_words(w["word"])
+        assert engine.find_duplicate(w["word"], w["translation"]) is not None
+    assert {id(w) for w in engine.scheduler.next_words(len(words) + 5)} == {id(w) for w in words}
+
+
+@pytest.mark.parametrize("storage", BACKENDS)
+def test_deletes_keep_every_index_consistent(tmp_path, storage):
+    engine = make_engine(tmp_path, storage)
+    engine.add_words([engine.new_word(f"word{i}", f"слово{i}", topic=f"topic{i % 3}") for i in range(60)])
+    rng = random.Random(3)
+    for _ in range(20):
+        engine.delete_word(rng.choice(engine.words))
+        assert_consistent(engine)
+    engine.delete_words(rng.sample(engine.words, 10))
+    assert_consistent(engine)
+    engine.add_words([engine.new_word("extra", "лишнее", topic="topic0")])
+    engine.delete_word(engine.words[0])
+    assert_consistent(engine)
+
+    remaining = {w["id"] for w in engine.words}
+    engine.close()
+    reloaded = make_engine(tmp_path, storage)
+    assert {w["id"] for w in reloaded.words} == remaining
+    assert_consistent(reloaded)
+    reloaded.close()
+
+
+def test_bulk_add_rebuilds_the_search_index_in_the_background(tmp_path, monkeypatch):
+    engine = make_engine(tmp_path)
+    engine.add_words([engine.new_word(f"word{i}", f"слово{i}", topic="old") for i in range(20)])
+    engine.search_index.build()
+    assert engine.scheduler.next_words(1)
+
+    monkeypatch.setattr(VocabularyEngine, "BULK_REINDEX", 10)
+    imported = engine.add_words([engine.new_word(f"import{i}", f"импорт{i}", topic="new") for i in range(30)],
+                                count_today=False)
+    # answered by a scan until the background build is swapped in
+    assert engine.search_words("import1") == [w for w in imported if "import1" in w["word"].lower()]
+    assert wait_for(lambda: engine.search_index.built)
+    assert_consistent(engine)
+    engine.delete_word(imported[0])
+    engine.add_word("import99", "импорт99")
+    assert_consistent(engine)
+    engine.close()
+
+
+def test_delete_ignores_words_that_are_already_gone(tmp_path):
+    engine = make_engine(tmp_path)
+    word = engine.add_word("chat", "кошка")
+    assert engine.delete_word(word) == 1
+    assert engine.delete_word(word) == 0
+    assert engine.words == []
+    engine.close()
+
+
+@pytest.mark.parametrize("storage", BACKENDS)
+def test_dedupe_merges_copies_and_moves_their_history(tmp_path, storage):
+    engine = make_engine(tmp_path, storage)
+    first, copy, other = engine.add_words([
+        engine.new_word("chat", "кошка", tags=["animals"]),
+        engine.new_word("Chat", "Кошка", sentence="Le chat dort.", tags=["home"]),
+        engine.new_word("chien", "собака"),
+    ])
+    engine.log_review(copy, True)
+    engine.log_review(first, False)
+
+    assert engine.dedupe() == 1
+    assert engine.words == [first, other]
+    assert set(first["tags"]) == {"animals", "home"}
+    assert_consistent(engine)
+    engine.close()
+
+    reloaded = make_engine(tmp_path, storage)
+    if storage == "sqlite":
+        history = list(reloaded.store.iter_history())
+    else:
+        history = reloaded.training_history
+    assert [e["wordId"] for e in history] == [first["id"], first["id"]]
+    reloaded.close()
+
+
+def test_rename_topic_moves_words_between_topics(tmp_path):
+    engine = make_engine(tmp_path)
+    engine.add_words([engine.new_word(f"w{i}", f"t{i}", topic="old") for i in range(3)])
+    engine.rename_topic("old", "new")
+    assert engine.get_topics() == ["new"]
+    assert_consistent(engine)
+    engine.close()
+
+
+def test_add_word_does_not_add_a_duplicate(tmp_path):
+    engine = make_engine(tmp_path)
+    first = engine.add_word("Haus", "house", tags=["a1"])
+    assert engine.add_word("haus", " House ", tags=["b1"]) is first
+    assert first["tags"] == ("a1",)
+    assert engine.add_word("HAUS", "house", "Das Haus ist groß.", "Home", ["b1"], merge=True) is first
+    assert first["tags"] == ("a1", "b1")
+    assert first["topic"] == "Home"
+    assert engine.words == [first]
+    assert_consistent(engine)
+    engine.close()
+
+
+def test_filters_keep_vocabulary_order(tmp_path):
+    engine = make_engine(tmp_path)
+    words = engine.add_words([engine.new_word(f"w{i}", f"t{i}", topic="AB"[i % 2]) for i in range(6)])
+    names = lambda found: [w["word"] for w in found]
+    assert len(engine.filter_words(status="New")) == 6  # builds the status index
+    for word in reversed(words):
+        engine.check_answer(word, word["translation"], word["translation"])
+    assert names(engine.filter_words(status=words[0]["status"])) == ["W0", "W1", "W2", "W3", "W4", "W5"]
+
+    engine.rename_topic("B", "A")
+    assert names(engine.filter_words(topic="A")) == ["W0", "W1", "W2", "W3", "W4", "W5"]
+    engine.delete_word(words[2])
+    assert names(engine.filter_words(topic="A")) == ["W0", "W1", "W3", "W4", "W5"]
+    engine.close()
+
+
+# =========================
+# SQLite import and migration
+# =========================
+def test_sqlite_imports_the_json_files(tmp_path):
+    write_json(tmp_path / "user_words.json", [
+        {"id": 5, "word": "Chat", "translation": "кошка", "tags": ["animals"], "note": "kept"},
+        {"word": "Chien", "translation": "собака"},
+    ])
+    (tmp_path / "training_history.jsonl").write_text(
+        '{"date": "2024-01-01", "wordId": 5, "result": "correct"}\n'
+        '{"date": "2024-01-01", "wordId": "Chien", "result": "incorrect"}\n',
+        encoding="utf-8",
+    )
+    engine = make_engine(tmp_path, "sqlite")
+    by_word = {w["word"]: w for w in engine.words}
+
+    assert by_word["Chat"]["id"] == 5
+    assert by_word["Chat"]["tags"] == ("animals",)
+    assert by_word["Chat"]["note"] == "kept"
+    assert [e["wordId"] for e in engine.store.iter_history()] == [5, by_word["Chien"]["id"]]
+    assert engine.review_stats.total == 2
+    engine.close()
+
+
+def test_sqlite_migrates_text_word_keys_to_integers(tmp_path):
+    path = str(tmp_path / "lingvo.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.executescript(SQLiteStore.SCHEMA.replace("word_key INTEGER", "word_key TEXT"))
+    conn.execute("INSERT INTO words (id, word) VALUES (1, 'Chat'), (2, 'Chien')")
+    conn.execute("INSERT INTO history (date, word_key, result) VALUES "
+                 "('2024-01-01', 1, 'correct'), ('2024-01-01', 'Chien', 'correct'), "
+                 "('2024-01-01', 'gone', 'incorrect')")
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    conn.close()
+
+    store = SQLiteStore(path)
+    assert store.conn.execute("PRAGMA user_version").fetchone()[0] == 2
+    store.rekey_history()
+    assert [e["wordId"] for e in store.iter_history()] == [1, 2, "gone"]
+    indexes = {r[0] for r in store.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"idx_history_date", "idx_history_type"} <= indexes
+    store.close()
+
+
+# =========================
+# WordRecord
+# =========================
+WORD = {
+    "id": 7, "word": "Chat", "translation": "кошка", "sentence": "Le chat dort.",
+    "date_added": "2024-01-01 10:00:00", "review_count": 2, "last_reviewed": None,
+    "topic": "Animals", "tags": ["pets", "home"], "status": "Learning",
+    "ease": 2.5, "reps": 1, "interval": 3, "due": "2024-01-04", "custom": {"a": [1]},
+}
+
+
+def test_word_record_round_trips_to_the_same_dict():
+    record = WordRecord(WORD)
+    assert record.to_dict() == WORD
+    assert list(record.to_dict()) == list(WORD)
+    assert json.loads(json.dumps(record.to_dict())) == WORD
+    assert WordRecord(record.to_dict()) == record
+
+
+def test_word_record_behaves_like_the_dict():
+    record = WordRecord({"word": "Chat", "other": 1})
+    assert "translation" not in record
+    assert record.get("translation", "") == ""
+    assert record.setdefault("topic", "Без темы") == "Без темы"
+    record["tags"] = ["a"]
+    assert record["tags"] == ("a",)
+    assert record == {"word": "Chat", "other": 1, "topic": "Без темы", "tags": ["a"]}
+    assert dict(record) == record
+    del record["other"]
+    assert len(record) == 3
+    with pytest.raises(KeyError):
+        record["other"]
+
+
+def test_word_record_equality_compares_values():
+    record = WordRecord(WORD)
+    assert record == WordRecord(WORD)
+    assert record != WordRecord(dict(WORD, translation="кот"))
+    assert record != WordRecord(dict(WORD, custom=None))
+    assert record != dict(WORD, extra_key=1)
+    assert record != {k: v for k, v in WORD.items() if k != "custom"}
+    assert record in [WordRecord(dict(WORD, id=1)), WordRecord(WORD)]
@@ -0,0 +1,277 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from services import (
+    BatchTranslator,
+    ConversationStore,
+    TokenBucket,
+    TranslationCache,
+    extract_translation,
+    extract_translation_fast,
+    iter_sse_deltas,
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# =========================
+# Import
+# =========================
+def test_services_import_without_tk():
+    code = "import sys, services; print(sorted(m for m in ('tkinter', 'customtkinter') if m in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "[]"
+
+
+# =========================
+# TranslationCache
+# =========================
+def test_cache_answers_from_memory_then_disk(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = TranslationCache(path)
+    assert cache.get("Haus", "de", "en") is None
+    cache.put("Haus", "de", "en", "house")
+    assert cache.get("  haus ", "de", "en") == "house"
+    assert cache.get("Haus", "de", "ru") is None
+    cache.close()
+
+    cache = TranslationCache(path)
+    assert cache.get("HAUS", "de", "en") == "house"
+    assert cache.get("Haus", "de", "en") == "house"
+    assert cache.stats["disk_hits"] == 1
+    assert cache.stats["memory_hits"] == 1
+    cache.close()
+
+
+def test_cache_serves_expired_entries_only_when_stale_is_allowed(tmp_path):
+    cache = TranslationCache(str(tmp_path / "cache.sqlite3"), ttl=60)
+    cache.put("Haus", "de", "en", "house")
+    with cache.conn:
+        cache.conn.execute("UPDATE translations SET created = ?", (time.time() - 120,))
+    cache.memory.clear()
+
+    assert cache.get("Haus", "de", "en") is None
+    assert cache.get("Haus", "de", "en", allow_stale=True) == "house"
+    assert cache.stats["stale_hits"] == 1
+    cache.close()
+
+
+def test_cache_falls_back_to_the_vocabulary_in_both_directions(tmp_path):
+    cache = TranslationCache(str(tmp_path / "cache.sqlite3"))
+    cache.set_vocabulary([("Haus", "house"), ("", "nothing")], "de", "en")
+    cache.put("Haus", "de", "en", "home")
+
+    assert cache.get("haus", "de", "en") == "home"  # the service wins
+    assert cache.get("House", "en", "de") == "Haus"
+    assert cache.get("nothing", "en", "de") is None
+    assert cache.conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0] == 1
+    cache.close()
+
+
+def test_cache_trims_the_least_recently_used_entries(tmp_path):
+    cache = TranslationCache(str(tmp_path / "cache.sqlite3"), memory_size=5, max_entries=50)
+    for index in range(100):
+        cache.put(f"word {index}", "de", "en", f"translation {index}")
+
+    assert len(cache.memory) == 5
+    assert cache.conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0] == 50
+    assert cache.get("word 99", "de", "en") == "translation 99"
+    cache.memory.clear()
+    assert cache.get("word 0", "de", "en") is None
+    cache.close()
+
+
+# =========================
+# BatchTranslator / TokenBucket
+# =========================
+class FakeResponse:
+    def __init__(self, status_code, translation=""):
+        self.status_code = status_code
+        self.text = f'<div class="result-container">{translation}</div>'
+
+
+class FakeHttp:
+    # stands in for HttpClientPool: answers[text] is the list of responses, one per attempt
+    def __init__(self, answers):
+        self.answers = answers
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def async_client(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def get(self, url, params=None):
+        self.requests.append(params["q"])
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return self.answers[params["q"]].pop(0)
+
+
+def test_token_bucket_allows_a_burst_then_the_rate():
+    async def acquire(bucket, count):
+        started = time.monotonic()
+        for _ in range(count):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(acquire(TokenBucket(rate=20, capacity=3), 3)) < 0.05
+    assert asyncio.run(acquire(TokenBucket(rate=20, capacity=3), 7)) >= 0.15
+
+
+def test_batch_answers_cached_texts_without_requests(tmp_path):
+    cache = TranslationCache(str(tmp_path / "cache.sqlite3"))
+    cache.put("Haus", "de", "en", "house")
+    http = FakeHttp({})
+    progress = []
+
+    results = BatchTranslator(http, cache).translate(["Haus", "", "Haus"], "de", "en",
+                                                     lambda *args: progress.append(args))
+    assert results == {"Haus": "house"}
+    assert progress == [(1, 1, "Haus", "house")]
+    assert http.requests == []
+    cache.close()
+
+
+def test_batch_retries_and_limits_concurrency(tmp_path):
+    pytest.importorskip("httpx")
+    cache = TranslationCache(str(tmp_path / "cache.sqlite3"))
+    answers = {f"w{index}": [FakeResponse(200, f"t{index}")] for index in range(8)}
+    answers["w0"] = [FakeResponse(503), FakeResponse(429), FakeResponse(200, "t0")]
+    answers["w1"] = [FakeResponse(404)]
+    http = FakeHttp(answers)
+
+    translator = BatchTranslator(http, cache, concurrency=2, rate=1000, backoff=0)
+    results = translator.translate(list(answers), "de", "en")
+    assert results == {f"w{index}": (None if index == 1 else f"t{index}") for index in range(8)}
+    assert http.requests.count("w0") == 3
+    assert http.max_in_flight == 2
+    assert cache.get("w0", "de", "en") == "t0"
+    assert cache.get("w1", "de", "en") is None
+    cache.close()
+
+
+# =========================
+# iter_sse_deltas
+# =========================
+def sse(content=None, reasoning=None):
+    delta = {}
+    if content is not None:
+        delta["content"] = content
+    if reasoning is not None:
+        delta["reasoning"] = reasoning
+    return "data: " + json.dumps({"choices": [{"delta": delta}]})
+
+
+def test_sse_yields_content_deltas_until_done():
+    lines = [": OPENROUTER PROCESSING", "", sse(reasoning="hm"), sse("Hal"), "event: ping", sse("lo"),
+             "data: not json", "data: [DONE]", sse("after")]
+    assert list(iter_sse_deltas(lines)) == ["Hal", "lo"]
+
+
+def test_sse_raises_stream_errors():
+    with pytest.raises(Exception, match="rate limited"):
+        list(iter_sse_deltas(['data: {"error": {"message": "rate limited"}}']))
+
+
+def test_sse_checks_cancel_on_every_line():
+    # a long run of reasoning deltas and keep-alives yields nothing, the cancel still stops it
+    read = []
+    cancel = threading.Event()
+
+    def lines():
+        for index in range(1000):
+            read.append(index)
+            if index == 5:
+                cancel.set()
+            yield sse(reasoning="...") if index % 2 else ": keep-alive"
+        yield sse("late")
+
+    assert list(iter_sse_deltas(lines(), cancel.is_set)) == []
+    assert len(read) == 6
+
+
+# =========================
+# Translation extraction
+# =========================
+@pytest.mark.parametrize("html, expected", [
+    ('<div class="header">x</div><div class="a result-container">Haus &amp; <b>Hof</b><div>!</div></div>',
+     "Haus & Hof!"),
+    ("<script>var a='<div class=\"result-container\">JS</div>';</script><div class=\"result-container\">real</div>",
+     "real"),
+    ('<STYLE>.x { content: "<div class=\'result-container\'>css</div>" }</Style><div class="result-container">real</div>',
+     "real"),
+    ('<!-- <div class="result-container">old</div> --><div class="result-container">real</div>', "real"),
+    ('<p>result-container</p><div class="result-container">real</div>', "real"),
+    ('<div class="result-container">unclosed', None),
+    ('<script><div class="result-container">in an unclosed script</div>', None),
+    ("<div>nothing</div>", None),
+])
+def test_fast_extractor(html, expected):
+    assert extract_translation_fast(html, chunk_size=7) == expected
+
+
+def test_extraction_falls_back_to_the_next_extractor():
+    html = '<div class="result-container">unclosed'
+    assert extract_translation(html, [extract_translation_fast, lambda page: "full parse"]) == "full parse"
+    assert extract_translation("<div>no result</div>", [lambda page: "never called"]) is None
+
+
+# =========================
+# ConversationStore
+# =========================
+def test_conversation_sends_everything_that_fits():
+    store = ConversationStore("Be brief.", budget=1000)
+    store.add("user", "Hallo!")
+    store.add("assistant", "Hallo, wie geht's?")
+
+    assert store.build_messages() == [
+        {"role": "system", "content": "Be brief."},
+        {"role": "user", "content": "Hallo!"},
+        {"role": "assistant", "content": "Hallo, wie geht's?"},
+    ]
+    assert store.summary == ""
+
+
+def test_conversation_folds_old_turns_into_the_summary():
+    store = ConversationStore("Be brief.", budget=200, summary_budget=40)
+    for index in range(30):
+        store.add("user", f"Question {index}. " + "x" * 80)
+        store.add("assistant", f"Answer {index}! " + "y" * 80)
+    messages = store.build_messages([("Haus", "house")] * 50)
+
+    assert store.payload_tokens(messages) <= 200
+    assert messages[0]["role"] == "system" and "- Haus — house" in messages[0]["content"]
+    assert messages[1]["content"].startswith("Summary of the earlier conversation:")
+    assert "assistant: Answer" in store.summary
+    assert store.estimate_tokens(store.summary) <= 40
+    assert messages[-1]["content"].startswith("Answer 29!")
+    assert len(store.turns) == len(messages) - 2
+
+    store.clear()
+    assert store.build_messages() == [{"role": "system", "content": "Be brief."}]
+
+
+def test_conversation_clips_a_single_oversized_message():
+    store = ConversationStore(budget=100)
+    store.add("user", "z" * 2000)
+    messages = store.build_messages()
+
+    assert len(messages) == 1
+    assert messages[0]["content"].endswith("…")
+    assert store.payload_tokens(messages) <= 100